@@ -4,6 +4,8 @@ import os
 
 import tqdm
 
+from rlgameoflife import actor_learner
+from rlgameoflife import history
 from rlgameoflife import worlds
 from rlgameoflife import visualisation
 from rlgameoflife import agent
@@ -48,6 +50,34 @@ def argument_parser():
         help="Launch simulation and train agents.",
         action="store_true",
     )
+    parser.add_argument(
+        "--stream-history",
+        help="Write the simulation history to disk while simulating.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--changes-only-history",
+        help="Record a history row only when the state of an entity changes.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--history-precision",
+        help="Precision of the positions and directions of the saved history.",
+        choices=[precision.value for precision in history.HistoryPrecision],
+        default=history.HistoryPrecision.FLOAT32.value,
+    )
+    parser.add_argument(
+        "--history-codec",
+        help="Compression of the saved history.",
+        choices=[codec.value for codec in history.HistoryCodec],
+        default=history.HistoryCodec.ZLIB.value,
+    )
+    parser.add_argument(
+        "--history-compression-level",
+        help="zlib compression level of the saved history, from 1 to 9.",
+        default=6,
+        type=int,
+    )
     parser.add_argument("-d", "--debug", help="Enable debug logs.", action="store_true")
     parser.add_argument(
         "-v",
@@ -58,7 +88,22 @@ def argument_parser():
     parser.add_argument(
         "-l", "--last", help="Visualize last simulation.", action="store_true"
     )
+    parser.add_argument(
+        "--start-tick", help="First tick of the video.", default=0, type=int
+    )
+    parser.add_argument(
+        "--end-tick", help="Tick after the last tick of the video.", default=None, type=int
+    )
     parser.add_argument("-t", "--train", help="Train agents.", action="store_true")
+    parser.add_argument(
+        "-a",
+        "--actor-learner",
+        help="Train agents with actor processes collecting transitions for a learner.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--actors", help="Number of actor processes.", default=4, type=int
+    )
     parser.add_argument("-p", "--optuna", help="Train agents with optuna optimization.", action="store_true")
 
     return parser
@@ -81,6 +126,14 @@ def main():
         agent_trainer.train()
         agent_trainer.evaluate()
         return
+
+    if args.actor_learner:
+        agent_trainer = actor_learner.ActorLearnerTrainer(
+            agent.AgentTrainerParameters(),
+            actor_learner.ActorLearnerParameters(num_actors=args.actors),
+        )
+        agent_trainer.train()
+        return
     
     if args.optuna:
         agent_trainer = optuna_trainer.OptunaAgentTrainer()
@@ -88,7 +141,17 @@ def main():
         return
 
     if args.simulate:
-        my_world = worlds.BasicWorld(args.iterations, args.output)
+        my_world = worlds.BasicWorld(
+            args.iterations,
+            args.output,
+            stream_history=args.stream_history,
+            changes_only_history=args.changes_only_history,
+            history_format=history.HistoryFormat(
+                history.HistoryPrecision(args.history_precision),
+                history.HistoryCodec(args.history_codec),
+                args.history_compression_level,
+            ),
+        )
         my_world.simulate()
 
     sim_dir = None
@@ -106,7 +169,7 @@ def main():
         sim_dir = args.visualize
     if sim_dir:
         my_vis = visualisation.Visualizer(sim_dir)
-        my_vis.make_video()
+        my_vis.make_video(start_tick=args.start_tick, end_tick=args.end_tick)
 
 
 main()
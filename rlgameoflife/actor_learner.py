@@ -0,0 +1,245 @@
+from dataclasses import dataclass
+import logging
+import queue
+import random
+import typing
+
+from tqdm import tqdm
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from rlgameoflife import agent
+from rlgameoflife import models
+from rlgameoflife import worlds
+
+
+@dataclass
+class ActorLearnerParameters:
+    num_actors: int = 4  # number of actor processes stepping their own world
+    learner_sync_every: int = 100  # learner steps between two publications of the policy weights
+    actor_sync_every: int = 50  # actor steps between two checks for new policy weights
+    actor_send_every: int = 32  # transitions sent at once by an actor
+    queue_size: int = 64  # messages of transitions waiting for the learner before the actors block
+    start_method: str = "spawn"
+
+
+class ActorProcessException(Exception):
+    """raised when an actor process exits with an error."""
+
+
+def _actor(
+    actor_idx: int,
+    shared_net: models.DQN,
+    weights_version,
+    weights_lock,
+    transitions: mp.Queue,
+    stop_event,
+    hyperparameters: agent.AgentTrainerParameters,
+    world_parameters: agent.WorldParameters,
+    actor_parameters: ActorLearnerParameters,
+    seed: int,
+) -> None:
+    """Step a world with a copy of the policy synced from the learner, and send the transitions to the learner."""
+    torch.set_num_threads(1)
+    rng = random.Random(seed)
+    world = worlds.BasicAgentWorld(
+        world_parameters.max_ticks,
+        "outputs",
+        world_parameters.boundaries,
+        disable_history=True,
+        seed=seed,
+        snapshot_reset=True,
+    )
+    n_actions = len(world.action_space)
+    state = world.get_observation().astype(np.float32)
+
+    policy_net = models.DQN(len(state), n_actions)
+    with weights_lock:
+        policy_net.load_state_dict(shared_net.state_dict())
+        local_version = weights_version.value
+    policy_net.eval()
+
+    send_every = actor_parameters.actor_send_every
+    states = np.zeros((send_every, len(state)), dtype=np.float32)
+    next_states = np.zeros_like(states)
+    step_actions = np.zeros(send_every, dtype=np.int64)
+    rewards = np.zeros(send_every, dtype=np.float32)
+    dones = np.zeros(send_every, dtype=bool)
+
+    steps_done = 0
+    episode_steps = 0
+    row = 0
+    while not stop_event.is_set():
+        eps_threshold = agent.decayed_epsilon(hyperparameters, steps_done)
+        if rng.random() > eps_threshold:
+            with torch.no_grad():
+                action = int(policy_net(torch.from_numpy(state).unsqueeze(0)).argmax(1))
+        else:
+            action = rng.randrange(n_actions)
+        step_parameters = world.step(world.action_space(action))
+        next_state = step_parameters.observation.astype(np.float32)
+
+        states[row] = state
+        step_actions[row] = action
+        next_states[row] = next_state
+        rewards[row] = step_parameters.reward
+        dones[row] = step_parameters.terminated
+        row += 1
+        steps_done += 1
+        episode_steps += 1
+        if row == send_every:
+            message = (states.copy(), step_actions.copy(), next_states.copy(), rewards.copy(), dones.copy())
+            while not stop_event.is_set():
+                try:
+                    transitions.put(message, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            row = 0
+
+        if step_parameters.terminated or episode_steps >= hyperparameters.max_steps_per_episode:
+            world.reset()
+            state = world.get_observation().astype(np.float32)
+            episode_steps = 0
+        else:
+            state = next_state
+
+        if steps_done % actor_parameters.actor_sync_every == 0 and weights_version.value != local_version:
+            with weights_lock:
+                policy_net.load_state_dict(shared_net.state_dict())
+                local_version = weights_version.value
+    # Do not wait for the learner to read the last transitions to exit.
+    transitions.cancel_join_thread()
+
+
+class ActorLearnerTrainer(agent.AgentTrainer):
+    """Trainer whose transitions are collected by actor processes while the learner optimizes the policy.
+
+    The actors step their own world with a copy of the policy, refreshed when the learner publishes its weights,
+    and send their transitions in batches to the learner which adds them to its replay memory between its
+    optimization steps. The training stops after num_episodes * max_steps_per_episode transitions.
+    """
+
+    def __init__(
+        self,
+        agent_parameters: agent.AgentTrainerParameters,
+        actor_learner_parameters: typing.Optional[ActorLearnerParameters] = None,
+    ) -> None:
+        super().__init__(agent_parameters)
+        self._logger = logging.getLogger(__class__.__name__)
+        self.actor_learner_parameters = (
+            actor_learner_parameters
+            if actor_learner_parameters is not None
+            else ActorLearnerParameters()
+        )
+        self.learner_steps = 0
+
+        # CPU copy of the policy in shared memory, read by the actors.
+        self.shared_net = models.DQN(
+            len(self.world.get_observation()), len(self.world.action_space)
+        )
+        self.shared_net.load_state_dict(self.policy_net.state_dict())
+        self.shared_net.share_memory()
+
+    def publish_weights(self) -> None:
+        with self._weights_lock:
+            with torch.no_grad():
+                for shared_parameter, parameter in zip(
+                    self.shared_net.parameters(), self.policy_net.parameters()
+                ):
+                    shared_parameter.copy_(parameter)
+            self._weights_version.value += 1
+
+    def _receive_transitions(self, block: bool) -> int:
+        """Add the transitions sent by the actors to the replay memory, waiting for some if block."""
+        received = 0
+        # Bounded, so that fast actors cannot keep the learner from optimizing.
+        for message_idx in range(self.actor_learner_parameters.queue_size):
+            try:
+                if block and message_idx == 0:
+                    message = self._transitions.get(timeout=0.1)
+                else:
+                    message = self._transitions.get_nowait()
+            except queue.Empty:
+                return received
+            self.memory.push_batch(*message)
+            received += len(message[0])
+        return received
+
+    def _check_actors(self) -> None:
+        for actor_idx, process in enumerate(self._actors):
+            if process.exitcode is not None:
+                self._logger.error("actor %d exited with code %d", actor_idx, process.exitcode)
+                raise ActorProcessException()
+
+    def _start_actors(self) -> None:
+        context = mp.get_context(self.actor_learner_parameters.start_method)
+        self._weights_version = context.Value("i", 0)
+        self._weights_lock = context.Lock()
+        self._transitions = context.Queue(self.actor_learner_parameters.queue_size)
+        self._stop_event = context.Event()
+        self._actors = []
+        for actor_idx in range(self.actor_learner_parameters.num_actors):
+            process = context.Process(
+                target=_actor,
+                args=(
+                    actor_idx,
+                    self.shared_net,
+                    self._weights_version,
+                    self._weights_lock,
+                    self._transitions,
+                    self._stop_event,
+                    self.hyperparameters,
+                    self.world_parameters,
+                    self.actor_learner_parameters,
+                    random.randrange(2**31),
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._actors.append(process)
+
+    def _stop_actors(self) -> None:
+        self._stop_event.set()
+        for process in self._actors:
+            while process.is_alive():
+                # Empty the queue so that the actors blocked on it can see the stop event.
+                try:
+                    self._transitions.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+                process.join(timeout=0.1)
+        self._transitions.close()
+
+    def train(self, save_final_eval: bool = True):
+        total_steps = (
+            self.hyperparameters.num_episodes * self.hyperparameters.max_steps_per_episode
+        )
+        self._start_actors()
+        progress_bar = tqdm(total=total_steps)
+        received_steps = 0
+        try:
+            self.policy_net.train()
+            while received_steps < total_steps:
+                received = self._receive_transitions(
+                    block=len(self.memory) < self.hyperparameters.batch_size
+                )
+                received_steps += received
+                progress_bar.update(received)
+                loss = self.learn()
+                if loss is not None:
+                    self.learner_steps += 1
+                    if self.learner_steps % self.actor_learner_parameters.learner_sync_every == 0:
+                        self.publish_weights()
+                    progress_bar.set_description(
+                        f"Actor-learner | Learner step {self.learner_steps} | Loss {loss:.4f}"
+                    )
+                self._check_actors()
+        finally:
+            self._stop_actors()
+            progress_bar.close()
+        final_rewards = self.evaluate(save_history=save_final_eval)
+        self.eval_world.wait_history()
+        self._logger.info("Training complete.")
+        return final_rewards
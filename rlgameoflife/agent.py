@@ -1,10 +1,13 @@
-from collections import namedtuple, deque
+from collections import namedtuple
 from dataclasses import dataclass
+import functools
 import logging
 import math
 import random
+import typing
 
 from tqdm import tqdm
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
@@ -14,22 +17,172 @@ from rlgameoflife import actions
 from rlgameoflife import models
 
 
-Transition = namedtuple("Transition", ("state", "action", "next_state", "reward"))
+TransitionBatch = namedtuple(
+    "TransitionBatch", ("state", "action", "next_state", "reward", "done")
+)
+PrioritizedTransitionBatch = namedtuple(
+    "PrioritizedTransitionBatch",
+    TransitionBatch._fields + ("indices", "weights"),
+)
 
 
 class ReplayMemory(object):
-    def __init__(self, capacity):
-        self.memory = deque([], maxlen=capacity)
+    """Ring buffer of transitions stored in preallocated tensors.
+
+    The final transitions are stored with a zero next state and a done flag.
+    """
 
-    def push(self, *args):
-        """Save a transition"""
-        self.memory.append(Transition(*args))
+    def __init__(self, capacity, observation_size, device=None):
+        self.capacity = capacity
+        self.device = device if device is not None else torch.device("cpu")
+        self.states = torch.zeros(
+            (capacity, observation_size), dtype=torch.float32, device=self.device
+        )
+        self.actions = torch.zeros((capacity, 1), dtype=torch.long, device=self.device)
+        self.next_states = torch.zeros_like(self.states)
+        self.rewards = torch.zeros(capacity, dtype=torch.float32, device=self.device)
+        self.dones = torch.zeros(capacity, dtype=torch.bool, device=self.device)
+        self._position = 0
+        self._size = 0
+
+    def push(self, state, action, next_state, reward):
+        """Save a transition, next_state is None for a final state"""
+        position = self._position
+        self.states[position] = state
+        self.actions[position] = action
+        if next_state is None:
+            self.next_states[position] = 0.0
+            self.dones[position] = True
+        else:
+            self.next_states[position] = next_state
+            self.dones[position] = False
+        self.rewards[position] = reward
+        self._position = (position + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def push_batch(self, states, actions, next_states, rewards, dones):
+        """Save a batch of transitions, the next states of the final ones are ignored."""
+        indices = (
+            torch.arange(len(states), device=self.device) + self._position
+        ) % self.capacity
+        dones = torch.as_tensor(dones, dtype=torch.bool, device=self.device)
+        self.states[indices] = torch.as_tensor(states, dtype=torch.float32, device=self.device)
+        self.actions[indices] = torch.as_tensor(actions, dtype=torch.long, device=self.device).view(-1, 1)
+        self.next_states[indices] = torch.as_tensor(
+            next_states, dtype=torch.float32, device=self.device
+        ).masked_fill(dones.view(-1, 1), 0.0)
+        self.rewards[indices] = torch.as_tensor(rewards, dtype=torch.float32, device=self.device)
+        self.dones[indices] = dones
+        self._position = (self._position + len(states)) % self.capacity
+        self._size = min(self._size + len(states), self.capacity)
 
     def sample(self, batch_size):
-        return random.sample(self.memory, batch_size)
+        """Sample a batch of transitions uniformly, with replacement."""
+        indices = torch.randint(0, self._size, (batch_size,), device=self.device)
+        return TransitionBatch(
+            self.states[indices],
+            self.actions[indices],
+            self.next_states[indices],
+            self.rewards[indices],
+            self.dones[indices],
+        )
 
     def __len__(self):
-        return len(self.memory)
+        return self._size
+
+
+class SumTree(object):
+    """Binary tree in an array whose nodes are the sums of their children, the leaves being the priorities.
+
+    Updates and prefix sum searches are vectorized over the indices, O(log n) each.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._leaves = 1
+        while self._leaves < capacity:
+            self._leaves *= 2
+        self.tree = np.zeros(2 * self._leaves, dtype=np.float64)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    @property
+    def max(self):
+        return self.tree[self._leaves : self._leaves + self.capacity].max()
+
+    def __getitem__(self, indices):
+        return self.tree[np.asarray(indices) + self._leaves]
+
+    def update(self, indices, priorities):
+        nodes = np.asarray(indices, dtype=np.int64) + self._leaves
+        self.tree[nodes] = priorities
+        nodes = np.unique(nodes[nodes > 1] // 2)
+        while len(nodes):
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes[nodes > 1] // 2)
+
+    def find(self, values):
+        """Indices of the leaves where the prefix sums of the priorities reach the values."""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self._leaves:
+            left_sums = self.tree[2 * nodes]
+            go_right = values > left_sums
+            values -= left_sums * go_right
+            nodes = 2 * nodes + go_right
+        return nodes - self._leaves
+
+
+class PrioritizedReplayMemory(ReplayMemory):
+    """Replay memory sampling the transitions in proportion to their priority to the power alpha.
+
+    The new transitions get the highest priority, the samples come with their indices to update their
+    priorities from their TD errors, and with importance sampling weights correcting the bias with beta.
+    """
+
+    def __init__(self, capacity, observation_size, device=None, alpha=0.6, beta=0.4, epsilon=1e-6):
+        super().__init__(capacity, observation_size, device)
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        self.sum_tree = SumTree(capacity)
+        self._max_priority = 1.0
+
+    def push(self, state, action, next_state, reward):
+        position = self._position
+        super().push(state, action, next_state, reward)
+        self.sum_tree.update([position], self._max_priority)
+
+    def push_batch(self, states, actions, next_states, rewards, dones):
+        indices = (np.arange(len(states)) + self._position) % self.capacity
+        super().push_batch(states, actions, next_states, rewards, dones)
+        self.sum_tree.update(indices, self._max_priority)
+
+    def sample(self, batch_size):
+        """Sample a batch with one transition drawn in each of batch_size equal segments of the priorities."""
+        segment = self.sum_tree.total / batch_size
+        values = (np.arange(batch_size) + np.random.random_sample(batch_size)) * segment
+        indices = np.minimum(self.sum_tree.find(values), self._size - 1)
+        probabilities = self.sum_tree[indices] / self.sum_tree.total
+        weights = (self._size * probabilities) ** -self.beta
+        weights /= weights.max()
+        torch_indices = torch.from_numpy(indices).to(self.device)
+        return PrioritizedTransitionBatch(
+            self.states[torch_indices],
+            self.actions[torch_indices],
+            self.next_states[torch_indices],
+            self.rewards[torch_indices],
+            self.dones[torch_indices],
+            indices,
+            torch.as_tensor(weights, dtype=torch.float32, device=self.device),
+        )
+
+    def update_priorities(self, indices, td_errors):
+        priorities = (np.abs(np.asarray(td_errors, dtype=np.float64)) + self.epsilon) ** self.alpha
+        self.sum_tree.update(indices, priorities)
+        self._max_priority = max(self._max_priority, priorities.max())
 
 
 @dataclass
@@ -49,6 +202,20 @@ class AgentTrainerParameters:
     max_steps_per_episode: int = 400
     eval_each_n_episode: int = 5
     replay_memory_size: int = 10000
+    prioritized_replay: bool = False  # sample the transitions in proportion to their TD error
+    priority_alpha: float = 0.6  # how much the priorities are used, 0 is uniform sampling
+    priority_beta: float = 0.4  # importance sampling correction of the prioritized sampling, 1 is full correction
+    train_every: int = 1  # environment steps between two updates of the policy network
+    gradient_steps: int = 1  # gradient steps of each update of the policy network
+    target_update_every: int = 1  # gradient steps between two soft updates of the target network
+    num_worlds: int = 1  # training worlds stepped together, each step adds num_worlds transitions
+
+
+def decayed_epsilon(hyperparameters: AgentTrainerParameters, steps_done: int) -> float:
+    """Exploration rate after steps_done action selections, decaying from eps_start to eps_end."""
+    return hyperparameters.eps_end + (
+        hyperparameters.eps_start - hyperparameters.eps_end
+    ) * math.exp(-1.0 * steps_done / hyperparameters.eps_decay)
 
 
 class WorldParameters:
@@ -62,17 +229,25 @@ class AgentTrainer:
         self.world_parameters = WorldParameters()
         self.hyperparameters = agent_parameters
 
-        self.world = worlds.BasicAgentWorld(
-            self.world_parameters.max_ticks,
-            "outputs",
-            self.world_parameters.boundaries,
-            disable_history=True,
+        self.vector_world = worlds.VectorAgentWorld(
+            functools.partial(
+                worlds.BasicAgentWorld,
+                self.world_parameters.max_ticks,
+                "outputs",
+                self.world_parameters.boundaries,
+                disable_history=True,
+                snapshot_reset=True,
+            ),
+            self.hyperparameters.num_worlds,
+            max_episode_ticks=self.hyperparameters.max_steps_per_episode,
         )
+        self.world = self.vector_world.worlds[0]
         self.eval_world = worlds.BasicEvalWorldAgent(
             self.world_parameters.max_ticks,
             "outputs",
             self.world_parameters.boundaries,
             disable_history=True,
+            snapshot_reset=True,
         )
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
@@ -89,9 +264,34 @@ class AgentTrainer:
         self.optimizer = optim.AdamW(
             self.policy_net.parameters(), lr=self.hyperparameters.lr, amsgrad=True
         )
-        self.memory = ReplayMemory(self.hyperparameters.replay_memory_size)
+        if self.hyperparameters.prioritized_replay:
+            self.memory = PrioritizedReplayMemory(
+                self.hyperparameters.replay_memory_size,
+                n_observations,
+                self.device,
+                alpha=self.hyperparameters.priority_alpha,
+                beta=self.hyperparameters.priority_beta,
+            )
+        else:
+            self.memory = ReplayMemory(
+                self.hyperparameters.replay_memory_size, n_observations, self.device
+            )
+
+        # The prioritized replay weights the loss of each sample.
+        self.criterion = nn.SmoothL1Loss(
+            reduction="none" if self.hyperparameters.prioritized_replay else "mean"
+        )
+        self._policy_parameters = list(self.policy_net.parameters())
+        self._target_parameters = list(self.target_net.parameters())
+
+        # Observations of the batched action selection, converted to a tensor without copy.
+        self._observations = np.zeros((self.hyperparameters.num_worlds, n_observations), dtype=np.float32)
+        self._observations_tensor = torch.from_numpy(self._observations)
+        self._rng = np.random.default_rng()
 
         self.steps_done = 0
+        self.env_steps_done = 0
+        self.gradient_steps_done = 0
 
     def _select_action(self, state):
         return self.policy_net(state).max(1)[1].view(1, 1)
@@ -100,9 +300,7 @@ class AgentTrainer:
         if not training:
             return self._select_action(state)
         sample = random.random()
-        eps_threshold = self.hyperparameters.eps_end + (
-            self.hyperparameters.eps_start - self.hyperparameters.eps_end
-        ) * math.exp(-1.0 * self.steps_done / self.hyperparameters.eps_decay)
+        eps_threshold = self.epsilon_threshold()
         self.steps_done += 1
         if sample > eps_threshold:
             with torch.no_grad():
@@ -117,28 +315,47 @@ class AgentTrainer:
                 dtype=torch.long,
             )
 
+    def epsilon_threshold(self) -> float:
+        return decayed_epsilon(self.hyperparameters, self.steps_done)
+
+    def select_actions(
+        self, observations: np.ndarray, training: bool = True, epsilons=None
+    ) -> np.ndarray:
+        """Select the actions of a batch of observations with one forward pass, epsilon-greedy per row when training.
+
+        The rows explore with the given epsilons, or by default with the decayed epsilon of the trainer.
+        """
+        num_observations = len(observations)
+        if num_observations > len(self._observations):
+            self._observations = np.zeros(
+                (num_observations, self._observations.shape[1]), dtype=np.float32
+            )
+            self._observations_tensor = torch.from_numpy(self._observations)
+        explore = np.zeros(num_observations, dtype=bool)
+        if training:
+            if epsilons is None:
+                epsilons = self.epsilon_threshold()
+            explore = self._rng.random(num_observations) < epsilons
+            self.steps_done += num_observations
+        step_actions = self._rng.integers(
+            len(self.world.action_space), size=num_observations
+        )
+        if not explore.all():
+            np.copyto(self._observations[:num_observations], observations)
+            with torch.no_grad():
+                q_values = self.policy_net(
+                    self._observations_tensor[:num_observations].to(self.device)
+                )
+            step_actions = np.where(explore, step_actions, q_values.argmax(1).cpu().numpy())
+        return step_actions
+
     def optimize_model(self) -> float:
         if len(self.memory) < self.hyperparameters.batch_size:
             return
-        transitions = self.memory.sample(self.hyperparameters.batch_size)
-        # Transpose the batch (see https://stackoverflow.com/a/19343/3343043 for
-        # detailed explanation). This converts batch-array of Transitions
-        # to Transition of batch-arrays.
-        batch = Transition(*zip(*transitions))
-
-        # Compute a mask of non-final states and concatenate the batch elements
-        # (a final state would've been the one after which simulation ended)
-        non_final_mask = torch.tensor(
-            tuple(map(lambda s: s is not None, batch.next_state)),
-            device=self.device,
-            dtype=torch.bool,
-        )
-        non_final_next_states = torch.cat(
-            [s for s in batch.next_state if s is not None]
-        )
-        state_batch = torch.cat(batch.state)
-        action_batch = torch.cat(batch.action)
-        reward_batch = torch.cat(batch.reward)
+        batch = self.memory.sample(self.hyperparameters.batch_size)
+        state_batch = batch.state
+        action_batch = batch.action
+        reward_batch = batch.reward
 
         # Compute Q(s_t, a) - the model computes Q(s_t), then we select the
         # columns of actions taken. These are the actions which would've been taken
@@ -146,25 +363,30 @@ class AgentTrainer:
         state_action_values = self.policy_net(state_batch).gather(1, action_batch)
 
         # Compute V(s_{t+1}) for all next states.
-        # Expected values of actions for non_final_next_states are computed based
+        # Expected values of actions for the next states are computed based
         # on the "older" target_net; selecting their best reward with max(1)[0].
-        # This is merged based on the mask, such that we'll have either the expected
-        # state value or 0 in case the state was final.
-        next_state_values = torch.zeros(
-            self.hyperparameters.batch_size, device=self.device
-        )
+        # The value is 0 in case the state was final.
         with torch.no_grad():
-            next_state_values[non_final_mask] = self.target_net(
-                non_final_next_states
-            ).max(1)[0]
+            next_state_values = (
+                self.target_net(batch.next_state).max(1)[0].masked_fill(batch.done, 0.0)
+            )
         # Compute the expected Q values
         expected_state_action_values = (
             next_state_values * self.hyperparameters.gamma
         ) + reward_batch
 
-        # Compute Huber loss
-        criterion = nn.SmoothL1Loss()
-        loss = criterion(state_action_values, expected_state_action_values.unsqueeze(1))
+        # Compute Huber loss, weighted by the importance sampling weights of prioritized samples
+        if self.hyperparameters.prioritized_replay:
+            losses = self.criterion(
+                state_action_values, expected_state_action_values.unsqueeze(1)
+            ).squeeze(1)
+            loss = (losses * batch.weights).mean()
+            td_errors = state_action_values.detach().squeeze(1) - expected_state_action_values
+            self.memory.update_priorities(batch.indices, td_errors.cpu().numpy())
+        else:
+            loss = self.criterion(
+                state_action_values, expected_state_action_values.unsqueeze(1)
+            )
 
         # Optimize the model
         self.optimizer.zero_grad()
@@ -175,53 +397,62 @@ class AgentTrainer:
 
         return loss.item()
 
+    def update_target_net(self) -> None:
+        # Soft update of the target network's weights, in place
+        # θ′ ← τ θ + (1 −τ )θ′ = θ′ + τ (θ - θ′)
+        with torch.no_grad():
+            torch._foreach_lerp_(
+                self._target_parameters, self._policy_parameters, self.hyperparameters.tau
+            )
+
+    def learn(self) -> typing.Optional[float]:
+        """Run the gradient steps of an update of the policy network, and the target network updates due.
+
+        Returns the loss of the last gradient step, None if the replay memory is not filled enough.
+        """
+        loss = None
+        for _ in range(self.hyperparameters.gradient_steps):
+            loss = self.optimize_model()
+            if loss is None:
+                return None
+            self.gradient_steps_done += 1
+            if self.gradient_steps_done % self.hyperparameters.target_update_every == 0:
+                self.update_target_net()
+        return loss
+
     def train(self, save_final_eval: bool = True):
         episode_bar = tqdm(range(self.hyperparameters.num_episodes))
         eval_rewards = None
+        # Initialize the environments and get their states
+        states = self.vector_world.reset()
         for episode in episode_bar:
-            # Initialize the environment and get it's state
-            state = self.world.get_observation()
-            state = torch.tensor(
-                state, dtype=torch.float32, device=self.device
-            ).unsqueeze(0)
             self.policy_net.train()
             for t in range(self.hyperparameters.max_steps_per_episode):
-                action = self.select_action(state)
-                step_parameters = self.world.step(
-                    self.world.action_space(action.item())
+                step_actions = self.select_actions(states)
+                step_parameters = self.vector_world.step(step_actions)
+
+                # The worlds whose episode ended are reset, their next state is the last one of the episode.
+                next_states = step_parameters.observation.copy()
+                for world_idx, info in enumerate(step_parameters.info):
+                    if "final_observation" in info:
+                        next_states[world_idx] = info["final_observation"]
+
+                # Store the transitions in memory
+                self.memory.push_batch(
+                    states,
+                    step_actions,
+                    next_states,
+                    step_parameters.reward,
+                    step_parameters.terminated,
                 )
-                reward = torch.tensor([step_parameters.reward], device=self.device)
-                # done = step_parameters.terminated or step_parameters.truncated
-
-                if step_parameters.terminated:
-                    next_state = None
-                else:
-                    next_state = torch.tensor(
-                        step_parameters.observation,
-                        dtype=torch.float32,
-                        device=self.device,
-                    ).unsqueeze(0)
-
-                # Store the transition in memory
-                self.memory.push(state, action, next_state, reward)
-
-                # Move to the next state
-                state = next_state
-
-                # Perform one step of the optimization (on the policy network)
-                self.optimize_model()
-
-                # Soft update of the target network's weights
-                # θ′ ← τ θ + (1 −τ )θ′
-                target_net_state_dict = self.target_net.state_dict()
-                policy_net_state_dict = self.policy_net.state_dict()
-                for key in policy_net_state_dict:
-                    target_net_state_dict[key] = policy_net_state_dict[
-                        key
-                    ] * self.hyperparameters.tau + target_net_state_dict[key] * (
-                        1 - self.hyperparameters.tau
-                    )
-                self.target_net.load_state_dict(target_net_state_dict)
+
+                # Move to the next states
+                states = step_parameters.observation
+
+                # Perform the optimization (on the policy network) every train_every steps
+                self.env_steps_done += 1
+                if self.env_steps_done % self.hyperparameters.train_every == 0:
+                    self.learn()
 
                 episode_bar.set_description(
                     f"Train | Episode {episode} | Step {t} / {self.hyperparameters.max_steps_per_episode} | Eval reward {eval_rewards}"
@@ -233,8 +464,8 @@ class AgentTrainer:
                 and episode != self.hyperparameters.num_episodes - 1
             ):
                 eval_rewards = self.evaluate()
-            self.world.reset()
         final_rewards = self.evaluate(save_history=save_final_eval)
+        self.eval_world.wait_history()
         self._logger.info("Training complete.")
         return final_rewards
 
@@ -247,30 +478,14 @@ class AgentTrainer:
 
         # Initialize the environment and get it's state
         state = self.eval_world.get_observation()
-        state = torch.tensor(state, dtype=torch.float32, device=self.device).unsqueeze(
-            0
-        )
         episode_reward = 0
         self.policy_net.eval()
         for t in range(self.hyperparameters.max_steps_per_episode):
-            with torch.no_grad():
-                action = self.select_action(state, training=False)
-            step_parameters = self.eval_world.step(
-                self.eval_world.action_space(action.item())
-            )
-            # done = step_parameters.terminated or step_parameters.truncated
-
-            if step_parameters.terminated:
-                next_state = None
-            else:
-                next_state = torch.tensor(
-                    step_parameters.observation,
-                    dtype=torch.float32,
-                    device=self.device,
-                ).unsqueeze(0)
+            action = self.select_actions(state[np.newaxis], training=False)[0]
+            step_parameters = self.eval_world.step(self.eval_world.action_space(int(action)))
 
             # Move to the next state
-            state = next_state
+            state = step_parameters.observation
             episode_reward += step_parameters.reward
 
         self.eval_world.save_history()
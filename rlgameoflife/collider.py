@@ -1,7 +1,20 @@
+from dataclasses import dataclass
 import logging
 import typing
 
+import numpy as np
+
 from rlgameoflife import entities
+from rlgameoflife import math_utils
+
+
+COLLISION_DISTANCE = 5.0
+
+
+@dataclass
+class CollisionResult:
+    rewards: np.ndarray  # reward of each entity of the target group
+    eaten_slots: np.ndarray  # store slots of the eaten food
 
 
 class Collider:
@@ -15,27 +28,60 @@ class Collider:
 
 
 class CreatureFoodCollider(Collider):
+    def collide_batch(self, all_group: entities.EntityGroup) -> CollisionResult:
+        """Compute the collisions between the target creatures and all the food at once.
+
+        A food is eaten by the first target creature, in group order, closer than the collision distance.
+        """
+        store = all_group.store
+        target_slots = self._target_group.slots()
+        if store.spatial_index is not None:
+            # Only the food near the targets can collide.
+            slot_mask = all_group.slot_mask()
+            food_slots = np.unique(
+                np.concatenate(
+                    [
+                        store.spatial_index.query_radius(
+                            store.positions[target_slot],
+                            COLLISION_DISTANCE,
+                            entities.EntityType.FOOD,
+                            slot_mask,
+                        )
+                        for target_slot in target_slots
+                    ]
+                    + [np.empty(0, dtype=np.int64)]
+                )
+            )
+        else:
+            food_slots = all_group.slots(entities.EntityType.FOOD)
+        if len(target_slots) == 0 or len(food_slots) == 0:
+            return CollisionResult(
+                rewards=np.zeros(len(target_slots)),
+                eaten_slots=np.empty(0, dtype=np.int64),
+            )
+
+        entities_vectors = math_utils.Vector2DArray(
+            store.positions[target_slots][:, np.newaxis, :]
+            - store.positions[food_slots][np.newaxis, :, :]
+        )
+        entities_distances = entities_vectors.magnitude()
+        collisions = entities_distances < COLLISION_DISTANCE
+        eaten = collisions.any(axis=0)
+        eaters = np.argmax(collisions[:, eaten], axis=0)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            for eater, food_slot in zip(eaters, food_slots[eaten]):
+                self._logger.debug(
+                    "Collision between slots %i and %i", target_slots[eater], food_slot
+                )
+        return CollisionResult(
+            rewards=np.bincount(eaters, minlength=len(target_slots)).astype(float),
+            eaten_slots=food_slots[eaten],
+        )
+
     def collide(self, all_group: entities.EntityGroup) -> float:
-        reward = 0.0
-        for target_entity in self._target_group:
-            entities_to_kill = []
-            for polled_entity_idx, polled_entity in enumerate(all_group):
-                if type(polled_entity) is entities.EntityGroup:
-                    # Recursively calculate collision with entities.
-                    reward += self.collide(polled_entity)
-                    continue
-                if polled_entity.entity_type != entities.EntityType.FOOD:
-                    # This is no food!
-                    continue
-                entities_distance = target_entity.position.subtract(
-                    polled_entity.position
-                ).magnitude()
-                if entities_distance < 5.0:
-                    self._logger.debug("Collision between %s and %s", target_entity, polled_entity)
-                    reward += 1.0
-                    entities_to_kill.append(polled_entity_idx)
-            all_group.kills(entities_to_kill)
-        return reward
+        collision_result = self.collide_batch(all_group)
+        all_group.kill_slots(collision_result.eaten_slots)
+        return float(collision_result.rewards.sum())
 
 
 class ColliderGroup:
@@ -1,4 +1,4 @@
-import copy
+from dataclasses import dataclass
 import datetime
 import enum
 import logging
@@ -6,6 +6,7 @@ import numpy as np
 import os
 import typing
 
+from rlgameoflife import history
 from rlgameoflife import math_utils
 
 
@@ -27,17 +28,274 @@ class EnittyIndexer:
 ENTITY_INDEXER = EnittyIndexer()
 
 
+class LazyLogger:
+    """Logger named after the class declaring it, looked up on first use and shared by the instances."""
+
+    def __set_name__(self, owner, name: str) -> None:
+        self._name = owner.__name__
+        self._logger = None
+
+    def __get__(self, instance, owner) -> logging.Logger:
+        if self._logger is None:
+            self._logger = logging.getLogger(self._name)
+        return self._logger
+
+
 class EntityType(enum.Enum):
     NOTHING = -1
     FOOD = 0
     CREATURE = 1
 
 
+class Intent(enum.IntFlag):
+    """Movements requested to an entity during a tick, applied by EntityStore.integrate."""
+
+    NONE = 0
+    MOVE = 1
+    ROTATE = 2
+
+
+@dataclass
+class EntityStoreSnapshot:
+    """Copy of the allocated slots of an entity store."""
+
+    columns: typing.Dict[str, np.ndarray]
+    size: int
+    free_slots: typing.List[int]
+
+
+class EntityStore:
+    """Columnar storage of the state of every entity.
+
+    Entities are handles on a slot of the store. Freed slots are recycled on the next allocation.
+    """
+
+    _COLUMNS = (
+        ("positions", (2,), np.float64, 0.0),
+        ("directions", (2,), np.float64, 0.0),
+        ("next_positions", (2,), np.float64, 0.0),
+        ("next_directions", (2,), np.float64, 0.0),
+        ("types", (), np.int8, EntityType.NOTHING.value),
+        ("max_speeds", (), np.float64, 0.0),
+        ("max_angles", (), np.float64, 0.0),
+        ("ticks", (), np.int64, 0),
+        ("alive", (), np.bool_, False),
+        ("intents", (), np.int8, Intent.NONE),
+        ("move_intents", (2,), np.float64, 0.0),
+        ("rotate_intents", (), np.float64, 0.0),
+    )
+
+    def __init__(self, capacity: int = 64) -> None:
+        self._logger = logging.getLogger(__class__.__name__)
+        self._capacity = max(1, capacity)
+        for column_name, column_shape, column_dtype, column_fill in self._COLUMNS:
+            setattr(
+                self,
+                column_name,
+                np.full((self._capacity, *column_shape), column_fill, dtype=column_dtype),
+            )
+        self._size = 0
+        self._free_slots = []
+        self._spatial_index = None
+        self._entity_pool = None
+
+    def __len__(self) -> int:
+        return self._size - len(self._free_slots)
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def size(self) -> int:
+        """Number of slots ever allocated, dead or alive."""
+        return self._size
+
+    @property
+    def spatial_index(self):
+        return self._spatial_index
+
+    @property
+    def entity_pool(self):
+        return self._entity_pool
+
+    def attach_entity_pool(self, entity_pool) -> None:
+        """Keep the entities killed from the groups of the store in the given pool, to be respawned."""
+        self._entity_pool = entity_pool
+
+    def attach_spatial_index(self, spatial_index) -> None:
+        """Keep the given spatial index up to date with the positions of the store."""
+        self._spatial_index = spatial_index
+        spatial_index.clear()
+        spatial_index.update_many(self.alive_slots())
+
+    def set_position(self, slot: int, position: np.ndarray) -> None:
+        self.positions[slot] = position
+        if self._spatial_index is not None:
+            self._spatial_index.update(slot)
+
+    def _grow(self) -> None:
+        new_capacity = self._capacity * 2
+        for column_name, column_shape, column_dtype, column_fill in self._COLUMNS:
+            column = np.full((new_capacity, *column_shape), column_fill, dtype=column_dtype)
+            column[: self._capacity] = getattr(self, column_name)
+            setattr(self, column_name, column)
+        self._capacity = new_capacity
+
+    def allocate(
+        self,
+        entity_type: EntityType,
+        max_speed: float,
+        max_angle: float,
+        tick: int,
+    ) -> int:
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            if self._size >= self._capacity:
+                self._grow()
+            slot = self._size
+            self._size += 1
+        self.types[slot] = entity_type.value
+        self.max_speeds[slot] = max_speed
+        self.max_angles[slot] = max_angle
+        self.ticks[slot] = tick
+        self.alive[slot] = True
+        self.intents[slot] = Intent.NONE
+        return slot
+
+    def release(self, slot: int) -> None:
+        if not self.alive[slot]:
+            raise IndexError("Slot {} is not allocated".format(slot))
+        self.alive[slot] = False
+        self.types[slot] = EntityType.NOTHING.value
+        self.intents[slot] = Intent.NONE
+        self._free_slots.append(slot)
+        if self._spatial_index is not None:
+            self._spatial_index.remove(slot)
+
+    def clear(self) -> None:
+        self.alive[: self._size] = False
+        self.types[: self._size] = EntityType.NOTHING.value
+        self.intents[: self._size] = Intent.NONE
+        self._size = 0
+        self._free_slots = []
+        if self._spatial_index is not None:
+            self._spatial_index.clear()
+
+    def alive_slots(self) -> np.ndarray:
+        return np.flatnonzero(self.alive[: self._size])
+
+    def snapshot(self) -> EntityStoreSnapshot:
+        return EntityStoreSnapshot(
+            columns={
+                column_name: getattr(self, column_name)[: self._size].copy()
+                for column_name, _, _, _ in self._COLUMNS
+            },
+            size=self._size,
+            free_slots=list(self._free_slots),
+        )
+
+    def restore(self, snapshot: EntityStoreSnapshot) -> None:
+        """Copy back the slots of the snapshot, the slots allocated since are freed."""
+        while self._capacity < snapshot.size:
+            self._grow()
+        for column_name, _, _, column_fill in self._COLUMNS:
+            column = getattr(self, column_name)
+            column[: snapshot.size] = snapshot.columns[column_name]
+            column[snapshot.size : self._size] = column_fill
+        self._size = snapshot.size
+        self._free_slots = list(snapshot.free_slots)
+        if self._spatial_index is not None:
+            self._spatial_index.clear()
+            self._spatial_index.update_many(self.alive_slots())
+
+    def set_move_intent(self, slot: int, movement: typing.Tuple[float, float]) -> None:
+        """Request a move, it replaces the moves and rotations requested before."""
+        self.move_intents[slot] = movement
+        self.intents[slot] = Intent.MOVE
+
+    def set_rotate_intent(self, slot: int, angle: float) -> None:
+        """Request a rotation, it replaces the direction of the move requested before."""
+        self.rotate_intents[slot] = angle
+        self.intents[slot] |= Intent.ROTATE
+
+    def integrate(self, slots: typing.Optional[np.ndarray] = None) -> None:
+        """Compute the next positions and directions of the slots from their requested moves and rotations.
+
+        The movement distance is clamped to the max speed and the rotation to the max angle of each entity.
+        """
+        if slots is None:
+            slots = self.alive_slots()
+        slots = slots[self.intents[slots] != Intent.NONE]
+        if len(slots) == 0:
+            return
+        intents = self.intents[slots]
+
+        moving = slots[(intents & Intent.MOVE) != 0]
+        if len(moving):
+            movements = math_utils.Vector2DArray(self.move_intents[moving])
+            distances = np.minimum(movements.magnitude(), self.max_speeds[moving])
+            angles = movements.angle_between(math_utils.Vector2DArray(self.directions[moving]))
+            next_directions = self._rotated_directions(moving, angles)
+            self.next_directions[moving] = next_directions.vectors
+            self.next_positions[moving] = (
+                self.positions[moving] + next_directions.scale(distances).vectors
+            )
+
+        rotating = slots[(intents & Intent.ROTATE) != 0]
+        if len(rotating):
+            self.next_directions[rotating] = self._rotated_directions(
+                rotating, self.rotate_intents[rotating]
+            ).vectors
+        self.intents[slots] = Intent.NONE
+
+    def _rotated_directions(self, slots: np.ndarray, angles: np.ndarray) -> math_utils.Vector2DArray:
+        max_angles = self.max_angles[slots]
+        angles = np.clip(angles, -max_angles, max_angles)
+        return math_utils.Vector2DArray(self.directions[slots]).rotate(angles).normalize()
+
+    def commit(self, slots: np.ndarray) -> None:
+        """Replace the positions and directions of the slots with their next ones."""
+        self.positions[slots] = self.next_positions[slots]
+        self.directions[slots] = self.next_directions[slots]
+        if self._spatial_index is not None:
+            self._spatial_index.update_many(slots)
+
+
 class EntitiesHistoryLoader:
-    def __init__(self, output_dir: str, disable: bool = False) -> None:
+    def __init__(
+        self,
+        output_dir: str,
+        disable: bool = False,
+        stream: bool = False,
+        max_memory_bytes: int = history.DEFAULT_STREAM_MEMORY_BYTES,
+        changes_only: bool = False,
+        keyframe_ticks: int = history.DEFAULT_KEYFRAME_TICKS,
+        history_format: typing.Optional[history.HistoryFormat] = None,
+        background_save: bool = False,
+    ) -> None:
+        """Record the history of the entities.
+
+        In stream mode, the history is appended to disk each time max_memory_bytes of rows are recorded
+        instead of being kept in memory until saved.
+        With changes_only, a row is only recorded when the state of the entity changes, the history is still
+        read back with one row per tick. A streamed history also gets a row for every entity each keyframe_ticks
+        ticks.
+        history_format sets the precision and compression of the saved history file.
+        With background_save, save returns immediately and the file is written on a background thread, wait blocks
+        until it is written.
+        """
         self._logger = logging.getLogger(__class__.__name__)
         self._output_dir = output_dir
         self._disable = disable
+        self._stream = stream
+        self._max_memory_bytes = max_memory_bytes
+        self._changes_only = changes_only
+        self._keyframe_ticks = keyframe_ticks
+        self._history_format = history_format if history_format is not None else history.HistoryFormat()
+        self._stream_writer = None
+        self._background_writer = history.BackgroundHistoryWriter() if background_save else None
         self.reset()
     
     @property
@@ -48,9 +306,28 @@ class EntitiesHistoryLoader:
     def disabled(self, value: bool) -> None:
         self._disable = value
 
+    @property
+    def stream(self) -> bool:
+        return self._stream
+
+    @property
+    def changes_only(self) -> bool:
+        return self._changes_only
+
     def reset(self) -> None:
-        self._history_npd = {}
+        if self._stream_writer is not None:
+            self._stream_writer.flush()
+        self._history_buffers: typing.Dict[str, history.HistoryBuffer] = {}
+        self._tick_index = None
         self._output_subdir = os.path.join(self._output_dir, datetime.datetime.now().strftime("%m%d%Y%H%M%S"))
+        self._stream_writer = None
+        if self._stream:
+            self._stream_writer = history.HistoryStreamWriter(
+                os.path.join(self._output_subdir, history.STREAM_FILENAME),
+                max_memory_bytes=self._max_memory_bytes,
+                changes_only=self._changes_only,
+                keyframe_ticks=self._keyframe_ticks,
+            )
     
     def add(
         self,
@@ -62,67 +339,141 @@ class EntitiesHistoryLoader:
     ) -> None:
         if self._disable:
             return
-        history_np = np.array([tick, *pos.vector, *dir.vector, entity_type.value])
-        if entity_name not in self._history_npd:
-            self._history_npd[entity_name] = history_np[np.newaxis, :]
+        self._tick_index = None
+        self._add_row(entity_name, tick, pos.x, pos.y, dir.x, dir.y, entity_type.value)
+
+    def add_many(
+        self,
+        entity_names: typing.List[str],
+        ticks: np.ndarray,
+        positions: np.ndarray,
+        directions: np.ndarray,
+        types: np.ndarray,
+    ) -> None:
+        """Record one row for each entity, from columns of the entity store."""
+        if self._disable or len(entity_names) == 0:
+            return
+        self._tick_index = None
+        for entity_name, tick, (x, y), (dx, dy), type_value in zip(
+            entity_names,
+            ticks.tolist(),
+            positions.tolist(),
+            directions.tolist(),
+            types.tolist(),
+        ):
+            self._add_row(entity_name, tick, x, y, dx, dy, type_value)
+
+    def _add_row(
+        self, entity_name: str, tick: int, x: float, y: float, dx: float, dy: float, type_value: int
+    ) -> None:
+        if self._stream_writer is not None:
+            self._stream_writer.append(entity_name, tick, x, y, dx, dy, type_value)
+            return
+        history_buffer = self._history_buffers.get(entity_name)
+        if history_buffer is None:
+            history_buffer = history.HistoryBuffer()
+            self._history_buffers[entity_name] = history_buffer
+        if self._changes_only:
+            history_buffer.record(tick, x, y, dx, dy, type_value)
         else:
-            if tick in self._history_npd[entity_name][:, 0]:
-                raise Exception("tick %i has already been added")
-            self._history_npd[entity_name] = np.vstack(
-                (self._history_npd[entity_name], history_np)
-            )
+            history_buffer.append(tick, x, y, dx, dy, type_value)
 
     def save(self) -> None:
         if self._disable:
             return
         self._logger.info(f"Save simulation history at {self._output_subdir}")
-        os.makedirs(self._output_subdir, exist_ok=True)
-        with open(
-            os.path.join(self._output_subdir, f"entities_history.npz"), "wb"
-        ) as entity_file:
-            np.savez_compressed(entity_file, **self._history_npd)
+        if self._stream_writer is not None:
+            self._stream_writer.flush()
+            return
+        # Rows are only appended to the buffers, the saved views stay unchanged while the recording continues.
+        save_args = (
+            os.path.join(self._output_subdir, history.HISTORY_FILENAME),
+            {
+                entity_name: history_buffer.rows
+                for entity_name, history_buffer in self._history_buffers.items()
+            },
+            self._history_format,
+            self._changes_only,
+        )
+        if self._background_writer is not None:
+            self._background_writer.submit(history.write_compact, *save_args)
+        else:
+            history.write_compact(*save_args)
+
+    def wait(self) -> None:
+        """Wait until the histories saved in the background are written."""
+        if self._background_writer is not None:
+            self._background_writer.wait()
 
     def load(self, filepath: str) -> None:
+        self._tick_index = None
+        if filepath.endswith(history.STREAM_FILENAME):
+            for entity_name, entity_rows in history.read_stream(filepath).items():
+                self._history_buffers[entity_name] = history.HistoryBuffer.from_rows(
+                    entity_rows
+                )
+            return
         with open(filepath, "rb") as f:
             npz_file = np.load(f)
-            for entity_name in npz_file.files:
-                self._history_npd[entity_name] = npz_file[entity_name]
+            if history.SCHEMA_KEY in npz_file.files:
+                entities_rows, changes_only = history.read_compact(npz_file)
+            else:
+                # History saved with one array per entity.
+                entities_rows = {entity_name: npz_file[entity_name] for entity_name in npz_file.files}
+                changes_only = False
+        for entity_name, entity_rows in entities_rows.items():
+            if changes_only and not self._changes_only:
+                entity_rows = history.expand_rows(entity_rows)
+            self._history_buffers[entity_name] = history.HistoryBuffer.from_rows(
+                entity_rows
+            )
 
     def get_history(self, entity_name: str):
-        return self._history_npd.get(entity_name, None)
+        history_buffer = self._history_buffers.get(entity_name, None)
+        if history_buffer is None:
+            return None
+        if self._changes_only:
+            return history.expand_rows(history_buffer.rows)
+        return history_buffer.rows
 
     def get_total_ticks(self) -> int:
         total_ticks = 0
-        for entity_np in self._history_npd.values():
-            total_ticks = int(np.amax(entity_np[:, 0], initial=total_ticks))
+        for history_buffer in self._history_buffers.values():
+            if len(history_buffer):
+                total_ticks = max(total_ticks, history_buffer.last_tick)
         return total_ticks
 
+    def get_tick_index(self) -> history.TickIndex:
+        if self._tick_index is None:
+            self._tick_index = history.TickIndex.from_entities_rows(
+                {
+                    entity_name: self.get_history(entity_name)
+                    for entity_name in self._history_buffers
+                }
+            )
+        return self._tick_index
+
     def get_timed_history(self) -> tuple[dict, tuple[int, int, int, int]]:
-        total_ticks = self.get_total_ticks()
+        tick_index = self.get_tick_index()
         timed_history_dict = {}
-        max_x, max_y, min_x, min_y = 0, 0, 10000, 10000
-        for tick in range(total_ticks + 1):
-            timed_history_dict[tick] = {}
-            for entity_name, entity_np in self._history_npd.items():
-                event_np = entity_np[entity_np[:, 0] == tick]
-                if len(event_np) == 0:
-                    continue
-                if len(event_np) != 1:
-                    raise Exception("Multiple position logged for tick %i", tick)
-                event_np = np.squeeze(event_np)
-                timed_history_dict[tick][entity_name] = {
-                    "position": event_np[1:3],
-                    "direction": event_np[3:5],
-                    "type": event_np[5],
+        for tick in range(tick_index.total_ticks + 1):
+            frame = tick_index.frame(tick)
+            timed_history_dict[tick] = {
+                entity_name: {
+                    "position": position,
+                    "direction": direction,
+                    "type": entity_type,
                 }
-                max_x = max(max_x, event_np[1])
-                max_y = max(max_y, event_np[2])
-                min_x = min(min_x, event_np[1])
-                min_y = min(min_y, event_np[2])
-        return timed_history_dict, (min_x, min_y, max_x, max_y)
+                for entity_name, position, direction, entity_type in zip(
+                    frame.names.tolist(), frame.positions, frame.directions, frame.types
+                )
+            }
+        return timed_history_dict, tick_index.bounds
 
 
 class EntityObject:
+    _logger = LazyLogger()
+
     def __init__(
         self,
         pos: math_utils.Vector2D,
@@ -130,7 +481,6 @@ class EntityObject:
         name: str,
         entity_type: EntityType,
     ) -> None:
-        self._logger = logging.getLogger(__class__.__name__)
         self._name = name
         self._entity_type = entity_type
         if dir.magnitude() == 0.0:
@@ -167,64 +517,139 @@ class EntityObject:
 
 
 class BaseEntity(EntityObject):
+    _logger = LazyLogger()
+
     def __init__(
         self,
         pos: math_utils.Vector2D,
         dir: math_utils.Vector2D,
         tick: int,
         history: EntitiesHistoryLoader,
+        store: EntityStore,
         entity_type: EntityType = EntityType.FOOD,
         max_speed: float = 1.0,
         max_angle: float = 0.02,  # radians
         name: str = "entity",
     ) -> None:
-        super().__init__(pos, dir, name, entity_type)
-        self._logger = logging.getLogger(__class__.__name__)
+        # The entity state lives in the store, the object is only a handle on its slot.
+        self._store = store
+        self._slot = self._store.allocate(entity_type, max_speed, max_angle, tick)
+        try:
+            super().__init__(pos, dir, name, entity_type)
+        except ZeroDirectionVectorException:
+            self._store.release(self._slot)
+            raise
+        self._initial_max_speed = max_speed
+        self._initial_max_angle = max_angle
 
         self._next_position = pos
         self._next_direction = dir
-        self._max_speed = max_speed
-        self.max_angle = max_angle
 
         # Initialise entity history at tick -1
         self._history = history
         self._history.add(self._name, tick - 1, pos, dir, entity_type)
-        self._tick = tick
+
+    def _new_name(self) -> str:
+        """Name of the entity when respawned."""
+        return self._name
+
+    def respawn(
+        self,
+        pos: math_utils.Vector2D,
+        dir: math_utils.Vector2D,
+        tick: int,
+        history: EntitiesHistoryLoader,
+    ) -> None:
+        """Reset a killed entity in place on a new slot of its store, as if newly created, with a new name."""
+        if dir.magnitude() == 0.0:
+            self._logger.error("direction vector cannot be [0, 0]")
+            raise ZeroDirectionVectorException
+        self._slot = self._store.allocate(
+            self._entity_type, self._initial_max_speed, self._initial_max_angle, tick
+        )
+        self._name = self._new_name()
+        self._direction = dir.normalize()
+        self._position = pos
+        self._next_position = pos
+        self._next_direction = dir
+        self._history = history
+        self._history.add(self._name, tick - 1, pos, dir, self._entity_type)
+
+    @property
+    def store(self) -> EntityStore:
+        return self._store
+
+    @property
+    def slot(self) -> int:
+        return self._slot
+
+    @property
+    def _position(self) -> math_utils.Vector2D:
+        return math_utils.Vector2D(*self._store.positions[self._slot])
+
+    @_position.setter
+    def _position(self, value: math_utils.Vector2D) -> None:
+        self._store.set_position(self._slot, (value.x, value.y))
+
+    @property
+    def _direction(self) -> math_utils.Vector2D:
+        return math_utils.Vector2D(*self._store.directions[self._slot])
+
+    @_direction.setter
+    def _direction(self, value: math_utils.Vector2D) -> None:
+        self._store.directions[self._slot] = (value.x, value.y)
+
+    @property
+    def _next_position(self) -> math_utils.Vector2D:
+        return math_utils.Vector2D(*self._store.next_positions[self._slot])
+
+    @_next_position.setter
+    def _next_position(self, value: math_utils.Vector2D) -> None:
+        self._store.next_positions[self._slot] = (value.x, value.y)
+
+    @property
+    def _next_direction(self) -> math_utils.Vector2D:
+        return math_utils.Vector2D(*self._store.next_directions[self._slot])
+
+    @_next_direction.setter
+    def _next_direction(self, value: math_utils.Vector2D) -> None:
+        self._store.next_directions[self._slot] = (value.x, value.y)
+
+    @property
+    def _max_speed(self) -> float:
+        return float(self._store.max_speeds[self._slot])
+
+    @property
+    def max_angle(self) -> float:
+        return float(self._store.max_angles[self._slot])
+
+    @max_angle.setter
+    def max_angle(self, value: float) -> None:
+        self._store.max_angles[self._slot] = value
+
+    @property
+    def _tick(self) -> int:
+        return int(self._store.ticks[self._slot])
+
+    @_tick.setter
+    def _tick(self, value: int) -> None:
+        self._store.ticks[self._slot] = value
 
     def rotate(self, angle: float) -> None:
-        """Rotate the entity by the given angle in radians."""
-        # Check max angle
-        if abs(angle) > self.max_angle:
-            angle = self.max_angle if angle > 0 else -self.max_angle
-        # Calculate direction
-        self._next_direction = self._direction.rotate(angle).normalize()
+        """Rotate the entity by the given angle in radians, clamped to its max angle, when integrated."""
+        self._store.set_rotate_intent(self._slot, angle)
 
     def move(self, mov: math_utils.Vector2D) -> None:
-        """Move the entity by the given movement vector."""
-        movement = copy.copy(mov)
-        # Check max speed.
-        movement_distance = mov.magnitude()
-        if movement_distance > self._max_speed:
-            movement_distance = self._max_speed
-
-        # Check max angle
-        movement_angle = movement.angle_between(self._direction)
-        self.rotate(movement_angle)
-
-        # Calculate movement
-        self._next_position = self._position.add(
-            self._next_direction.scale(movement_distance)
-        )
+        """Move the entity by the given movement vector, clamped to its max speed and angle, when integrated."""
+        self._store.set_move_intent(self._slot, (mov.x, mov.y))
 
     def flush_move(self) -> None:
         """Flush the movement to the entity."""
+        self._store.intents[self._slot] = Intent.NONE
         self._next_position = self._position
         self._next_direction = self._direction
 
-    def update(self) -> None:
-        """Update the entity position and direction with the next position and direction."""
-        self._position = self._next_position
-        self._direction = self._next_direction
+    def record_history(self) -> None:
         self._history.add(
             self._name,
             self._tick,
@@ -232,6 +657,13 @@ class BaseEntity(EntityObject):
             self._direction,
             self._entity_type,
         )
+
+    def update(self) -> None:
+        """Update the entity position and direction with the next position and direction."""
+        slots = np.array([self._slot])
+        self._store.integrate(slots)
+        self._store.commit(slots)
+        self.record_history()
         self._tick += 1
 
 
@@ -242,9 +674,8 @@ class Creature(BaseEntity):
         dir: math_utils.Vector2D,
         tick: int,
         history: EntitiesHistoryLoader,
+        store: EntityStore,
     ) -> None:
-        global ENTITY_INDEXER
-        name = f"creature_{ENTITY_INDEXER.index}"
         super().__init__(
             pos,
             dir,
@@ -253,16 +684,23 @@ class Creature(BaseEntity):
             entity_type=EntityType.CREATURE,
             max_speed=2.0,
             max_angle=0.02,
-            name=name,
+            name=self._new_name(),
+            store=store,
         )
 
+    def _new_name(self) -> str:
+        global ENTITY_INDEXER
+        return f"creature_{ENTITY_INDEXER.index}"
+
 
 class Food(BaseEntity):
     def __init__(
-        self, pos: math_utils.Vector2D, tick: int, history: EntitiesHistoryLoader
+        self,
+        pos: math_utils.Vector2D,
+        tick: int,
+        history: EntitiesHistoryLoader,
+        store: EntityStore,
     ) -> None:
-        global ENTITY_INDEXER
-        name = f"food_{ENTITY_INDEXER.index}"
         super().__init__(
             pos,
             math_utils.Vector2D(1.0, 0.0),
@@ -271,25 +709,111 @@ class Food(BaseEntity):
             entity_type=EntityType.FOOD,
             max_speed=0.0,
             max_angle=0.02,
-            name=name,
+            name=self._new_name(),
+            store=store,
         )
 
+    def _new_name(self) -> str:
+        global ENTITY_INDEXER
+        return f"food_{ENTITY_INDEXER.index}"
+
+    def respawn(
+        self,
+        pos: math_utils.Vector2D,
+        tick: int,
+        history: EntitiesHistoryLoader,
+    ) -> None:
+        super().respawn(pos, math_utils.Vector2D(1.0, 0.0), tick, history)
+
+
+class EntityPool:
+    """Entities killed from their groups, kept to be respawned instead of creating new ones."""
+
+    def __init__(self, max_size: int = 4096) -> None:
+        self._max_size = max_size
+        self._entities: typing.Dict[type, typing.List[BaseEntity]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(pooled_entities) for pooled_entities in self._entities.values())
+
+    def __iter__(self) -> typing.Iterator[BaseEntity]:
+        for pooled_entities in self._entities.values():
+            yield from tuple(pooled_entities)
+
+    def put(self, entity: BaseEntity) -> None:
+        pooled_entities = self._entities.setdefault(type(entity), [])
+        if len(pooled_entities) < self._max_size:
+            pooled_entities.append(entity)
+
+    def get(self, entity_class: type) -> typing.Optional[BaseEntity]:
+        """A killed entity of the given class to respawn, None if there is none."""
+        pooled_entities = self._entities.get(entity_class)
+        if not pooled_entities:
+            return None
+        return pooled_entities.pop()
+
+    def clear(self) -> None:
+        self._entities = {}
+
+
+@dataclass
+class EntityGroupSnapshot:
+    """Entity lists of a group and its sub-groups, and the name and slot of their entities."""
+
+    group_entities: typing.List[
+        typing.Tuple["EntityGroup", typing.List[EntityObject], typing.Optional["EntityGroupView"]]
+    ]
+    entity_handles: typing.List[typing.Tuple[BaseEntity, str, int]]
+
+    @property
+    def entities(self) -> typing.List[BaseEntity]:
+        return [entity for entity, _, _ in self.entity_handles]
+
+
+@dataclass
+class EntityGroupView:
+    """Entities of a group and its sub-groups, flattened and partitioned by type."""
+
+    entities: typing.List[EntityObject]
+    slots: np.ndarray
+    type_entities: typing.Dict[EntityType, typing.List[EntityObject]]
+    type_slots: typing.Dict[EntityType, np.ndarray]
+    # Names and slots of the entities recorded by each history loader.
+    histories: typing.List[typing.Tuple[EntitiesHistoryLoader, typing.List[str], np.ndarray]]
+
 
 class EntityGroup(EntityObject):
-    def __init__(self, entity_list: typing.List[EntityObject], name: str) -> None:
+    _logger = LazyLogger()
+
+    def __init__(
+        self,
+        entity_list: typing.List[EntityObject],
+        name: str,
+        store: EntityStore,
+    ) -> None:
         super().__init__(
             math_utils.Vector2D(),
             math_utils.Vector2D(1.0, 0.0),
             name,
             EntityType.NOTHING,
         )
-        self._logger = logging.getLogger(__class__.__name__)
+        self._store = store
 
         for entity in entity_list:
             if not self._valid_entity(entity):
                 return
         self._entity_list = entity_list
         self._name = name
+        # Positions in the entity list by name, and by slot for the entities which are not groups.
+        self._name_indices: typing.Dict[str, int] = {}
+        self._slot_indices: typing.Dict[int, int] = {}
+        self._sub_groups: typing.List[EntityGroup] = []
+        # Groups containing this group, their views are invalidated with the view of this group.
+        self._parent_groups: typing.List[EntityGroup] = []
+        self._view = None
+        self._slot_mask = None
+        for entity_idx, entity in enumerate(entity_list):
+            self._index_entity(entity, entity_idx)
 
     def __str__(self):
         return f"EntityGroup('{self.name}', {self._entity_list})"
@@ -297,17 +821,9 @@ class EntityGroup(EntityObject):
     def __repr__(self):
         return f"EntityGroup('{self.name}', {self._entity_list})"
 
-    def __iter__(self):
-        self._num_entity = len(self._entity_list)
-        self._entity_idx = 0
-        return self
-
-    def __next__(self) -> EntityObject:
-        if self._entity_idx >= self._num_entity:
-            raise StopIteration
-        entity = self._entity_list[self._entity_idx]
-        self._entity_idx += 1
-        return entity
+    def __iter__(self) -> typing.Iterator[EntityObject]:
+        # Iterate over a copy, entities killed while iterating do not make others skipped.
+        yield from tuple(self._entity_list)
 
     def __len__(self) -> int:
         return len(self._entity_list)
@@ -316,16 +832,121 @@ class EntityGroup(EntityObject):
         if type(item) is int:
             return self._entity_list[item]
         if type(item) is str:
-            for entity in self._entity_list:
-                if item == entity.name:
-                    return entity
-            raise KeyError("Name {} not found in entities".format(item))
+            entity_idx = self._name_indices.get(item)
+            if entity_idx is None:
+                raise KeyError("Name {} not found in entities".format(item))
+            return self._entity_list[entity_idx]
         else:
             raise TypeError("Cannot index with {}".format(type(item)))
 
     def keys(self):
         return [entity.name for entity in self._entity_list]
 
+    @property
+    def store(self) -> EntityStore:
+        return self._store
+
+    def view(self) -> EntityGroupView:
+        """Flattened view of the group, cached until an entity is added to or killed from the group."""
+        if self._view is None:
+            view_entities = []
+            for entity in self._entity_list:
+                if type(entity) is EntityGroup:
+                    view_entities.extend(entity.view().entities)
+                else:
+                    view_entities.append(entity)
+            slots = np.array([entity.slot for entity in view_entities], dtype=np.int64)
+            types = self._store.types[slots]
+            type_entities = {}
+            type_slots = {}
+            for entity_type in EntityType:
+                if entity_type is EntityType.NOTHING:
+                    continue
+                type_mask = types == entity_type.value
+                type_entities[entity_type] = [
+                    entity for entity, is_type in zip(view_entities, type_mask) if is_type
+                ]
+                type_slots[entity_type] = slots[type_mask]
+                type_slots[entity_type].flags.writeable = False
+            slots.flags.writeable = False
+            history_entities = {}
+            for entity, slot in zip(view_entities, slots.tolist()):
+                _, names, history_slots = history_entities.setdefault(
+                    id(entity._history), (entity._history, [], [])
+                )
+                names.append(entity.name)
+                history_slots.append(slot)
+            histories = [
+                (history_loader, names, np.array(history_slots, dtype=np.int64))
+                for history_loader, names, history_slots in history_entities.values()
+            ]
+            self._view = EntityGroupView(view_entities, slots, type_entities, type_slots, histories)
+        return self._view
+
+    def _invalidate_view(self) -> None:
+        self._view = None
+        self._slot_mask = None
+        for parent_group in self._parent_groups:
+            parent_group._invalidate_view()
+
+    def snapshot(self) -> EntityGroupSnapshot:
+        """Snapshot of the entities of the group and its sub-groups, to restore with the store snapshot."""
+        group_entities = []
+        entity_handles = {}
+        groups = [self]
+        while groups:
+            group = groups.pop()
+            group_entities.append((group, list(group._entity_list), group._view))
+            for entity in group._entity_list:
+                if type(entity) is EntityGroup:
+                    groups.append(entity)
+                else:
+                    entity_handles[id(entity)] = (entity, entity.name, entity.slot)
+        return EntityGroupSnapshot(group_entities, list(entity_handles.values()))
+
+    def restore(self, snapshot: EntityGroupSnapshot) -> None:
+        """Put back the entities of the groups of the snapshot, with their names and slots."""
+        for entity, name, slot in snapshot.entity_handles:
+            entity._name = name
+            entity._slot = slot
+        for group, _, _ in snapshot.group_entities:
+            group._parent_groups = []
+        for group, entity_list, view in snapshot.group_entities:
+            group._entity_list = list(entity_list)
+            group._name_indices = {}
+            group._slot_indices = {}
+            group._sub_groups = []
+            for entity_idx, entity in enumerate(group._entity_list):
+                group._index_entity(entity, entity_idx)
+            group._view = view
+            group._slot_mask = None
+
+    def slots(self, entity_type: typing.Optional[EntityType] = None) -> np.ndarray:
+        """Store slots of every entity in the group and its sub-groups, or only of the given type."""
+        if entity_type is None:
+            return self.view().slots
+        return self.view().type_slots[entity_type]
+
+    def slot_mask(self) -> np.ndarray:
+        """Boolean mask over the store slots, true for the entities of the group."""
+        if self._slot_mask is None or len(self._slot_mask) != self._store.size:
+            self._slot_mask = np.zeros(self._store.size, dtype=np.bool_)
+            self._slot_mask[self.slots()] = True
+            self._slot_mask.flags.writeable = False
+        return self._slot_mask
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self._store.positions[self.slots()]
+
+    @property
+    def directions(self) -> np.ndarray:
+        return self._store.directions[self.slots()]
+
+    @property
+    def types(self) -> np.ndarray:
+        return self._store.types[self.slots()]
+
     def _valid_entity(self, entity) -> bool:
         if not issubclass(type(entity), EntityObject):
             self._logger.error(
@@ -334,21 +955,91 @@ class EntityGroup(EntityObject):
                 )
             )
             return False
+        if entity.store is not self._store:
+            self._logger.error(
+                "Entity {} does not belong to the store of group {}".format(
+                    entity.name, self.name
+                )
+            )
+            return False
         return True
 
+    def _release(self, entity: EntityObject) -> None:
+        if type(entity) is EntityGroup:
+            for sub_entity in entity:
+                entity._release(sub_entity)
+            return
+        self._store.release(entity.slot)
+        if self._store.entity_pool is not None:
+            self._store.entity_pool.put(entity)
+
+    def _index_entity(self, entity: EntityObject, entity_idx: int) -> None:
+        self._name_indices[entity.name] = entity_idx
+        if type(entity) is EntityGroup:
+            self._sub_groups.append(entity)
+            entity._parent_groups.append(self)
+        else:
+            self._slot_indices[entity.slot] = entity_idx
+
+    def _remove(self, entity_idx: int) -> EntityObject:
+        """Remove the entity at the given index, the last entity takes its place."""
+        entity = self._entity_list[entity_idx]
+        last_entity = self._entity_list.pop()
+        del self._name_indices[entity.name]
+        if type(entity) is EntityGroup:
+            self._sub_groups.remove(entity)
+            entity._parent_groups.remove(self)
+        else:
+            del self._slot_indices[entity.slot]
+        if entity_idx < len(self._entity_list):
+            self._entity_list[entity_idx] = last_entity
+            self._name_indices[last_entity.name] = entity_idx
+            if type(last_entity) is not EntityGroup:
+                self._slot_indices[last_entity.slot] = entity_idx
+        self._invalidate_view()
+        return entity
+
     def add(self, entity) -> None:
         if not self._valid_entity(entity):
             return
         self._entity_list.append(entity)
+        self._index_entity(entity, len(self._entity_list) - 1)
+        self._invalidate_view()
 
     def update(self) -> None:
-        for entity in self._entity_list:
-            entity.update()
+        """Integrate and commit the movements of every entity of the group and its sub-groups at once."""
+        slots = self.slots()
+        self._store.integrate(slots)
+        self._store.commit(slots)
+        for history_loader, names, history_slots in self.view().histories:
+            history_loader.add_many(
+                names,
+                self._store.ticks[history_slots],
+                self._store.positions[history_slots],
+                self._store.directions[history_slots],
+                self._store.types[history_slots],
+            )
+        self._store.ticks[slots] += 1
 
     def kill(self, entity_idx: int) -> None:
         if entity_idx < 0 or entity_idx >= len(self._entity_list):
             raise IndexError("Index {} out of range in list {}".format(entity_idx, self._entity_list))
-        self._entity_list.pop(entity_idx)
+        self._release(self._remove(entity_idx))
+
+    def kill_slots(self, slots: np.ndarray) -> None:
+        """Kill the entities of the group and its sub-groups stored at the given slots."""
+        if len(slots) == 0:
+            return
+        for sub_group in self._sub_groups:
+            sub_group.kill_slots(slots)
+        entities_idx = [
+            self._slot_indices[slot]
+            for slot in np.asarray(slots).tolist()
+            if slot in self._slot_indices
+        ]
+        # Remove from the end, the entities moved in place of the removed ones are never killed after.
+        for entity_idx in sorted(entities_idx, reverse=True):
+            self._release(self._remove(entity_idx))
 
     def kills(self, entities_idx: list[int]) -> None:
         entities_idx.sort(reverse=True)
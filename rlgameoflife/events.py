@@ -1,4 +1,9 @@
+from dataclasses import dataclass
 import enum
+import heapq
+import logging
+import random
+import typing
 
 
 class TickCounter:
@@ -21,10 +26,24 @@ class EventType(enum.Enum):
 
 
 class TickEvent:
-    def __init__(self, event_type: EventType, tick: int) -> None:
+    """Event triggered once at a tick, or every period ticks from that tick.
+
+    The period of a jittered event is drawn in [period - jitter, period + jitter] at each trigger.
+    """
+
+    def __init__(
+        self,
+        event_type: EventType,
+        tick: int,
+        period: typing.Optional[int] = None,
+        jitter: int = 0,
+    ) -> None:
         self._event_type = event_type
         self._tick = tick
-        self._tick_counter = TickCounter()
+        self._period = period
+        self._jitter = jitter
+        self._cancelled = False
+        self._initial = False
 
     @property
     def event_type(self):
@@ -33,35 +52,169 @@ class TickEvent:
     @property
     def tick(self):
         return self._tick
-    
-    def reset(self) -> None:
-        self._tick_counter.reset()
 
-    def trigger(self):
-        return self._tick == self._tick_counter.tick
+    @property
+    def period(self):
+        return self._period
 
-    def update(self):
-        self._tick_counter.update()
-        if self._tick < self._tick_counter.tick:
-            self._tick_counter.reset()
+    @property
+    def jitter(self):
+        return self._jitter
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    @property
+    def initial(self):
+        """Scheduled before the clock first advanced, rearmed by each reset."""
+        return self._initial
+
+    def next_tick(self, trigger_tick: int, rng: random.Random) -> typing.Optional[int]:
+        """Tick of the next trigger after the one at trigger_tick, None for a one-shot event."""
+        if self._period is None:
+            return None
+        period = self._period
+        if self._jitter:
+            period += rng.randint(-self._jitter, self._jitter)
+        return trigger_tick + max(period, 1)
+
+
+@dataclass
+class TickEventsSnapshot:
+    tick: int
+    events: typing.List[typing.Tuple[TickEvent, bool]]
+    heap: list
+    triggered_tick: typing.Optional[int]
+    triggered: typing.List[TickEvent]
 
 
 class TickEvents:
+    """Scheduler of the tick events, a heap of the events keyed by the tick of their next trigger.
+
+    Only the events triggered at a tick are visited, whatever the number of scheduled events.
+    The events scheduled before the clock first advances are the initial schedule, rearmed by each reset. The events
+    scheduled later only last until the next reset, and their one-shots are dropped once triggered.
+    """
+
     _event_list: list[TickEvent]
-    
-    def __init__(self) -> None:
+
+    def __init__(self, rng: typing.Optional[random.Random] = None) -> None:
+        self._logger = logging.getLogger(__class__.__name__)
+        self._rng = rng if rng is not None else random.Random()
         self._event_list = []
-    
-    def reset(self) -> None:
-        for event in self._event_list:
-            event.reset()
+        self._tick_counter = TickCounter()
+        self._heap = []
+        self._next_event_idx = 0
+        self._started = False
+        self._triggered_tick = None
+        self._triggered = []
 
-    def add_tick_event(self, event_type: EventType, tick: int):
-        self._event_list.append(TickEvent(event_type, tick))
+    @property
+    def tick(self) -> int:
+        return self._tick_counter.tick
+
+    def __len__(self) -> int:
+        return len(self._event_list)
+
+    def reset(self) -> None:
+        """Restart the counter and reschedule every initial event not cancelled at its first tick."""
+        self._tick_counter.reset()
+        self._event_list = [
+            event for event in self._event_list if event.initial and not event.cancelled
+        ]
+        self._heap = [
+            (event.tick, event_idx, event) for event_idx, event in enumerate(self._event_list)
+        ]
+        heapq.heapify(self._heap)
+        self._next_event_idx = len(self._event_list)
+        self._triggered_tick = None
+        self._triggered = []
+
+    def snapshot(self) -> TickEventsSnapshot:
+        return TickEventsSnapshot(
+            tick=self.tick,
+            events=[(event, event.cancelled) for event in self._event_list],
+            heap=list(self._heap),
+            triggered_tick=self._triggered_tick,
+            triggered=list(self._triggered),
+        )
+
+    def restore(self, snapshot: TickEventsSnapshot) -> None:
+        """Put back the counter and the schedule of the snapshot, the events scheduled since are dropped."""
+        self._tick_counter._tick = snapshot.tick
+        self._event_list = []
+        for event, cancelled in snapshot.events:
+            event._cancelled = cancelled
+            self._event_list.append(event)
+        self._heap = list(snapshot.heap)
+        self._triggered_tick = snapshot.triggered_tick
+        self._triggered = list(snapshot.triggered)
+
+    def schedule(
+        self,
+        event_type: EventType,
+        tick: int,
+        period: typing.Optional[int] = None,
+        jitter: int = 0,
+    ) -> TickEvent:
+        """Schedule an event at an absolute tick, repeated every period ticks if a period is given."""
+        if tick < self.tick:
+            self._logger.warning("event %s scheduled at past tick %d", event_type, tick)
+        event = TickEvent(event_type, tick, period, jitter)
+        event._initial = not self._started
+        # The index breaks the ties between the events of a same tick.
+        heapq.heappush(self._heap, (tick, self._next_event_idx, event))
+        self._next_event_idx += 1
+        self._event_list.append(event)
+        return event
+
+    def schedule_in(
+        self,
+        event_type: EventType,
+        delay: int,
+        period: typing.Optional[int] = None,
+        jitter: int = 0,
+    ) -> TickEvent:
+        """Schedule an event delay ticks after the current tick."""
+        return self.schedule(event_type, self.tick + delay, period, jitter)
+
+    def add_tick_event(self, event_type: EventType, tick: int) -> TickEvent:
+        """Schedule an event triggered at tick then every tick + 1 ticks."""
+        return self.schedule(event_type, tick, period=tick + 1)
+
+    def cancel(self, event: TickEvent) -> None:
+        """Cancel the event, it is dropped from the heap when it reaches the top."""
+        event._cancelled = True
+
+    def _pop_triggered(self) -> None:
+        tick = self.tick
+        if self._triggered_tick == tick:
+            return
+        triggered = []
+        while self._heap and self._heap[0][0] <= tick:
+            trigger_tick, event_idx, event = heapq.heappop(self._heap)
+            if event.cancelled:
+                if not event.initial:
+                    self._event_list.remove(event)
+                continue
+            if trigger_tick == tick:
+                triggered.append(event)
+            next_tick = event.next_tick(trigger_tick, self._rng)
+            while next_tick is not None and next_tick < tick:
+                next_tick = event.next_tick(next_tick, self._rng)
+            if next_tick is not None:
+                heapq.heappush(self._heap, (next_tick, event_idx, event))
+            elif not event.initial:
+                self._event_list.remove(event)
+        self._triggered_tick = tick
+        self._triggered = triggered
 
     def get(self) -> list[EventType]:
-        return [event.event_type for event in self._event_list if event.trigger()]
+        self._pop_triggered()
+        return [event.event_type for event in self._triggered if not event.cancelled]
 
     def update(self) -> None:
-        for event in self._event_list:
-            event.update()
+        self._pop_triggered()
+        self._tick_counter.update()
+        self._started = True
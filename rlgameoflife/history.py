@@ -0,0 +1,736 @@
+from concurrent import futures
+from dataclasses import dataclass
+import enum
+import logging
+import os
+import typing
+import zipfile
+
+import numpy as np
+
+
+# Each history row is [tick, x, y, dx, dy, type].
+HISTORY_COLUMNS = 6
+HISTORY_DTYPE = np.float32
+
+
+class TickNotIncreasingException(Exception):
+    """raised when a tick is not after the last tick recorded"""
+
+
+def expand_rows(rows: np.ndarray) -> np.ndarray:
+    """Expand change only rows to one row per tick, each tick keeping the state of its last row.
+
+    Rows already holding every tick are returned as is.
+    """
+    if len(rows) == 0:
+        return rows
+    ticks = rows[:, 0].astype(np.int64)
+    if ticks[-1] - ticks[0] + 1 == len(rows):
+        return rows
+    dense_ticks = np.arange(ticks[0], ticks[-1] + 1)
+    dense_rows = rows[np.searchsorted(ticks, dense_ticks, side="right") - 1]
+    dense_rows[:, 0] = dense_ticks
+    return dense_rows
+
+
+def _expand_stream_rows(rows: np.ndarray) -> np.ndarray:
+    """Expand change only stream rows to one row per tick of each entity, sorted by entity and tick."""
+    if len(rows) == 0:
+        return rows
+    entity_ids = rows[:, 0].astype(np.int64)
+    ticks = rows[:, 1].astype(np.int64)
+    order = np.lexsort((ticks, entity_ids))
+    rows, entity_ids, ticks = rows[order], entity_ids[order], ticks[order]
+    next_ticks = np.append(ticks[1:], 0)
+    last_rows = np.append(entity_ids[1:] != entity_ids[:-1], True)
+    next_ticks[last_rows] = ticks[last_rows] + 1
+    repeats = next_ticks - ticks
+    if np.all(repeats == 1):
+        return rows
+    dense_rows = np.repeat(rows, repeats, axis=0)
+    run_starts = np.repeat(np.cumsum(repeats) - repeats, repeats)
+    dense_rows[:, 1] = np.repeat(ticks, repeats) + np.arange(len(dense_rows)) - run_starts
+    return dense_rows
+
+
+class HistoryBuffer:
+    """Preallocated rows of the history of one entity, growing geometrically.
+
+    Rows are either recorded on every tick with append, or only when the state changes with record.
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        self._rows = np.empty((max(1, capacity), HISTORY_COLUMNS), dtype=HISTORY_DTYPE)
+        self._length = 0
+        self._last_tick = None
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray) -> "HistoryBuffer":
+        history_buffer = cls(capacity=len(rows))
+        history_buffer._rows[: len(rows)] = rows
+        history_buffer._length = len(rows)
+        if len(rows):
+            history_buffer._last_tick = int(rows[-1, 0])
+        return history_buffer
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def rows(self) -> np.ndarray:
+        rows = self._rows[: self._length]
+        if self._length and self._last_tick > rows[-1, 0]:
+            # The state did not change since the last row, end the rows at the last tick.
+            end_row = rows[-1].copy()
+            end_row[0] = self._last_tick
+            rows = np.vstack((rows, end_row))
+        return rows
+
+    @property
+    def last_tick(self) -> int:
+        return self._last_tick
+
+    def _check_tick(self, tick: int) -> None:
+        if self._last_tick is not None and tick <= self._last_tick:
+            raise TickNotIncreasingException(
+                f"tick {tick} is not after the last recorded tick {self._last_tick}"
+            )
+
+    def record(
+        self, tick: int, x: float, y: float, dx: float, dy: float, type_value: int
+    ) -> None:
+        """Append the row only if the state changed since the last row."""
+        self._check_tick(tick)
+        if self._length and np.array_equal(
+            self._rows[self._length - 1, 1:],
+            np.array((x, y, dx, dy, type_value), dtype=HISTORY_DTYPE),
+        ):
+            self._last_tick = tick
+            return
+        self.append(tick, x, y, dx, dy, type_value)
+
+    def append(
+        self, tick: int, x: float, y: float, dx: float, dy: float, type_value: int
+    ) -> None:
+        self._check_tick(tick)
+        if self._length == len(self._rows):
+            rows = np.empty((2 * len(self._rows), HISTORY_COLUMNS), dtype=HISTORY_DTYPE)
+            rows[: self._length] = self._rows
+            self._rows = rows
+        self._rows[self._length] = (tick, x, y, dx, dy, type_value)
+        self._length += 1
+        self._last_tick = tick
+
+
+class MultipleTickRowsException(Exception):
+    """raised when an entity has multiple rows for the same tick"""
+
+
+@dataclass
+class HistoryFrame:
+    names: np.ndarray
+    positions: np.ndarray
+    directions: np.ndarray
+    types: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "HistoryFrame":
+        return cls(
+            names=np.empty(0, dtype=str),
+            positions=np.empty((0, 2), dtype=HISTORY_DTYPE),
+            directions=np.empty((0, 2), dtype=HISTORY_DTYPE),
+            types=np.empty(0, dtype=HISTORY_DTYPE),
+        )
+
+
+class TickIndex:
+    """Tick major index of the history of all entities.
+
+    The rows of all entities are packed and sorted by tick, with the offsets of each tick as in a CSR matrix,
+    so the frame of any tick is a slice.
+    """
+
+    def __init__(
+        self, names: np.ndarray, entity_ids: np.ndarray, rows: np.ndarray
+    ) -> None:
+        """Index the packed history rows, entity_ids being the index in names of the entity of each row."""
+        self._names = names
+        ticks = rows[:, 0].astype(np.int64)
+        # The sort is stable, entities keep their order inside a tick.
+        order = np.argsort(ticks, kind="stable")
+        self._ticks = ticks[order]
+        self._entity_ids = entity_ids[order]
+        rows = rows[order]
+        self._positions = rows[:, 1:3]
+        self._directions = rows[:, 3:5]
+        self._types = rows[:, 5]
+
+        same_tick_rows = (self._ticks[1:] == self._ticks[:-1]) & (
+            self._entity_ids[1:] == self._entity_ids[:-1]
+        )
+        if same_tick_rows.any():
+            tick = self._ticks[1:][same_tick_rows][0]
+            raise MultipleTickRowsException(f"Multiple position logged for tick {tick}")
+
+        self._total_ticks = int(max(self._ticks.max(initial=0), 0))
+        self._offsets = np.searchsorted(self._ticks, np.arange(self._total_ticks + 2))
+
+        # The world bounds are taken over the frames from tick 0.
+        frame_positions = self._positions[self._offsets[0] :]
+        self._bounds = (
+            min(10000, float(frame_positions[:, 0].min(initial=10000))),
+            min(10000, float(frame_positions[:, 1].min(initial=10000))),
+            max(0, float(frame_positions[:, 0].max(initial=0))),
+            max(0, float(frame_positions[:, 1].max(initial=0))),
+        )
+
+    @classmethod
+    def from_entities_rows(
+        cls, entities_rows: typing.Dict[str, np.ndarray]
+    ) -> "TickIndex":
+        rows_count = [len(entity_rows) for entity_rows in entities_rows.values()]
+        return cls(
+            np.array(list(entities_rows.keys()), dtype=str),
+            np.repeat(np.arange(len(rows_count)), rows_count),
+            np.concatenate(
+                [np.empty((0, HISTORY_COLUMNS), dtype=HISTORY_DTYPE)]
+                + list(entities_rows.values())
+            ),
+        )
+
+    @property
+    def total_ticks(self) -> int:
+        return self._total_ticks
+
+    @property
+    def bounds(self) -> typing.Tuple[float, float, float, float]:
+        """Bounds (min x, min y, max x, max y) of the positions of all frames."""
+        return self._bounds
+
+    def frame(self, tick: int) -> HistoryFrame:
+        if tick < 0 or tick > self._total_ticks:
+            raise IndexError(f"Tick {tick} out of range [0, {self._total_ticks}]")
+        start, end = self._offsets[tick], self._offsets[tick + 1]
+        return HistoryFrame(
+            names=self._names[self._entity_ids[start:end]],
+            positions=self._positions[start:end],
+            directions=self._directions[start:end],
+            types=self._types[start:end],
+        )
+
+
+HISTORY_FILENAME = "entities_history.npz"
+STREAM_FILENAME = "entities_history.stream"
+DEFAULT_STREAM_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_KEYFRAME_TICKS = 256
+
+# Each stream row is [entity id, tick, x, y, dx, dy, type].
+STREAM_COLUMNS = HISTORY_COLUMNS + 1
+
+
+def find_history_file(directory: str) -> str:
+    """Path of the history file of a simulation directory, streamed or not."""
+    stream_filepath = os.path.join(directory, STREAM_FILENAME)
+    if os.path.exists(stream_filepath):
+        return stream_filepath
+    return os.path.join(directory, HISTORY_FILENAME)
+
+
+class HistoryPrecision(enum.Enum):
+    FLOAT32 = "float32"
+    INT16 = "int16"
+
+
+class HistoryCodec(enum.Enum):
+    NONE = "none"
+    ZLIB = "zlib"
+
+
+@dataclass
+class HistoryFormat:
+    """Schema options of a saved history file."""
+
+    precision: HistoryPrecision = HistoryPrecision.FLOAT32
+    codec: HistoryCodec = HistoryCodec.ZLIB
+    # zlib compression level, from 1 (fastest) to 9 (smallest).
+    compression_level: int = 6
+
+
+class UnknownHistorySchemaException(Exception):
+    """raised when a history file was saved with an unknown schema version"""
+
+
+# Key of the history file entry holding the version of the compact schema.
+SCHEMA_KEY = "__schema__"
+SCHEMA_VERSION = 1
+_INT16_OFFSET = 32768
+_INT16_STEPS = 65535
+
+
+def _quantize_positions(positions: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Positions as int16 steps between the lowest and highest position of each axis."""
+    if len(positions) == 0:
+        return np.empty(positions.shape, dtype=np.int16), np.array([0.0, 0.0, 1.0, 1.0])
+    offset = positions.min(axis=0).astype(np.float64)
+    scale = (positions.max(axis=0) - offset) / _INT16_STEPS
+    scale[scale == 0.0] = 1.0
+    steps = np.rint((positions - offset) / scale) - _INT16_OFFSET
+    return steps.astype(np.int16), np.concatenate((offset, scale))
+
+
+def write_compact(
+    filepath: str,
+    entities_rows: typing.Dict[str, np.ndarray],
+    history_format: typing.Optional[HistoryFormat] = None,
+    changes_only: bool = False,
+) -> None:
+    """Save the history rows of each entity with the compact schema.
+
+    The names are stored once, and the rows are split in segments of a single entity and type. The ticks of a
+    segment are implicit from its start tick, or from the number of ticks each row lasts for change only rows.
+    The positions and directions are stored as float32 or quantized to int16.
+    """
+    if history_format is None:
+        history_format = HistoryFormat()
+    names = list(entities_rows.keys())
+    all_rows = [np.empty((0, HISTORY_COLUMNS), dtype=HISTORY_DTYPE)]
+    entity_ids = [np.empty(0, dtype=np.int64)]
+    for entity_id, entity_name in enumerate(names):
+        all_rows.append(entities_rows[entity_name])
+        entity_ids.append(np.full(len(entities_rows[entity_name]), entity_id))
+    rows = np.concatenate(all_rows)
+    entity_ids = np.concatenate(entity_ids)
+    ticks = rows[:, 0].astype(np.int64)
+    types = rows[:, 5].astype(np.int8)
+
+    same_entity = entity_ids[1:] == entity_ids[:-1]
+    segment_breaks = ~same_entity | (types[1:] != types[:-1])
+    arrays = {}
+    if changes_only:
+        durations = np.ones(len(rows), dtype=np.int64)
+        durations[:-1][same_entity] = np.diff(ticks)[same_entity]
+        arrays["durations"] = durations.astype(np.min_scalar_type(durations.max(initial=1)))
+    else:
+        segment_breaks |= np.diff(ticks) != 1
+    segment_starts = np.flatnonzero(np.concatenate(([len(rows) > 0], segment_breaks)))
+    arrays.update(
+        names=np.array(names, dtype=str),
+        segment_entities=entity_ids[segment_starts],
+        segment_types=types[segment_starts],
+        segment_ticks=ticks[segment_starts],
+        segment_lengths=np.diff(np.append(segment_starts, len(rows))),
+    )
+    if history_format.precision is HistoryPrecision.INT16:
+        arrays["positions"], arrays["position_quantization"] = _quantize_positions(rows[:, 1:3])
+        arrays["directions"] = np.rint(rows[:, 3:5] * np.iinfo(np.int16).max).astype(np.int16)
+    else:
+        arrays["positions"] = rows[:, 1:3].astype(np.float32)
+        arrays["directions"] = rows[:, 3:5].astype(np.float32)
+    arrays[SCHEMA_KEY] = np.array(SCHEMA_VERSION)
+
+    if history_format.codec is HistoryCodec.ZLIB:
+        compression, compression_level = zipfile.ZIP_DEFLATED, history_format.compression_level
+    else:
+        compression, compression_level = zipfile.ZIP_STORED, None
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    # Same layout as np.savez, the file is still readable with np.load.
+    with zipfile.ZipFile(filepath, "w", compression, compresslevel=compression_level) as zip_file:
+        for key, array in arrays.items():
+            with zip_file.open(f"{key}.npy", "w", force_zip64=True) as array_file:
+                np.lib.format.write_array(array_file, np.asarray(array), allow_pickle=False)
+
+
+def read_compact(npz_file) -> typing.Tuple[typing.Dict[str, np.ndarray], bool]:
+    """History rows of each entity from a loaded compact history file, and whether they are change only."""
+    if int(npz_file[SCHEMA_KEY]) != SCHEMA_VERSION:
+        raise UnknownHistorySchemaException(
+            f"history schema {int(npz_file[SCHEMA_KEY])} is not {SCHEMA_VERSION}"
+        )
+    names = npz_file["names"]
+    segment_entities = npz_file["segment_entities"]
+    segment_lengths = npz_file["segment_lengths"].astype(np.int64)
+    positions = npz_file["positions"]
+    directions = npz_file["directions"]
+    if positions.dtype == np.int16:
+        quantization = npz_file["position_quantization"]
+        positions = (positions + float(_INT16_OFFSET)) * quantization[2:] + quantization[:2]
+        directions = directions / float(np.iinfo(np.int16).max)
+
+    # Ticks of the rows after the start tick of their segment.
+    segment_first_rows = np.cumsum(segment_lengths) - segment_lengths
+    changes_only = "durations" in npz_file.files
+    if changes_only:
+        durations = npz_file["durations"].astype(np.int64)
+        elapsed_ticks = np.cumsum(durations) - durations
+    else:
+        elapsed_ticks = np.arange(len(positions))
+    tick_offsets = elapsed_ticks - np.repeat(elapsed_ticks[segment_first_rows], segment_lengths)
+    rows = np.empty((len(positions), HISTORY_COLUMNS), dtype=HISTORY_DTYPE)
+    rows[:, 0] = np.repeat(npz_file["segment_ticks"], segment_lengths) + tick_offsets
+    rows[:, 1:3] = positions
+    rows[:, 3:5] = directions
+    rows[:, 5] = np.repeat(npz_file["segment_types"], segment_lengths)
+
+    entity_ids = np.repeat(segment_entities, segment_lengths)
+    entity_starts = np.searchsorted(entity_ids, np.arange(len(names) + 1))
+    return {
+        str(entity_name): rows[entity_starts[entity_id] : entity_starts[entity_id + 1]]
+        for entity_id, entity_name in enumerate(names)
+    }, changes_only
+
+
+class HistorySaveException(Exception):
+    """raised when a history file could not be saved in the background"""
+
+
+class BackgroundHistoryWriter:
+    """Save history files on a background thread, one at a time in the order they were submitted.
+
+    The submitted rows must not be modified until saved. The errors of a save are raised by the next submit or wait.
+    """
+
+    def __init__(self) -> None:
+        self._logger = logging.getLogger(__class__.__name__)
+        self._executor = None
+        self._pending: typing.List[futures.Future] = []
+
+    @property
+    def pending(self) -> int:
+        """Number of saves not finished yet."""
+        return sum(not future.done() for future in self._pending)
+
+    def submit(self, save_function: typing.Callable, *args) -> None:
+        self._raise_errors(self._pop_done())
+        if self._executor is None:
+            self._executor = futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=__class__.__name__
+            )
+        self._pending.append(self._executor.submit(save_function, *args))
+
+    def wait(self) -> None:
+        """Wait until every submitted save is written."""
+        futures.wait(self._pending)
+        self._raise_errors(self._pop_done())
+
+    def close(self) -> None:
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _pop_done(self) -> typing.List[futures.Future]:
+        done = [future for future in self._pending if future.done()]
+        self._pending = [future for future in self._pending if not future.done()]
+        return done
+
+    def _raise_errors(self, done: typing.List[futures.Future]) -> None:
+        errors = [future.exception() for future in done if future.exception() is not None]
+        for error in errors[1:]:
+            self._logger.error("History save failed: %s", error)
+        if errors:
+            raise HistorySaveException("history save failed") from errors[0]
+
+
+class HistoryStreamWriter:
+    """Append the history rows of all entities to a file, in fixed size chunks.
+
+    Each chunk is the array of the entity names first seen in the chunk, the [first tick, last tick, keyframe ticks]
+    header of the chunk and the uncompressed array of its rows. Chunks already written stay readable if the
+    simulation crashes.
+
+    With changes_only, a row is only written when the state of the entity changes, and on the first tick of each
+    period of keyframe_ticks ticks. When a period starts, the entities unchanged since their last row also get a
+    row at the last tick they were recorded, so that a tick range can be read from the periods around it.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        max_memory_bytes: int = DEFAULT_STREAM_MEMORY_BYTES,
+        changes_only: bool = False,
+        keyframe_ticks: int = DEFAULT_KEYFRAME_TICKS,
+    ) -> None:
+        self._logger = logging.getLogger(__class__.__name__)
+        self._filepath = filepath
+        # Zero keyframe ticks marks the rows of every tick as written.
+        self._keyframe_ticks = keyframe_ticks if changes_only else 0
+        chunk_rows = max(1, max_memory_bytes // (STREAM_COLUMNS * np.dtype(HISTORY_DTYPE).itemsize))
+        self._chunk = np.empty((chunk_rows, STREAM_COLUMNS), dtype=HISTORY_DTYPE)
+        self._length = 0
+        self._entity_ids: typing.Dict[str, int] = {}
+        self._last_ticks: typing.List[int] = []
+        self._written_ticks: typing.List[int] = []
+        self._last_states: typing.List[tuple] = []
+        self._new_names: typing.List[str] = []
+        self._file_started = False
+        self._period = None
+
+    @property
+    def filepath(self) -> str:
+        return self._filepath
+
+    @property
+    def chunk_rows(self) -> int:
+        return len(self._chunk)
+
+    @property
+    def changes_only(self) -> bool:
+        return self._keyframe_ticks > 0
+
+    def append(
+        self,
+        entity_name: str,
+        tick: int,
+        x: float,
+        y: float,
+        dx: float,
+        dy: float,
+        type_value: int,
+    ) -> None:
+        entity_id = self._entity_ids.get(entity_name)
+        if entity_id is None:
+            entity_id = len(self._entity_ids)
+            self._entity_ids[entity_name] = entity_id
+            self._last_ticks.append(None)
+            self._written_ticks.append(None)
+            self._last_states.append(None)
+            self._new_names.append(entity_name)
+        last_tick = self._last_ticks[entity_id]
+        if last_tick is not None and tick <= last_tick:
+            raise TickNotIncreasingException(
+                f"tick {tick} is not after the last recorded tick {last_tick}"
+            )
+        state = tuple(np.array((x, y, dx, dy, type_value), dtype=HISTORY_DTYPE).tolist())
+        if self.changes_only:
+            period = tick // self._keyframe_ticks
+            if self._period is not None and period > self._period:
+                self._append_unchanged_rows()
+            self._period = period if self._period is None else max(self._period, period)
+            self._last_ticks[entity_id] = tick
+            if (
+                state == self._last_states[entity_id]
+                and self._written_ticks[entity_id] // self._keyframe_ticks == period
+            ):
+                return
+        self._last_ticks[entity_id] = tick
+        self._last_states[entity_id] = state
+        self._append_row(entity_id, tick, state)
+
+    def _append_row(self, entity_id: int, tick: int, state: tuple) -> None:
+        self._chunk[self._length, 0] = entity_id
+        self._chunk[self._length, 1] = tick
+        self._chunk[self._length, 2:] = state
+        self._length += 1
+        self._written_ticks[entity_id] = tick
+        if self._length == len(self._chunk):
+            self._write_chunk()
+
+    def _append_unchanged_rows(self) -> None:
+        """Write the last state of the entities unchanged since their last written row."""
+        for entity_id, (last_tick, written_tick) in enumerate(
+            zip(self._last_ticks, self._written_ticks)
+        ):
+            if last_tick is not None and last_tick != written_tick:
+                self._append_row(entity_id, last_tick, self._last_states[entity_id])
+
+    def flush(self) -> None:
+        if self.changes_only:
+            self._append_unchanged_rows()
+        self._write_chunk()
+
+    def _write_chunk(self) -> None:
+        if self._length == 0 and not self._new_names:
+            return
+        os.makedirs(os.path.dirname(self._filepath) or ".", exist_ok=True)
+        # The first chunk truncates a file left by a previous writer.
+        with open(self._filepath, "ab" if self._file_started else "wb") as stream_file:
+            chunk = self._chunk[: self._length]
+            # A chunk of new names only has no ticks, its header tick range is left at zero.
+            first_tick, last_tick = (chunk[:, 1].min(), chunk[:, 1].max()) if len(chunk) else (0, 0)
+            np.save(stream_file, np.array(self._new_names, dtype=str))
+            np.save(
+                stream_file,
+                np.array([first_tick, last_tick, self._keyframe_ticks], dtype=np.int64),
+            )
+            np.save(stream_file, chunk)
+        self._logger.debug("Flushed %i rows to %s", self._length, self._filepath)
+        self._length = 0
+        self._new_names = []
+        self._file_started = True
+
+
+@dataclass
+class _StreamChunk:
+    offset: int
+    shape: typing.Tuple[int, ...]
+    dtype: np.dtype
+    first_tick: int
+    last_tick: int
+    keyframe_ticks: int
+
+
+class HistoryReader:
+    """Lazy reader of a stream history file.
+
+    Only the chunk headers are read when opening. The chunks rows are memory-mapped and read on demand.
+    """
+
+    def __init__(self, filepath: str) -> None:
+        self._logger = logging.getLogger(__class__.__name__)
+        self._filepath = filepath
+        entity_names = []
+        self._chunks: typing.List[_StreamChunk] = []
+        file_size = os.path.getsize(filepath)
+        with open(filepath, "rb") as stream_file:
+            while stream_file.tell() < file_size:
+                try:
+                    chunk_names = np.load(stream_file)
+                    chunk_header = np.load(stream_file)
+                    version = np.lib.format.read_magic(stream_file)
+                    if version == (1, 0):
+                        shape, _, dtype = np.lib.format.read_array_header_1_0(stream_file)
+                    else:
+                        shape, _, dtype = np.lib.format.read_array_header_2_0(stream_file)
+                except (EOFError, ValueError, OSError):
+                    # A chunk truncated by a crash.
+                    break
+                offset = stream_file.tell()
+                chunk_bytes = int(np.prod(shape)) * dtype.itemsize
+                if offset + chunk_bytes > file_size:
+                    break
+                stream_file.seek(offset + chunk_bytes)
+                entity_names.extend(chunk_names.tolist())
+                self._chunks.append(
+                    _StreamChunk(
+                        offset,
+                        shape,
+                        dtype,
+                        int(chunk_header[0]),
+                        int(chunk_header[1]),
+                        int(chunk_header[2]) if len(chunk_header) > 2 else 0,
+                    )
+                )
+        self._names = np.array(entity_names, dtype=str)
+
+    @property
+    def names(self) -> np.ndarray:
+        return self._names
+
+    @property
+    def total_ticks(self) -> int:
+        return max((chunk.last_tick for chunk in self._chunks), default=0)
+
+    @property
+    def keyframe_ticks(self) -> int:
+        """Ticks between two keyframes of a change only stream, zero if every tick is written."""
+        return max((chunk.keyframe_ticks for chunk in self._chunks), default=0)
+
+    def _chunk_rows(self, chunk: _StreamChunk) -> np.ndarray:
+        if chunk.shape[0] == 0:
+            return np.empty(chunk.shape, dtype=chunk.dtype)
+        return np.memmap(
+            self._filepath,
+            dtype=chunk.dtype,
+            mode="r",
+            offset=chunk.offset,
+            shape=chunk.shape,
+        )
+
+    def _read(
+        self,
+        start_tick: typing.Optional[int] = None,
+        end_tick: typing.Optional[int] = None,
+        entity_ids: typing.Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Packed stream rows with start_tick <= tick < end_tick of the given entities.
+
+        The rows of a change only stream are expanded to one row per tick, so the keyframe periods around the range
+        are read too.
+        """
+        read_start_tick, read_end_tick = start_tick, end_tick
+        keyframe_ticks = self.keyframe_ticks
+        if keyframe_ticks:
+            # Read from the keyframes before start_tick up to the keyframes after end_tick.
+            if start_tick is not None:
+                read_start_tick = start_tick // keyframe_ticks * keyframe_ticks
+            if end_tick is not None:
+                read_end_tick = ((end_tick - 1) // keyframe_ticks + 1) * keyframe_ticks + 1
+        selected_rows = [np.empty((0, STREAM_COLUMNS), dtype=HISTORY_DTYPE)]
+        for chunk in self._chunks:
+            if read_start_tick is not None and chunk.last_tick < read_start_tick:
+                continue
+            if read_end_tick is not None and chunk.first_tick >= read_end_tick:
+                continue
+            rows = self._chunk_rows(chunk)
+            if entity_ids is not None:
+                rows = rows[np.isin(rows[:, 0], entity_ids)]
+            selected_rows.append(np.asarray(rows))
+        rows = np.concatenate(selected_rows)
+        if keyframe_ticks:
+            rows = _expand_stream_rows(rows)
+        selected = np.ones(len(rows), dtype=np.bool_)
+        if start_tick is not None:
+            selected &= rows[:, 1] >= start_tick
+        if end_tick is not None:
+            selected &= rows[:, 1] < end_tick
+        return rows[selected]
+
+    def _split_entities(self, rows: np.ndarray) -> typing.Dict[str, np.ndarray]:
+        if len(rows) == 0:
+            return {}
+        entity_ids = rows[:, 0].astype(np.int64)
+        # The sort is stable, the rows of each entity stay in tick order.
+        order = np.argsort(entity_ids, kind="stable")
+        entity_ids = entity_ids[order]
+        rows = rows[order]
+        entity_starts = np.flatnonzero(
+            np.concatenate(([True], entity_ids[1:] != entity_ids[:-1]))
+        )
+        return {
+            str(self._names[entity_ids[start]]): rows[start:end, 1:]
+            for start, end in zip(entity_starts, np.append(entity_starts[1:], len(rows)))
+        }
+
+    def get_range(self, start_tick: int, end_tick: int) -> typing.Dict[str, np.ndarray]:
+        """History rows of each entity with start_tick <= tick < end_tick."""
+        return self._split_entities(self._read(start_tick, end_tick))
+
+    def get_entities(
+        self, entity_names: typing.Optional[typing.List[str]] = None
+    ) -> typing.Dict[str, np.ndarray]:
+        """History rows of the given entities, or all of them."""
+        entity_ids = None
+        if entity_names is not None:
+            entity_ids = np.flatnonzero(np.isin(self._names, entity_names))
+        return self._split_entities(self._read(entity_ids=entity_ids))
+
+    def get_tick_index(
+        self, start_tick: int = 0, end_tick: typing.Optional[int] = None
+    ) -> TickIndex:
+        """Tick index of the frames with start_tick <= tick < end_tick."""
+        rows = self._read(start_tick, end_tick)
+        return TickIndex(self._names, rows[:, 0].astype(np.int64), rows[:, 1:])
+
+    def iter_frames(
+        self,
+        start_tick: int = 0,
+        end_tick: typing.Optional[int] = None,
+        window_ticks: int = 256,
+    ) -> typing.Iterator[typing.Tuple[int, HistoryFrame]]:
+        """Iterate over the frames, reading window_ticks ticks at a time."""
+        if end_tick is None:
+            end_tick = self.total_ticks + 1
+        for window_start in range(start_tick, end_tick, window_ticks):
+            window_end = min(window_start + window_ticks, end_tick)
+            tick_index = self.get_tick_index(window_start, window_end)
+            for tick in range(window_start, window_end):
+                if tick > tick_index.total_ticks:
+                    yield tick, HistoryFrame.empty()
+                    continue
+                yield tick, tick_index.frame(tick)
+
+
+def read_stream(filepath: str) -> typing.Dict[str, np.ndarray]:
+    """Read the history rows of each entity from a stream file."""
+    return HistoryReader(filepath).get_entities()
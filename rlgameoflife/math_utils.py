@@ -1,58 +1,169 @@
+import math
+
 import numpy as np
 
 
 class Vector2D:
+    """2D vector of two floats.
+
+    The methods return a new vector, the methods ending with an underscore update the vector in place and return it.
+    Normalizing or scaling the zero vector gives a vector of nan, as with numpy.
+    """
+
+    __slots__ = ("x", "y")
+
     def __init__(self, x: float = 0., y: float = 0., magnitude: float = 0., angle: float = 0.) -> None:
-        self.vector = np.array([0., 0.])
+        self.x = 0.
+        self.y = 0.
         if x or y:
-            self.vector = np.array([float(x), float(y)])
+            self.x = float(x)
+            self.y = float(y)
         elif magnitude or angle:
-            self.vector = np.array([np.cos(angle), np.sin(angle)]) * magnitude
+            self.x = math.cos(angle) * magnitude
+            self.y = math.sin(angle) * magnitude
 
-            
     @property
-    def x(self) -> float:
-        return self.vector[0]
+    def vector(self) -> np.ndarray:
+        """Copy of the vector as an array, writing in it does not update the vector."""
+        return np.array([self.x, self.y])
 
-    @property
-    def y(self) -> float:
-        return self.vector[1]
+    @vector.setter
+    def vector(self, value) -> None:
+        self.x = float(value[0])
+        self.y = float(value[1])
 
     def __repr__(self) -> str:
-        return f"Vector2D({self.vector[0]}, {self.vector[1]})"
+        return f"Vector2D({self.x}, {self.y})"
+
+    def copy(self):
+        return Vector2D(self.x, self.y)
 
     def magnitude(self) -> float:
-        return np.linalg.norm(self.vector)
+        return math.sqrt(self.x * self.x + self.y * self.y)
 
     def normalize(self):
-        return Vector2D(*(self.vector / self.magnitude()))
+        return self.copy().normalize_()
+
+    def normalize_(self):
+        magnitude = self.magnitude()
+        if magnitude == 0.0:
+            self.x = self.y = math.nan
+            return self
+        self.x /= magnitude
+        self.y /= magnitude
+        return self
 
     def scale(self, length):
-        return Vector2D(*(self.vector * length / self.magnitude()))
+        return self.copy().scale_(length)
+
+    def scale_(self, length):
+        magnitude = self.magnitude()
+        if magnitude == 0.0:
+            self.x = self.y = math.nan
+            return self
+        self.x = self.x * length / magnitude
+        self.y = self.y * length / magnitude
+        return self
 
     def add(self, other):
-        return Vector2D(*(self.vector + other.vector))
+        return Vector2D(self.x + other.x, self.y + other.y)
+
+    def add_(self, other):
+        self.x += other.x
+        self.y += other.y
+        return self
 
     def subtract(self, other):
-        return Vector2D(*(self.vector - other.vector))
+        return Vector2D(self.x - other.x, self.y - other.y)
+
+    def subtract_(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        return self
 
     def dot(self, other) -> float:
-        return np.dot(self.vector, other.vector)
+        return self.x * other.x + self.y * other.y
 
     def cross(self, other) -> float:
-        return self.vector[0] * other.vector[1] - self.vector[1] * other.vector[0]
+        return self.x * other.y - self.y * other.x
 
     def angle_between(self, other):
-        dot = np.dot(self.vector, other.vector)
-        det = np.linalg.det([self.vector, other.vector])
-        angle = np.arctan2(det, dot)
+        angle = math.atan2(self.cross(other), self.dot(other))
         if angle < -np.pi:
             angle += 2 * np.pi
         elif angle > np.pi:
             angle -= 2 * np.pi
         return angle
 
+    def rotate(self, angle):
+        return self.copy().rotate_(angle)
+
+    def rotate_(self, angle):
+        c, s = math.cos(angle), math.sin(angle)
+        self.x, self.y = c * self.x - s * self.y, s * self.x + c * self.y
+        return self
+
+
+class Vector2DArray:
+    """Array of 2D vectors with the Vector2D operations vectorized.
+
+    The vectors are the last axis of an array of shape (..., 2), operations between arrays broadcast.
+    """
+
+    __slots__ = ("vectors",)
+
+    def __init__(self, vectors) -> None:
+        self.vectors = np.asarray(vectors, dtype=np.float64)
+
+    @classmethod
+    def from_vectors(cls, vectors: list[Vector2D]):
+        return cls(np.array([(vector.x, vector.y) for vector in vectors]).reshape(-1, 2))
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.vectors[..., 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.vectors[..., 1]
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def __getitem__(self, item) -> Vector2D:
+        return Vector2D(*self.vectors[item])
+
+    def __repr__(self) -> str:
+        return f"Vector2DArray({self.vectors.tolist()})"
+
+    def magnitude(self) -> np.ndarray:
+        return np.linalg.norm(self.vectors, axis=-1)
+
+    def normalize(self):
+        return Vector2DArray(self.vectors / self.magnitude()[..., np.newaxis])
+
+    def scale(self, length):
+        length = np.asarray(length)[..., np.newaxis]
+        return Vector2DArray(self.vectors * length / self.magnitude()[..., np.newaxis])
+
+    def add(self, other):
+        return Vector2DArray(self.vectors + other.vectors)
+
+    def subtract(self, other):
+        return Vector2DArray(self.vectors - other.vectors)
+
+    def dot(self, other) -> np.ndarray:
+        return self.x * other.x + self.y * other.y
+
+    def cross(self, other) -> np.ndarray:
+        return self.x * other.y - self.y * other.x
+
+    def angle_between(self, other) -> np.ndarray:
+        """Angles in [-pi, pi] from each vector to the other vector."""
+        return np.arctan2(self.cross(other), self.dot(other))
+
     def rotate(self, angle):
         c, s = np.cos(angle), np.sin(angle)
-        rotation_matrix = np.array([[c, -s], [s, c]])
-        return Vector2D(*(np.dot(rotation_matrix, self.vector)))
+        return Vector2DArray(
+            np.stack((c * self.x - s * self.y, s * self.x + c * self.y), axis=-1)
+        )
@@ -1,7 +1,9 @@
 import logging
+import typing
 
 from rlgameoflife import collider
 from rlgameoflife import entities
+from rlgameoflife import math_utils
 from rlgameoflife import visual_pattern
 
 import numpy as np
@@ -35,30 +37,41 @@ class SimpleCreatureMover(Mover):
             collider.CreatureFoodCollider(target_group)
         )
 
+    def _nearest_food(
+        self, creature: entities.BaseEntity, all_group: entities.EntityGroup
+    ) -> typing.Optional[int]:
+        store = all_group.store
+        creature_position = store.positions[creature.slot]
+        if store.spatial_index is not None:
+            food_slots, _ = store.spatial_index.k_nearest(
+                creature_position,
+                1,
+                entities.EntityType.FOOD,
+                all_group.slot_mask(),
+            )
+            return int(food_slots[0]) if len(food_slots) else None
+        food_slots = all_group.slots(entities.EntityType.FOOD)
+        if len(food_slots) == 0:
+            return None
+        food_distances = math_utils.Vector2DArray(
+            store.positions[food_slots] - creature_position
+        ).magnitude()
+        return int(food_slots[np.argmin(food_distances)])
+
     def _move(self, all_group: entities.EntityGroup) -> None:
+        store = all_group.store
         for creature in self._target_group:
             # Get nearest food.
-            nearest_food_distance = INFINITE_DISTANCE
-            for food_idx, food in enumerate(all_group):
-                if type(food) is entities.EntityGroup:
-                    # Recursively get the food.
-                    self._move(food)
-                    continue
-                if food.entity_type != entities.EntityType.FOOD:
-                    # This is no food.
-                    continue
-                food_vector = creature.position.subtract(food.position)
-                food_distance = food_vector.magnitude()
-                if food_distance < nearest_food_distance:
-                    nearest_food_distance = food_distance
-                    nearest_food_vector = food_vector
-                    nearest_food_idx = food_idx
-            if nearest_food_distance == INFINITE_DISTANCE:
+            nearest_food_slot = self._nearest_food(creature, all_group)
+            if nearest_food_slot is None:
                 # No food in all_group
                 continue
-            if nearest_food_distance < 5:
+            nearest_food_vector = creature.position.subtract(
+                math_utils.Vector2D(*store.positions[nearest_food_slot])
+            )
+            if nearest_food_vector.magnitude() < 5:
                 # Creature eat the food when near.
-                all_group.kill(nearest_food_idx)
+                all_group.kill_slots(np.array([nearest_food_slot]))
                 return
             # Creature move to nearest food.
             creature.move(nearest_food_vector)
@@ -71,22 +84,26 @@ class SimpleVisualCreatureMover(Mover):
         self._before_move_collider_group.add(
             collider.CreatureFoodCollider(target_group)
         )
+        self._creature_vision = visual_pattern.BatchedVisualConePattern(
+            np.pi / 2, 1000.0, 9
+        )
 
     def _move(self, all_group: entities.EntityGroup):
-        for creature in self._target_group:
-            # Search for food.
-            creature_vision = visual_pattern.VisualConePattern(np.pi/2, 1000.0, 9)
-            creature_vision.update(creature, all_group)
-            nearest_entity_distance = creature_vision.nearest_entity_distance(
-                entities.EntityType.FOOD
-            )
-            if nearest_entity_distance == creature_vision.view_range:
+        # Search for food.
+        self._creature_vision.observe(self._target_group, all_group)
+        nearest_food_distances = self._creature_vision.nearest_entity_distance(
+            entities.EntityType.FOOD
+        )
+        nearest_food_quandrant_angles = -self._creature_vision.nearest_entity_angle(
+            entity_type=entities.EntityType.FOOD
+        )
+        for creature, nearest_food_distance, nearest_food_quandrant_angle in zip(
+            self._target_group, nearest_food_distances, nearest_food_quandrant_angles
+        ):
+            if nearest_food_distance == self._creature_vision.view_range:
                 # There is no food in view field.
                 # Search for food around.
                 creature.rotate(0.02)
                 continue
-            nearest_food_quandrant_angle = -creature_vision.nearest_entity_angle(
-                entity_type=entities.EntityType.FOOD
-            )
             mov = creature.direction.rotate(nearest_food_quandrant_angle).scale(2.)
             creature.move(mov)
@@ -0,0 +1,198 @@
+import logging
+import typing
+
+import numpy as np
+
+from rlgameoflife import math_utils
+
+
+DEFAULT_CELLS_PER_SIDE = 32
+
+
+class SpatialHashGrid:
+    """Uniform grid indexing the positions of the entities of a store.
+
+    The grid is sized from the world boundaries but is hashed, so entities outside the boundaries are still indexed.
+    The store keeps the grid up to date when entities are spawned, moved or killed.
+    """
+
+    def __init__(
+        self,
+        store,
+        boundaries: math_utils.Vector2D,
+        cell_size: typing.Optional[float] = None,
+    ) -> None:
+        self._logger = logging.getLogger(__class__.__name__)
+        self._store = store
+        if cell_size is None:
+            cell_size = max(boundaries.x, boundaries.y) / DEFAULT_CELLS_PER_SIDE
+        self._cell_size = max(float(cell_size), 1e-6)
+        self.clear()
+
+    @property
+    def cell_size(self) -> float:
+        return self._cell_size
+
+    def __len__(self) -> int:
+        return len(self._slot_cells)
+
+    def __contains__(self, slot: int) -> bool:
+        return slot in self._slot_cells
+
+    def clear(self) -> None:
+        self._cells: dict[tuple[int, int], set[int]] = {}
+        self._slot_cells: dict[int, tuple[int, int]] = {}
+        # Cell of each slot as an array, compared at once with the cells of the moved slots.
+        self._cell_array = np.zeros((len(self._store.positions), 2), dtype=np.int64)
+        self._indexed = np.zeros(len(self._store.positions), dtype=np.bool_)
+        self._min_cell = (0, 0)
+        self._max_cell = (-1, -1)
+
+    def _cell(self, position: np.ndarray) -> tuple[int, int]:
+        return (
+            int(np.floor(position[0] / self._cell_size)),
+            int(np.floor(position[1] / self._cell_size)),
+        )
+
+    def _fit_store(self) -> None:
+        """Grow the cell arrays with the store."""
+        capacity = len(self._store.positions)
+        if capacity > len(self._indexed):
+            self._cell_array = np.resize(self._cell_array, (capacity, 2))
+            self._indexed = np.concatenate(
+                (self._indexed, np.zeros(capacity - len(self._indexed), dtype=np.bool_))
+            )
+
+    def update(self, slot: int) -> None:
+        """Insert or move the slot to the cell of its current position."""
+        self._fit_store()
+        self._move(slot, self._cell(self._store.positions[slot]))
+
+    def update_many(self, slots: np.ndarray) -> None:
+        """Insert or move the slots, only the slots whose cell changed are rehashed."""
+        slots = np.asarray(slots, dtype=np.int64)
+        if len(slots) == 0:
+            return
+        self._fit_store()
+        cells = np.floor(self._store.positions[slots] / self._cell_size).astype(np.int64)
+        changed = ~self._indexed[slots] | (self._cell_array[slots] != cells).any(axis=1)
+        for slot, cell in zip(slots[changed].tolist(), cells[changed].tolist()):
+            self._move(slot, tuple(cell))
+
+    def _move(self, slot: int, cell: tuple[int, int]) -> None:
+        previous_cell = self._slot_cells.get(slot)
+        if previous_cell == cell:
+            return
+        if previous_cell is not None:
+            self._discard(slot, previous_cell)
+        self._cells.setdefault(cell, set()).add(slot)
+        self._slot_cells[slot] = cell
+        self._cell_array[slot] = cell
+        self._indexed[slot] = True
+        if self._max_cell[0] < self._min_cell[0]:
+            self._min_cell, self._max_cell = cell, cell
+        else:
+            self._min_cell = (min(self._min_cell[0], cell[0]), min(self._min_cell[1], cell[1]))
+            self._max_cell = (max(self._max_cell[0], cell[0]), max(self._max_cell[1], cell[1]))
+
+    def remove(self, slot: int) -> None:
+        cell = self._slot_cells.pop(slot, None)
+        if cell is not None:
+            self._discard(slot, cell)
+            self._indexed[slot] = False
+
+    def _discard(self, slot: int, cell: tuple[int, int]) -> None:
+        cell_slots = self._cells[cell]
+        cell_slots.discard(slot)
+        if not cell_slots:
+            del self._cells[cell]
+
+    def _ring_slots(self, center_cell: tuple[int, int], ring: int) -> typing.List[int]:
+        """Slots in the cells at the given Chebyshev distance of the center cell."""
+        ring_slots = []
+        cx, cy = center_cell
+        if ring == 0:
+            ring_slots.extend(self._cells.get(center_cell, ()))
+            return ring_slots
+        for x in range(cx - ring, cx + ring + 1):
+            ring_slots.extend(self._cells.get((x, cy - ring), ()))
+            ring_slots.extend(self._cells.get((x, cy + ring), ()))
+        for y in range(cy - ring + 1, cy + ring):
+            ring_slots.extend(self._cells.get((cx - ring, y), ()))
+            ring_slots.extend(self._cells.get((cx + ring, y), ()))
+        return ring_slots
+
+    def _filter(
+        self, slots: np.ndarray, entity_type, slot_mask: typing.Optional[np.ndarray]
+    ) -> np.ndarray:
+        if entity_type is not None:
+            slots = slots[self._store.types[slots] == entity_type.value]
+        if slot_mask is not None:
+            slots = slots[slot_mask[slots]]
+        return slots
+
+    def query_radius(
+        self,
+        center: np.ndarray,
+        radius: float,
+        entity_type=None,
+        slot_mask: typing.Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Slots of the entities at a distance lower or equal to radius of center."""
+        min_cell = self._cell(np.asarray(center) - radius)
+        max_cell = self._cell(np.asarray(center) + radius)
+        candidates = []
+        if (max_cell[0] - min_cell[0] + 1) * (max_cell[1] - min_cell[1] + 1) > len(self._cells):
+            # The query covers more cells than there are occupied ones.
+            for cell, cell_slots in self._cells.items():
+                if min_cell[0] <= cell[0] <= max_cell[0] and min_cell[1] <= cell[1] <= max_cell[1]:
+                    candidates.extend(cell_slots)
+        else:
+            for x in range(min_cell[0], max_cell[0] + 1):
+                for y in range(min_cell[1], max_cell[1] + 1):
+                    candidates.extend(self._cells.get((x, y), ()))
+        candidates = self._filter(
+            np.array(candidates, dtype=np.int64), entity_type, slot_mask
+        )
+        distances = np.linalg.norm(self._store.positions[candidates] - center, axis=1)
+        return candidates[distances <= radius]
+
+    def k_nearest(
+        self,
+        center: np.ndarray,
+        k: int,
+        entity_type=None,
+        slot_mask: typing.Optional[np.ndarray] = None,
+    ) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Slots and distances of the k nearest entities of center, sorted by distance."""
+        if k <= 0 or not self._slot_cells:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        center = np.asarray(center, dtype=np.float64)
+        center_cell = self._cell(center)
+        max_ring = max(
+            abs(center_cell[0] - self._min_cell[0]),
+            abs(center_cell[0] - self._max_cell[0]),
+            abs(center_cell[1] - self._min_cell[1]),
+            abs(center_cell[1] - self._max_cell[1]),
+        )
+        slots = np.empty(0, dtype=np.int64)
+        distances = np.empty(0)
+        for ring in range(max_ring + 1):
+            ring_slots = self._filter(
+                np.array(self._ring_slots(center_cell, ring), dtype=np.int64),
+                entity_type,
+                slot_mask,
+            )
+            if len(ring_slots):
+                slots = np.concatenate((slots, ring_slots))
+                distances = np.concatenate(
+                    (
+                        distances,
+                        np.linalg.norm(self._store.positions[ring_slots] - center, axis=1),
+                    )
+                )
+            # Entities in the next rings are at least ring cells away from center.
+            if len(slots) >= k and np.partition(distances, k - 1)[k - 1] <= ring * self._cell_size:
+                break
+        order = np.argsort(distances, kind="stable")[:k]
+        return slots[order], distances[order]
@@ -2,6 +2,7 @@ import math
 import numpy as np
 
 from rlgameoflife import entities
+from rlgameoflife import math_utils
 
 
 class VisualConePattern:
@@ -33,7 +34,7 @@ class VisualConePattern:
         self, ref_entity: entities.BaseEntity, sample_entity: entities.EntityObject
     ) -> None:
         if type(sample_entity) is entities.EntityGroup:
-            for entity in sample_entity:
+            for entity in sample_entity.view().entities:
                 self.update(ref_entity, entity)
             return
         if ref_entity.name == sample_entity.name:
@@ -94,3 +95,165 @@ class VisualConePattern:
             + self._quadrant_angle_width / 2
             - self._arc_half_angle
         )
+
+
+class BatchedVisualConePattern:
+    """Visual cone patterns of many observers computed in one vectorized pass.
+
+    Each quadrant of an observer only holds the distance of its nearest entities, as when VisualConePattern
+    clears a quadrant each time a nearer entity is seen. The engine can be reused across ticks.
+    """
+
+    def __init__(self, arc_angle: float, arc_radius: float, num_sensor: int) -> None:
+        self._arc_angle = arc_angle
+        self._arc_half_angle = self._arc_angle / 2
+        self._num_sensor = num_sensor
+        self._quadrant_angle_width = self._arc_angle / self._num_sensor
+        self._arc_radius = arc_radius
+        self._num_entities_type = len(entities.EntityType) - 1
+        self._visual_pattern = np.ones((0, self._num_sensor, self._num_entities_type))
+
+    @property
+    def visual_pattern(self) -> np.ndarray:
+        return self._visual_pattern
+
+    @property
+    def view_range(self) -> float:
+        return self._arc_radius
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """Shape of the visual pattern of a single observer."""
+        return (self._num_sensor, self._num_entities_type)
+
+    def update(
+        self,
+        observer_positions: np.ndarray,
+        observer_directions: np.ndarray,
+        positions: np.ndarray,
+        types: np.ndarray,
+        observer_slots: np.ndarray = None,
+        slots: np.ndarray = None,
+    ) -> np.ndarray:
+        """Compute the (observers, sensors, entity types) visual pattern tensor.
+
+        When the slots are given, observers do not look at themselves.
+        """
+        num_observer = len(observer_positions)
+        self._visual_pattern = np.ones(
+            (num_observer, self._num_sensor, self._num_entities_type)
+        )
+        if num_observer == 0 or len(positions) == 0:
+            return self._visual_pattern
+
+        referenced_positions = math_utils.Vector2DArray(
+            positions[np.newaxis, :, :] - observer_positions[:, np.newaxis, :]
+        )
+        referenced_distances = referenced_positions.magnitude()
+        referenced_angles = math_utils.Vector2DArray(
+            observer_directions[:, np.newaxis, :]
+        ).angle_between(referenced_positions)
+        visible = (
+            (referenced_distances <= self._arc_radius)
+            & (np.abs(referenced_angles) <= self._arc_half_angle)
+            & (types[np.newaxis, :] >= 0)
+        )
+        if observer_slots is not None and slots is not None:
+            visible &= observer_slots[:, np.newaxis] != slots[np.newaxis, :]
+        observer_idx, entity_idx = np.nonzero(visible)
+        if len(observer_idx) == 0:
+            return self._visual_pattern
+
+        visual_quadrants = np.floor(
+            (referenced_angles[observer_idx, entity_idx] + self._arc_half_angle)
+            / self._quadrant_angle_width
+        ).astype(np.int64)
+        # At the very edge of the field of view, will give an index out of range.
+        visual_quadrants = np.minimum(visual_quadrants, self._num_sensor - 1)
+        visual_values = referenced_distances[observer_idx, entity_idx] / self._arc_radius
+
+        # Keep the nearest entities of each quadrant of each observer.
+        quadrant_keys = observer_idx * self._num_sensor + visual_quadrants
+        order = np.lexsort((visual_values, quadrant_keys))
+        quadrant_keys = quadrant_keys[order]
+        visual_values = visual_values[order]
+        quadrant_starts = np.flatnonzero(
+            np.concatenate(([True], quadrant_keys[1:] != quadrant_keys[:-1]))
+        )
+        quadrant_nearest_values = np.repeat(
+            visual_values[quadrant_starts],
+            np.diff(np.append(quadrant_starts, len(quadrant_keys))),
+        )
+        nearest = visual_values == quadrant_nearest_values
+        self._visual_pattern[
+            observer_idx[order][nearest],
+            visual_quadrants[order][nearest],
+            types[entity_idx[order][nearest]],
+        ] = visual_values[nearest]
+        return self._visual_pattern
+
+    def observe(
+        self, observer_group: entities.EntityGroup, all_group: entities.EntityGroup
+    ) -> np.ndarray:
+        """Compute the visual pattern of every entity of observer_group looking at all_group."""
+        store = all_group.store
+        observer_slots = observer_group.slots()
+        if store.spatial_index is not None:
+            slot_mask = all_group.slot_mask()
+            sample_slots = np.unique(
+                np.concatenate(
+                    [
+                        store.spatial_index.query_radius(
+                            store.positions[observer_slot],
+                            self._arc_radius,
+                            slot_mask=slot_mask,
+                        )
+                        for observer_slot in observer_slots
+                    ]
+                    + [np.empty(0, dtype=np.int64)]
+                )
+            )
+        else:
+            sample_slots = all_group.slots()
+        return self.update(
+            store.positions[observer_slots],
+            store.directions[observer_slots],
+            store.positions[sample_slots],
+            store.types[sample_slots],
+            observer_slots=observer_slots,
+            slots=sample_slots,
+        )
+
+    def nearest_entity_quadrant(
+        self, entity_type: entities.EntityType = None
+    ) -> np.ndarray:
+        if entity_type:
+            return np.argmin(self._visual_pattern[:, :, entity_type.value], axis=1)
+        return np.argmin(self._visual_pattern, axis=2)
+
+    def nearest_entity_distance(
+        self, entity_type: entities.EntityType = None
+    ) -> np.ndarray:
+        nearest_entity_quadrant = self.nearest_entity_quadrant(entity_type=entity_type)
+        observer_idx = np.arange(len(self._visual_pattern))
+        if entity_type:
+            return (
+                self._visual_pattern[
+                    observer_idx, nearest_entity_quadrant, entity_type.value
+                ]
+                * self._arc_radius
+            )
+        return (
+            self._visual_pattern[observer_idx[:, np.newaxis], nearest_entity_quadrant, :]
+            * self._arc_radius
+        )
+
+    def nearest_entity_angle(
+        self, entity_type: entities.EntityType = None
+    ) -> np.ndarray:
+        nearest_entity_quadrant = self.nearest_entity_quadrant(entity_type=entity_type)
+        return (
+            nearest_entity_quadrant * self._quadrant_angle_width
+            + self._quadrant_angle_width / 2
+            - self._arc_half_angle
+        )
@@ -1,12 +1,14 @@
 import logging
 import os
 import time
+import typing
 
 import matplotlib.animation as animation
 import matplotlib.pyplot as plt
 
 
 from rlgameoflife import entities
+from rlgameoflife import history
 
 
 ENTITY_COLOR_DICT = {
@@ -19,16 +21,27 @@ class Visualizer:
     def __init__(self, simulation_dir_path: str) -> None:
         self._logger = logging.getLogger(__class__.__name__)
         self._simulation_dir_path = simulation_dir_path
-        self._entities_history_loader = entities.EntitiesHistoryLoader(
-            self._simulation_dir_path
-        )
-        self._entities_history_loader.load(
-            os.path.join(simulation_dir_path, "entities_history.npz")
-        )
+        history_filepath = history.find_history_file(simulation_dir_path)
+        self._history_reader = None
+        self._entities_history_loader = None
+        if history_filepath.endswith(history.STREAM_FILENAME):
+            # Streamed histories are read lazily, one tick range at a time.
+            self._history_reader = history.HistoryReader(history_filepath)
+        else:
+            self._entities_history_loader = entities.EntitiesHistoryLoader(
+                self._simulation_dir_path
+            )
+            self._entities_history_loader.load(history_filepath)
 
-    def make_video(self):
+    def make_video(self, start_tick: int = 0, end_tick: typing.Optional[int] = None):
         self._logger.info("Create video of simulation %s", self._simulation_dir_path)
-        history_dict, boundaries = self._entities_history_loader.get_timed_history()
+        if self._history_reader is not None:
+            tick_index = self._history_reader.get_tick_index(start_tick, end_tick)
+        else:
+            tick_index = self._entities_history_loader.get_tick_index()
+        if end_tick is None or end_tick > tick_index.total_ticks + 1:
+            end_tick = tick_index.total_ticks + 1
+        boundaries = tick_index.bounds
         fig, ax = plt.subplots()
         
         xlim = [boundaries[0] - 20., boundaries[2] + 20]
@@ -42,23 +55,27 @@ class Visualizer:
             ax.set_aspect("equal", "box")
             ax.set_title(f"Itereation: {frame}")
 
-            for entity_name, entity_data in history_dict[frame].items():
-                pos = entity_data["position"]
-                dir = entity_data["direction"]
-                if entity_data["type"] == entities.EntityType.FOOD.value:
+            history_frame = tick_index.frame(frame)
+            for entity_name, pos, dir, entity_type in zip(
+                history_frame.names,
+                history_frame.positions,
+                history_frame.directions,
+                history_frame.types,
+            ):
+                if entity_type == entities.EntityType.FOOD.value:
                     color = "blue"
-                elif entity_data["type"] == entities.EntityType.CREATURE.value:
+                elif entity_type == entities.EntityType.CREATURE.value:
                     color = "red"
                 else:
                     color = "black"
                 ax.plot(pos[0], pos[1], marker="o", markersize=5, color=color)
-                if entity_data["type"] == entities.EntityType.CREATURE.value:
+                if entity_type == entities.EntityType.CREATURE.value:
                     ax.plot([pos[0], pos[0] + dir[0]* dir_line_size], [pos[1], pos[1] + dir[1] * dir_line_size], 'k-', lw=1)
                 ax.annotate(entity_name, pos)
 
         save_start = time.time()
         anim = animation.FuncAnimation(
-            fig, update, frames=list(history_dict.keys())
+            fig, update, frames=range(start_tick, end_tick)
         )
         writervideo = animation.ImageMagickWriter(fps=240)
         anim.save(
@@ -1,2 +1,4 @@
 from .agent_world import *
-from .base_world import *
\ No newline at end of file
+from .base_world import *
+from .subprocess_world import *
+from .vector_world import *
\ No newline at end of file
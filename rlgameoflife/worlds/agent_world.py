@@ -1,11 +1,9 @@
-import random
 import typing
 
 import numpy as np
 
 from rlgameoflife import actions
 from rlgameoflife import collider
-from rlgameoflife import entities
 from rlgameoflife import events
 from rlgameoflife import math_utils
 from rlgameoflife import visual_pattern
@@ -20,10 +18,21 @@ class BasicAgentWorld(base_world.BaseWorld):
         output_dir: str,
         boundaries: typing.Tuple[int, int] = (100, 100),
         disable_history: bool = False,
+        seed: typing.Optional[int] = None,
+        snapshot_reset: bool = False,
     ) -> None:
-        super().__init__(total_ticks, output_dir, boundaries, disable_history)
+        super().__init__(
+            total_ticks,
+            output_dir,
+            boundaries,
+            disable_history,
+            seed=seed,
+            snapshot_reset=snapshot_reset,
+        )
         
-        self.agent_vision = visual_pattern.VisualConePattern(np.pi / 2, 1000.0, 9)
+        self.agent_vision = visual_pattern.BatchedVisualConePattern(
+            np.pi / 2, 1000.0, 9
+        )
         self.observation_shape = self.agent_vision.shape
         self.action_space = actions.DiscreteMoveActions
     
@@ -32,35 +41,31 @@ class BasicAgentWorld(base_world.BaseWorld):
 
     def _reinitialize(self) -> None:
         # Create initial entities
-        self.food_group = entities.EntityGroup(
+        self.food_group = self.create_group(
             [
-                entities.Food(math_utils.Vector2D(50, 60), 0, self._history),
-                entities.Food(math_utils.Vector2D(50, 50), 0, self._history),
-                entities.Food(math_utils.Vector2D(50, 40), 0, self._history),
+                self.create_food(math_utils.Vector2D(50, 60)),
+                self.create_food(math_utils.Vector2D(50, 50)),
+                self.create_food(math_utils.Vector2D(50, 40)),
             ],
             "food_group",
         )
         self.add_entities_group(self.food_group)
 
-        self.agent = entities.Creature(
+        self.agent = self.create_creature(
             math_utils.Vector2D(10.0, 50.0),
             math_utils.Vector2D(1.0, 0.0),
-            0,
-            self._history,
         )
-        self.agent_group = entities.EntityGroup([self.agent], "agent-group")
+        self.agent_group = self.create_group([self.agent], "agent-group")
         self.add_entities_group(self.agent_group)
         self.agent_collider = collider.CreatureFoodCollider(self.agent_group)
 
     def spawn_food(self) -> None:
         self.food_group.add(
-            entities.Food(
+            self.create_food(
                 math_utils.Vector2D(
-                    random.randint(5, self._boundaries.x - 5),
-                    random.randint(5, self._boundaries.y - 5),
-                ),
-                self._tick,
-                self._history,
+                    self._rng.randint(5, int(self._boundaries.x) - 5),
+                    self._rng.randint(5, int(self._boundaries.y) - 5),
+                )
             )
         )
 
@@ -69,9 +74,8 @@ class BasicAgentWorld(base_world.BaseWorld):
             self.spawn_food()
 
     def get_observation(self) -> np.ndarray:
-        self.agent_vision.reset()
-        self.agent_vision.update(self.agent, self._entities_group)
-        return self.agent_vision.visual_pattern.flatten()
+        self.agent_vision.observe(self.agent_group, self._entities_group)
+        return self.agent_vision.visual_pattern[0].flatten()
 
     def agent_actions(
         self, step_actions: actions.DiscreteMoveActions
@@ -101,20 +105,20 @@ class BasicEvalWorldAgent(BasicAgentWorld):
         pass
     def _reinitialize(self) -> None:
         # Create initial entities
-        self.food_group = entities.EntityGroup(
+        self.food_group = self.create_group(
             [
-                entities.Food(math_utils.Vector2D(30, 20), 0, self._history),
-                entities.Food(math_utils.Vector2D(30, 80), 0, self._history),
-                entities.Food(math_utils.Vector2D(40, 60), 0, self._history),
-                entities.Food(math_utils.Vector2D(40, 40), 0, self._history),
-                entities.Food(math_utils.Vector2D(50, 20), 0, self._history),
-                entities.Food(math_utils.Vector2D(50, 80), 0, self._history),
-                entities.Food(math_utils.Vector2D(60, 40), 0, self._history),
-                entities.Food(math_utils.Vector2D(60, 60), 0, self._history),
-                entities.Food(math_utils.Vector2D(70, 20), 0, self._history),
-                entities.Food(math_utils.Vector2D(70, 80), 0, self._history),
-                entities.Food(math_utils.Vector2D(80, 40), 0, self._history),
-                entities.Food(math_utils.Vector2D(80, 60), 0, self._history),
+                self.create_food(math_utils.Vector2D(30, 20)),
+                self.create_food(math_utils.Vector2D(30, 80)),
+                self.create_food(math_utils.Vector2D(40, 60)),
+                self.create_food(math_utils.Vector2D(40, 40)),
+                self.create_food(math_utils.Vector2D(50, 20)),
+                self.create_food(math_utils.Vector2D(50, 80)),
+                self.create_food(math_utils.Vector2D(60, 40)),
+                self.create_food(math_utils.Vector2D(60, 60)),
+                self.create_food(math_utils.Vector2D(70, 20)),
+                self.create_food(math_utils.Vector2D(70, 80)),
+                self.create_food(math_utils.Vector2D(80, 40)),
+                self.create_food(math_utils.Vector2D(80, 60)),
                 
                 
             ],
@@ -122,12 +126,10 @@ class BasicEvalWorldAgent(BasicAgentWorld):
         )
         self.add_entities_group(self.food_group)
 
-        self.agent = entities.Creature(
+        self.agent = self.create_creature(
             math_utils.Vector2D(10.0, 50.0),
             math_utils.Vector2D(1.0, 0.0),
-            0,
-            self._history,
         )
-        self.agent_group = entities.EntityGroup([self.agent], "agent-group")
+        self.agent_group = self.create_group([self.agent], "agent-group")
         self.add_entities_group(self.agent_group)
         self.agent_collider = collider.CreatureFoodCollider(self.agent_group)
\ No newline at end of file
@@ -11,8 +11,10 @@ import numpy as np
 from rlgameoflife import actions
 from rlgameoflife import entities
 from rlgameoflife import events
+from rlgameoflife import history
 from rlgameoflife import math_utils
 from rlgameoflife import mover
+from rlgameoflife import spatial_index
 
 
 @dataclass
@@ -24,6 +26,15 @@ class AgentParameters:
     info: dict
 
 
+@dataclass
+class WorldSnapshot:
+    attributes: dict
+    entity_store: entities.EntityStoreSnapshot
+    entities_group: entities.EntityGroupSnapshot
+    tick_events: events.TickEventsSnapshot
+    rng_state: tuple
+
+
 class BaseWorld:
     _movers: typing.List[mover.Mover]
     observation_shape: tuple[int, ...]
@@ -34,17 +45,40 @@ class BaseWorld:
         output_dir: str,
         boundaries: typing.Tuple[float, float] = (1000, 1000),
         disable_history: bool = False,
+        stream_history: bool = False,
+        changes_only_history: bool = False,
+        history_format: typing.Optional[history.HistoryFormat] = None,
+        background_save_history: bool = True,
+        seed: typing.Optional[int] = None,
+        snapshot_reset: bool = False,
     ) -> None:
         self._logger = logging.getLogger(__class__.__name__)
+        self._rng = random.Random(seed)
+        # Snapshot of the world after its first reset, restored by the next resets.
+        self._snapshot_reset = snapshot_reset
+        self._reset_snapshot = None
 
         self._total_ticks = total_ticks
+        self._output_dir = output_dir
         self._history = entities.EntitiesHistoryLoader(
-            output_dir, disable=disable_history
+            output_dir,
+            disable=disable_history,
+            stream=stream_history,
+            changes_only=changes_only_history,
+            history_format=history_format,
+            background_save=background_save_history,
         )
         self._boundaries = math_utils.Vector2D(boundaries[0], boundaries[1])
+        self._entity_store = entities.EntityStore()
+        self._spatial_index = spatial_index.SpatialHashGrid(
+            self._entity_store, self._boundaries
+        )
+        self._entity_store.attach_spatial_index(self._spatial_index)
+        self._entity_pool = entities.EntityPool()
+        self._entity_store.attach_entity_pool(self._entity_pool)
 
         # Set up events
-        self._tick_events = events.TickEvents()
+        self._tick_events = events.TickEvents(rng=self._rng)
 
         self._reset()
         self._initialize()
@@ -66,11 +100,24 @@ class BaseWorld:
     
     def _reset(self) -> None:
         self._tick = 0
-        self._entities_group = entities.EntityGroup([], "all_entities_group")
+        self._entity_store.clear()
+        self._entities_group = self.create_group([], "all_entities_group")
         self._movers = []
         self._tick_events.reset()
         self._history.reset()
 
+    @property
+    def tick(self) -> int:
+        return self._tick
+
+    @property
+    def total_ticks(self) -> int:
+        return self._total_ticks
+
+    def seed(self, seed: typing.Optional[int]) -> None:
+        """Seed the random generator of the world, used by its events and spawns."""
+        self._rng.seed(seed)
+
     def disable_history(self) -> None:
         self._history.disabled = True
 
@@ -78,8 +125,74 @@ class BaseWorld:
         self._history.disabled = False
 
     def reset(self) -> None:
+        """Reset the world, by restoring its state after the first reset when snapshot_reset is enabled.
+
+        The history is not part of the snapshots, the world is reinitialized when it is enabled.
+        """
+        if self._reset_snapshot is not None and self._history.disabled:
+            self.restore(self._reset_snapshot, restore_rng=False)
+            return
         self._reset()
         self._reinitialize()
+        if self._snapshot_reset:
+            self._reset_snapshot = self.snapshot()
+
+    def snapshot(self) -> WorldSnapshot:
+        """Snapshot of the state of the world, its entities, tick, events and random generator."""
+        attributes = dict(vars(self))
+        del attributes["_reset_snapshot"]
+        attributes["_movers"] = list(self._movers)
+        return WorldSnapshot(
+            attributes=attributes,
+            entity_store=self._entity_store.snapshot(),
+            entities_group=self._entities_group.snapshot(),
+            tick_events=self._tick_events.snapshot(),
+            rng_state=self._rng.getstate(),
+        )
+
+    def restore(self, snapshot: WorldSnapshot, restore_rng: bool = True) -> None:
+        """Put the world back in the state of the snapshot.
+
+        The attributes of the world are restored shallowly, the entities spawned since are pooled to be respawned.
+        """
+        current_entities = self._entities_group.snapshot().entities
+        vars(self).update(snapshot.attributes)
+        self._movers = list(snapshot.attributes["_movers"])
+        self._entity_store.restore(snapshot.entity_store)
+        self._entities_group.restore(snapshot.entities_group)
+        self._tick_events.restore(snapshot.tick_events)
+        if restore_rng:
+            self._rng.setstate(snapshot.rng_state)
+
+        restored_entities = {id(entity) for entity in snapshot.entities_group.entities}
+        pooled_entities = list(self._entity_pool) + current_entities
+        self._entity_pool.clear()
+        for entity in pooled_entities:
+            if id(entity) not in restored_entities:
+                self._entity_pool.put(entity)
+
+    def create_food(self, pos: math_utils.Vector2D) -> entities.Food:
+        food = self._entity_pool.get(entities.Food)
+        if food is None:
+            return entities.Food(pos, self._tick, self._history, store=self._entity_store)
+        food.respawn(pos, self._tick, self._history)
+        return food
+
+    def create_creature(
+        self, pos: math_utils.Vector2D, dir: math_utils.Vector2D
+    ) -> entities.Creature:
+        creature = self._entity_pool.get(entities.Creature)
+        if creature is None:
+            return entities.Creature(
+                pos, dir, self._tick, self._history, store=self._entity_store
+            )
+        creature.respawn(pos, dir, self._tick, self._history)
+        return creature
+
+    def create_group(
+        self, entity_list: typing.List[entities.EntityObject], name: str
+    ) -> entities.EntityGroup:
+        return entities.EntityGroup(entity_list, name, store=self._entity_store)
 
     def add_entities_group(self, entities_group: entities.EntityGroup) -> None:
         self._entities_group.add(entities_group)
@@ -90,6 +203,18 @@ class BaseWorld:
     def add_tick_event(self, event_type: events.EventType, trigger_tick: int) -> None:
         self._tick_events.add_tick_event(event_type, trigger_tick)
 
+    def schedule_tick_event(
+        self,
+        event_type: events.EventType,
+        trigger_tick: int,
+        period: typing.Optional[int] = None,
+        jitter: int = 0,
+    ) -> events.TickEvent:
+        return self._tick_events.schedule(event_type, trigger_tick, period, jitter)
+
+    def cancel_tick_event(self, event: events.TickEvent) -> None:
+        self._tick_events.cancel(event)
+
     def tick_events_actions(self, event: events.EventType) -> None:
         if self._tick == 0:
             self._logger.warning("events action not implemented.")
@@ -100,6 +225,10 @@ class BaseWorld:
             self.tick_events_actions(event)
         self._tick_events.update()
 
+    def integrate(self) -> None:
+        """Apply the moves and rotations requested by the movers to every entity at once."""
+        self._entity_store.integrate()
+
     def update_groups(self) -> None:
         self._entities_group.update()
 
@@ -111,6 +240,10 @@ class BaseWorld:
         if not self._history.disabled:
             self._history.save()
 
+    def wait_history(self) -> None:
+        """Wait until the saved histories are written."""
+        self._history.wait()
+
     def save_parameters(self) -> None:
         parameters_filepath = os.path.join(self._output_dir, "parameters.json")
         parameters_dict = {
@@ -133,9 +266,11 @@ class BaseWorld:
             self._tick = tick
             self.events()
             self.move()
+            self.integrate()
             self.update_groups()
 
         self.save_simulation()
+        self.wait_history()
         self._logger.info("Simulation complete.")
 
     def agent_actions(self, step_actions: actions.Actions) -> AgentParameters:
@@ -147,6 +282,7 @@ class BaseWorld:
         agent_parameters = self.agent_actions(step_actions)
         self.events()
         self.move()
+        self.integrate()
         self.update_groups()
         self._tick += 1
         return agent_parameters
@@ -158,8 +294,20 @@ class BasicWorld(BaseWorld):
         total_ticks: int,
         output_dir: str,
         boundaries: typing.Tuple[int, int] = (1000, 1000),
+        stream_history: bool = False,
+        changes_only_history: bool = False,
+        history_format: typing.Optional[history.HistoryFormat] = None,
+        seed: typing.Optional[int] = None,
     ) -> None:
-        super().__init__(total_ticks, output_dir, boundaries)
+        super().__init__(
+            total_ticks,
+            output_dir,
+            boundaries,
+            stream_history=stream_history,
+            changes_only_history=changes_only_history,
+            history_format=history_format,
+            seed=seed,
+        )
 
         # Set up events
         self.add_tick_event(events.EventType.SPAWN_FOOD_EVENT, 200)
@@ -169,23 +317,21 @@ class BasicWorld(BaseWorld):
 
     def _reinitialize(self) -> None:
         # Create initial entities
-        self.creature_group = entities.EntityGroup(
+        self.creature_group = self.create_group(
             [
-                entities.Creature(
+                self.create_creature(
                     math_utils.Vector2D(100, 100),
                     math_utils.Vector2D(1.0, 0),
-                    0,
-                    self._history,
                 )
             ],
             "creature_group",
         )
         self.add_entities_group(self.creature_group)
-        self.food_group = entities.EntityGroup(
+        self.food_group = self.create_group(
             [
-                entities.Food(math_utils.Vector2D(500, 500), 0, self._history),
-                entities.Food(math_utils.Vector2D(500, 400), 0, self._history),
-                entities.Food(math_utils.Vector2D(500, 300), 0, self._history),
+                self.create_food(math_utils.Vector2D(500, 500)),
+                self.create_food(math_utils.Vector2D(500, 400)),
+                self.create_food(math_utils.Vector2D(500, 300)),
             ],
             "food_group",
         )
@@ -196,13 +342,11 @@ class BasicWorld(BaseWorld):
 
     def spawn_food(self) -> None:
         self.food_group.add(
-            entities.Food(
+            self.create_food(
                 math_utils.Vector2D(
-                    random.randint(5, self._boundaries.x - 5),
-                    random.randint(5, self._boundaries.y - 5),
-                ),
-                self._tick,
-                self._history,
+                    self._rng.randint(5, int(self._boundaries.x) - 5),
+                    self._rng.randint(5, int(self._boundaries.y) - 5),
+                )
             )
         )
 
@@ -0,0 +1,285 @@
+from dataclasses import dataclass
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+import traceback
+import typing
+
+import numpy as np
+
+from rlgameoflife import actions
+
+from . import base_world
+from . import vector_world
+
+
+class VectorWorldWorkerException(Exception):
+    """raised when a worker process of a vector world fails."""
+
+
+@dataclass
+class SharedArraySpec:
+    name: str
+    shape: typing.Tuple[int, ...]
+    dtype: str
+
+    def attach(self) -> typing.Tuple[shared_memory.SharedMemory, np.ndarray]:
+        shm = shared_memory.SharedMemory(name=self.name)
+        return shm, np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+
+
+def _create_shared_array(
+    shape: typing.Tuple[int, ...], dtype
+) -> typing.Tuple[shared_memory.SharedMemory, np.ndarray, SharedArraySpec]:
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(
+        create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1)
+    )
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    array.fill(0)
+    return shm, array, SharedArraySpec(shm.name, shape, dtype.str)
+
+
+class _SharedVectorAgentWorld(vector_world.VectorAgentWorld):
+    """Vector world of a worker, writing its steps in its rows of the shared arrays."""
+
+    def __init__(
+        self,
+        world_factory: typing.Callable[[], base_world.BaseWorld],
+        num_worlds: int,
+        max_episode_ticks: typing.Optional[int],
+        shared_arrays: typing.List[np.ndarray],
+        world_slice: slice,
+    ) -> None:
+        self._shared_arrays = shared_arrays
+        self._world_slice = world_slice
+        super().__init__(world_factory, num_worlds, max_episode_ticks, copy=False)
+
+    def _allocate_buffers(
+        self, num_worlds: int, observation_size: int
+    ) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        return tuple(array[self._world_slice] for array in self._shared_arrays)
+
+
+def _worker(
+    connection,
+    world_factory: typing.Callable[[], base_world.BaseWorld],
+    world_slice: slice,
+    max_episode_ticks: typing.Optional[int],
+    array_specs: typing.List[SharedArraySpec],
+    actions_spec: SharedArraySpec,
+) -> None:
+    shms = []
+    try:
+        shared_arrays = []
+        for array_spec in array_specs:
+            shm, array = array_spec.attach()
+            shms.append(shm)
+            shared_arrays.append(array)
+        shm, step_actions = actions_spec.attach()
+        shms.append(shm)
+        worlds = _SharedVectorAgentWorld(
+            world_factory,
+            world_slice.stop - world_slice.start,
+            max_episode_ticks,
+            shared_arrays,
+            world_slice,
+        )
+        connection.send(("ready", None))
+        while True:
+            command, data = connection.recv()
+            if command == "step":
+                step_parameters = worlds.step(step_actions[world_slice])
+                connection.send(("step", step_parameters.info))
+            elif command == "reset":
+                seed = None if data is None else data + world_slice.start
+                worlds.reset(seed)
+                connection.send(("reset", None))
+            elif command == "close":
+                break
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        connection.send(("error", traceback.format_exc()))
+    finally:
+        for shm in shms:
+            try:
+                shm.close()
+            except BufferError:
+                pass
+        connection.close()
+
+
+class SubprocessVectorAgentWorld:
+    """Copies of an agent world stepped in worker processes.
+
+    The worlds are split between the workers, which write their observations, rewards and flags in shared memory
+    arrays read without copy by the main process, only the infos are sent back through the pipes.
+    The worlds are reset at the end of their episodes as in VectorAgentWorld.
+    With copy=False the returned arrays are the shared arrays, overwritten by the next step or reset.
+    """
+
+    def __init__(
+        self,
+        world_factory: typing.Callable[[], base_world.BaseWorld],
+        num_worlds: int,
+        num_workers: typing.Optional[int] = None,
+        max_episode_ticks: typing.Optional[int] = None,
+        seed: typing.Optional[int] = None,
+        copy: bool = True,
+        start_method: typing.Optional[str] = None,
+    ) -> None:
+        self._logger = logging.getLogger(__class__.__name__)
+        self._num_worlds = num_worlds
+        self._copy = copy
+        self._closed = False
+        if num_workers is None:
+            num_workers = min(num_worlds, multiprocessing.cpu_count())
+        num_workers = max(1, min(num_workers, num_worlds))
+
+        probe_world = world_factory()
+        self.action_space = probe_world.action_space
+        observation_size = len(probe_world.get_observation())
+        self.observation_shape = (observation_size,)
+        del probe_world
+
+        self._shms = []
+        array_specs = []
+        self._arrays = []
+        for shape, dtype in (
+            ((num_worlds, observation_size), np.float32),
+            ((num_worlds,), np.float32),
+            ((num_worlds,), bool),
+            ((num_worlds,), bool),
+        ):
+            shm, array, array_spec = _create_shared_array(shape, dtype)
+            self._shms.append(shm)
+            self._arrays.append(array)
+            array_specs.append(array_spec)
+        self._observations, self._rewards, self._terminated, self._truncated = self._arrays
+        shm, self._actions, actions_spec = _create_shared_array((num_worlds,), np.int64)
+        self._shms.append(shm)
+
+        context = multiprocessing.get_context(start_method)
+        bounds = np.linspace(0, num_worlds, num_workers + 1).astype(int)
+        self._connections = []
+        self._processes = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(
+                target=_worker,
+                args=(
+                    child_connection,
+                    world_factory,
+                    slice(int(start), int(stop)),
+                    max_episode_ticks,
+                    array_specs,
+                    actions_spec,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child_connection.close()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+        self._receive_all()
+        self.reset(seed)
+
+    @property
+    def num_worlds(self) -> int:
+        return self._num_worlds
+
+    @property
+    def num_workers(self) -> int:
+        return len(self._processes)
+
+    def __len__(self) -> int:
+        return self._num_worlds
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback) -> None:
+        self.close()
+
+    def _output(self, array: np.ndarray) -> np.ndarray:
+        return array.copy() if self._copy else array
+
+    def _receive_all(self) -> list:
+        results = []
+        errors = []
+        for connection in self._connections:
+            try:
+                command, data = connection.recv()
+            except EOFError:
+                command, data = "error", "worker process exited"
+            if command == "error":
+                errors.append(data)
+            else:
+                results.append(data)
+        if errors:
+            self._logger.error("vector world worker failed:\n%s", errors[0])
+            self.close()
+            raise VectorWorldWorkerException(errors[0])
+        return results
+
+    def reset(self, seed: typing.Optional[int] = None) -> np.ndarray:
+        """Reset every world, the world i being seeded with seed + i."""
+        for connection in self._connections:
+            connection.send(("reset", seed))
+        self._receive_all()
+        return self._output(self._observations)
+
+    def step_async(self, step_actions: np.ndarray) -> None:
+        """Send the actions to the workers without waiting for the step to be done."""
+        step_actions = np.asarray(step_actions).reshape(-1)
+        if len(step_actions) != self._num_worlds:
+            self._logger.error(
+                "%d actions for %d worlds", len(step_actions), self._num_worlds
+            )
+            raise actions.BadActionTypeException()
+        self._actions[:] = step_actions
+        for connection in self._connections:
+            connection.send(("step", None))
+
+    def step_wait(self) -> vector_world.VectorAgentParameters:
+        """Wait for the step sent by step_async."""
+        infos = [info for worker_infos in self._receive_all() for info in worker_infos]
+        return vector_world.VectorAgentParameters(
+            observation=self._output(self._observations),
+            reward=self._output(self._rewards),
+            terminated=self._output(self._terminated),
+            truncated=self._output(self._truncated),
+            info=infos,
+        )
+
+    def step(self, step_actions: np.ndarray) -> vector_world.VectorAgentParameters:
+        self.step_async(step_actions)
+        return self.step_wait()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        for connection, process in zip(self._connections, self._processes):
+            if process.is_alive():
+                try:
+                    connection.send(("close", None))
+                except (BrokenPipeError, OSError):
+                    pass
+        for connection, process in zip(self._connections, self._processes):
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            connection.close()
+        self._arrays = []
+        self._observations = self._rewards = self._terminated = self._truncated = None
+        self._actions = None
+        for shm in self._shms:
+            try:
+                shm.close()
+            except BufferError:
+                # Arrays returned with copy=False still reference the memory, it is freed with them.
+                pass
+            shm.unlink()
+        self._shms = []
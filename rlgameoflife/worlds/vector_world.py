@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+import logging
+import typing
+
+import numpy as np
+
+from rlgameoflife import actions
+
+from . import base_world
+
+
+@dataclass
+class VectorAgentParameters:
+    observation: np.ndarray
+    reward: np.ndarray
+    terminated: np.ndarray
+    truncated: np.ndarray
+    info: typing.List[dict]
+
+
+class VectorAgentWorld:
+    """Independent copies of an agent world stepped together, their results stacked in preallocated arrays.
+
+    A world is reset as soon as its episode is terminated or truncated: the observation returned for it is
+    the first one of its next episode and the last one of the finished episode is in its info as "final_observation".
+    With copy=False the returned arrays are the buffers of the vector world, overwritten by the next step or reset.
+    """
+
+    def __init__(
+        self,
+        world_factory: typing.Callable[[], base_world.BaseWorld],
+        num_worlds: int,
+        max_episode_ticks: typing.Optional[int] = None,
+        seed: typing.Optional[int] = None,
+        copy: bool = True,
+    ) -> None:
+        self._logger = logging.getLogger(__class__.__name__)
+        self._worlds = [world_factory() for _ in range(num_worlds)]
+        self._copy = copy
+        self.action_space = self._worlds[0].action_space
+        self._max_episode_ticks = (
+            max_episode_ticks
+            if max_episode_ticks is not None
+            else self._worlds[0].total_ticks
+        )
+        observation_size = len(self._worlds[0].get_observation())
+        self.observation_shape = (observation_size,)
+
+        (
+            self._observations,
+            self._rewards,
+            self._terminated,
+            self._truncated,
+        ) = self._allocate_buffers(num_worlds, observation_size)
+        self.reset(seed)
+
+    def _allocate_buffers(
+        self, num_worlds: int, observation_size: int
+    ) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Observations, rewards, terminated and truncated arrays the steps are written into."""
+        return (
+            np.zeros((num_worlds, observation_size), dtype=np.float32),
+            np.zeros(num_worlds, dtype=np.float32),
+            np.zeros(num_worlds, dtype=bool),
+            np.zeros(num_worlds, dtype=bool),
+        )
+
+    @property
+    def worlds(self) -> typing.List[base_world.BaseWorld]:
+        return self._worlds
+
+    @property
+    def num_worlds(self) -> int:
+        return len(self._worlds)
+
+    def __len__(self) -> int:
+        return len(self._worlds)
+
+    def seed(self, seed: typing.Optional[int]) -> None:
+        """Seed the world i with seed + i."""
+        for world_idx, world in enumerate(self._worlds):
+            world.seed(None if seed is None else seed + world_idx)
+
+    def _output(self, array: np.ndarray) -> np.ndarray:
+        return array.copy() if self._copy else array
+
+    def reset(self, seed: typing.Optional[int] = None) -> np.ndarray:
+        if seed is not None:
+            self.seed(seed)
+        for world_idx, world in enumerate(self._worlds):
+            world.reset()
+            self._observations[world_idx] = world.get_observation()
+        return self._output(self._observations)
+
+    def step(self, step_actions: np.ndarray) -> VectorAgentParameters:
+        """Step every world with its action, given as action values."""
+        step_actions = np.asarray(step_actions).reshape(-1)
+        if len(step_actions) != len(self._worlds):
+            self._logger.error(
+                "%d actions for %d worlds", len(step_actions), len(self._worlds)
+            )
+            raise actions.BadActionTypeException()
+        infos = []
+        for world_idx, (world, action) in enumerate(zip(self._worlds, step_actions.tolist())):
+            agent_parameters = world.step(self.action_space(action))
+            info = dict(agent_parameters.info)
+            self._rewards[world_idx] = agent_parameters.reward
+            self._terminated[world_idx] = agent_parameters.terminated
+            self._truncated[world_idx] = (
+                agent_parameters.truncated or world.tick >= self._max_episode_ticks
+            )
+            if self._terminated[world_idx] or self._truncated[world_idx]:
+                info["final_observation"] = agent_parameters.observation
+                world.reset()
+                self._observations[world_idx] = world.get_observation()
+            else:
+                self._observations[world_idx] = agent_parameters.observation
+            infos.append(info)
+        return VectorAgentParameters(
+            observation=self._output(self._observations),
+            reward=self._output(self._rewards),
+            terminated=self._output(self._terminated),
+            truncated=self._output(self._truncated),
+            info=infos,
+        )
@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+import torch
+
+from rlgameoflife import actor_learner
+from rlgameoflife import agent
+
+
+class ActorLearnerTrainerTestCase(unittest.TestCase):
+    def test_train(self):
+        trainer = actor_learner.ActorLearnerTrainer(
+            agent.AgentTrainerParameters(batch_size=16, num_episodes=2, max_steps_per_episode=64),
+            actor_learner.ActorLearnerParameters(
+                num_actors=2, learner_sync_every=4, actor_sync_every=8, actor_send_every=8, start_method="fork"
+            ),
+        )
+        messages = []
+        push_batch = trainer.memory.push_batch
+        trainer.memory.push_batch = lambda *message: messages.append(message) or push_batch(*message)
+        trainer.train(save_final_eval=False)
+        self.assertGreaterEqual(len(trainer.memory), 128)
+        self.assertEqual(len(trainer.memory), 8 * len(messages))
+        self.assertGreater(trainer.learner_steps, 0)
+        self.assertTrue(all(not process.is_alive() for process in trainer._actors))
+        self.assertEqual(trainer._weights_version.value, trainer.learner_steps // 4)
+
+        n_observations = trainer.memory.states.shape[1]
+        states, step_actions, next_states, rewards, dones = messages[0]
+        self.assertEqual(states.shape, (8, n_observations))
+        self.assertEqual(states.dtype, np.float32)
+        self.assertEqual(next_states.shape, (8, n_observations))
+        self.assertEqual(step_actions.shape, (8,))
+        self.assertEqual(step_actions.dtype, np.int64)
+        self.assertEqual(rewards.dtype, np.float32)
+        self.assertEqual(dones.dtype, bool)
+        # The first message fills the first rows of the replay memory.
+        torch.testing.assert_close(trainer.memory.states[:8], torch.from_numpy(states))
+        torch.testing.assert_close(trainer.memory.actions[:8, 0], torch.from_numpy(step_actions))
+        torch.testing.assert_close(trainer.memory.rewards[:8], torch.from_numpy(rewards))
+        self.assertTrue(
+            ((trainer.memory.actions[: len(trainer.memory)] >= 0)
+             & (trainer.memory.actions[: len(trainer.memory)] < len(trainer.world.action_space))).all()
+        )
@@ -0,0 +1,129 @@
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+import torch
+
+from rlgameoflife import agent
+
+
+class ReplayMemoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.memory = agent.ReplayMemory(4, 3)
+
+    def test_push(self):
+        self.memory.push(torch.ones(1, 3), torch.tensor([[2]]), torch.full((1, 3), 2.0), torch.tensor([1.0]))
+        self.memory.push(torch.ones(1, 3), torch.tensor([[1]]), None, torch.tensor([0.0]))
+        self.assertEqual(len(self.memory), 2)
+        batch = self.memory.sample(16)
+        self.assertEqual(batch.state.shape, (16, 3))
+        self.assertEqual(batch.action.shape, (16, 1))
+        self.assertTrue(torch.equal(batch.done, batch.action[:, 0] == 1))
+        self.assertTrue(torch.equal(batch.reward, (~batch.done).float()))
+        self.assertTrue(torch.equal(batch.next_state[batch.done], torch.zeros(int(batch.done.sum()), 3)))
+
+    def test_ring_buffer(self):
+        for step in range(6):
+            self.memory.push(torch.full((1, 3), float(step)), torch.tensor([[0]]), None, torch.tensor([step]))
+        self.assertEqual(len(self.memory), 4)
+        self.assertListEqual(sorted(self.memory.rewards.tolist()), [2.0, 3.0, 4.0, 5.0])
+
+    def test_push_batch(self):
+        self.memory.push_batch(
+            torch.arange(9.0).view(3, 3), [0, 1, 2], torch.ones(3, 3), [1.0, 2.0, 3.0], [False, True, False]
+        )
+        self.memory.push_batch(torch.zeros(2, 3), [3, 3], torch.ones(2, 3), [4.0, 5.0], [False, False])
+        self.assertEqual(len(self.memory), 4)
+        self.assertListEqual(self.memory.rewards.tolist(), [5.0, 2.0, 3.0, 4.0])
+        self.assertListEqual(self.memory.next_states[1].tolist(), [0.0, 0.0, 0.0])
+        self.assertListEqual(self.memory.actions.view(-1).tolist(), [3, 1, 2, 3])
+
+
+class SumTreeTestCase(unittest.TestCase):
+    @parameterized.expand([(1,), (5,), (8,)])
+    def test_update_and_find(self, capacity):
+        sum_tree = agent.SumTree(capacity)
+        priorities = np.arange(1.0, capacity + 1)
+        sum_tree.update(np.arange(capacity), priorities)
+        self.assertAlmostEqual(sum_tree.total, priorities.sum())
+        self.assertEqual(sum_tree.max, capacity)
+        prefix_sums = np.cumsum(priorities)
+        values = np.concatenate((prefix_sums - 0.5, [0.0]))
+        np.testing.assert_array_equal(sum_tree.find(values), list(range(capacity)) + [0])
+        sum_tree.update([0], 10.0)
+        self.assertAlmostEqual(sum_tree.total, priorities.sum() + 9.0)
+        np.testing.assert_array_equal(sum_tree[[0]], [10.0])
+
+
+class PrioritizedReplayMemoryTestCase(unittest.TestCase):
+    def test_sample_by_priority(self):
+        memory = agent.PrioritizedReplayMemory(8, 2, alpha=1.0, beta=1.0)
+        memory.push_batch(torch.zeros(8, 2), np.arange(8) % 4, torch.zeros(8, 2), np.zeros(8), np.zeros(8, dtype=bool))
+        memory.update_priorities(np.arange(8), [0.0] * 7 + [1.0])
+        batch = memory.sample(64)
+        self.assertGreater((batch.indices == 7).mean(), 0.9)
+        self.assertTrue(torch.all(batch.weights <= 1.0))
+        self.assertEqual(float(batch.weights[batch.indices == 7].max()), float(batch.weights.min()))
+
+    def test_new_transitions_max_priority(self):
+        memory = agent.PrioritizedReplayMemory(4, 2)
+        memory.push(torch.zeros(1, 2), torch.tensor([[0]]), None, torch.tensor([0.0]))
+        memory.update_priorities([0], [3.0])
+        memory.push(torch.zeros(1, 2), torch.tensor([[0]]), None, torch.tensor([0.0]))
+        self.assertEqual(memory.sum_tree[1], memory.sum_tree[0])
+        self.assertEqual(len(memory), 2)
+
+
+class AgentTrainerTestCase(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.trainer = agent.AgentTrainer(
+            agent.AgentTrainerParameters(batch_size=8, gradient_steps=3, target_update_every=2)
+        )
+
+    def test_update_target_net(self):
+        tau = self.trainer.hyperparameters.tau
+        with torch.no_grad():
+            for parameter in self.trainer.target_net.parameters():
+                parameter.add_(1.0)
+        expected = {
+            key: policy_value * tau + self.trainer.target_net.state_dict()[key] * (1 - tau)
+            for key, policy_value in self.trainer.policy_net.state_dict().items()
+        }
+        self.trainer.update_target_net()
+        for key, value in self.trainer.target_net.state_dict().items():
+            torch.testing.assert_close(value, expected[key])
+
+    def test_learn(self):
+        self.assertIsNone(self.trainer.learn())
+        n_observations = self.trainer.memory.states.shape[1]
+        self.trainer.memory.push_batch(
+            torch.rand(8, n_observations), np.zeros(8), torch.rand(8, n_observations), np.ones(8), np.zeros(8, dtype=bool)
+        )
+        target_state = [parameter.clone() for parameter in self.trainer.target_net.parameters()]
+        self.assertIsInstance(self.trainer.learn(), float)
+        self.assertEqual(self.trainer.gradient_steps_done, 3)
+        self.assertFalse(torch.equal(target_state[0], next(self.trainer.target_net.parameters())))
+
+    def test_select_actions(self):
+        observations = np.stack([self.trainer.world.get_observation()] * 5)
+        with torch.no_grad():
+            greedy = self.trainer.policy_net(torch.tensor(observations, dtype=torch.float32)).argmax(1).numpy()
+        np.testing.assert_array_equal(self.trainer.select_actions(observations, training=False), greedy)
+        np.testing.assert_array_equal(self.trainer.select_actions(observations, epsilons=np.zeros(5)), greedy)
+        self.assertEqual(self.trainer.steps_done, 5)
+        step_actions = self.trainer.select_actions(np.stack([observations[0]] * 200), epsilons=np.ones(200))
+        self.assertEqual(step_actions.shape, (200,))
+        self.assertEqual(len(np.unique(step_actions)), len(self.trainer.world.action_space))
+        step_actions = self.trainer.select_actions(observations, epsilons=np.array([0, 1, 0, 1, 0]))
+        np.testing.assert_array_equal(step_actions[[0, 2, 4]], greedy[[0, 2, 4]])
+
+    def test_train_vector_world(self):
+        trainer = agent.AgentTrainer(
+            agent.AgentTrainerParameters(
+                num_episodes=2, max_steps_per_episode=5, batch_size=4, num_worlds=3, eval_each_n_episode=0
+            )
+        )
+        trainer.train(save_final_eval=False)
+        self.assertEqual(len(trainer.memory), 30)
+        self.assertEqual(trainer.env_steps_done, 10)
@@ -1,5 +1,6 @@
 import unittest
 
+import numpy as np
 from parameterized import parameterized
 
 from rlgameoflife import entities
@@ -10,13 +11,15 @@ from rlgameoflife import math_utils
 class TestCreatureFoodCollider(unittest.TestCase):
     def setUp(self):
         self.history = entities.EntitiesHistoryLoader("tmp")
+        self.store = entities.EntityStore()
 
         self.food_group = entities.EntityGroup(
             [
-                entities.Food(math_utils.Vector2D(50, 50), 0, self.history),
-                entities.Food(math_utils.Vector2D(58, 50), 0, self.history),
+                entities.Food(math_utils.Vector2D(50, 50), 0, self.history, store=self.store),
+                entities.Food(math_utils.Vector2D(58, 50), 0, self.history, store=self.store),
             ],
             "food_group",
+            store=self.store,
         )
 
         self.creature_group = entities.EntityGroup(
@@ -26,13 +29,15 @@ class TestCreatureFoodCollider(unittest.TestCase):
                     math_utils.Vector2D(1.0, 0.0),
                     0,
                     self.history,
+                    store=self.store,
                 )
             ],
             "creature_group",
+            store=self.store,
         )
 
         self.all_group = entities.EntityGroup(
-            [self.food_group, self.creature_group], "test_group"
+            [self.food_group, self.creature_group], "test_group", store=self.store
         )  # initialize as per your definition
         self.creature_food_collider = collider.CreatureFoodCollider(self.creature_group)
 
@@ -44,8 +49,28 @@ class TestCreatureFoodCollider(unittest.TestCase):
         ]
     )
     def test_collide(self, target_position, expected):
-        target_entity = entities.Creature(target_position, math_utils.Vector2D(1.0, 0.0), 0, self.history)
-        target_group = entities.EntityGroup([target_entity], "target_group")
+        target_entity = entities.Creature(target_position, math_utils.Vector2D(1.0, 0.0), 0, self.history, store=self.store)
+        target_group = entities.EntityGroup([target_entity], "target_group", store=self.store)
         creature_food_collider = collider.CreatureFoodCollider(target_group)
         got = creature_food_collider.collide(self.all_group)
         self.assertEqual(got, expected)
+
+    def test_collide_batch(self):
+        target_group = entities.EntityGroup(
+            [
+                entities.Creature(math_utils.Vector2D(54, 50), math_utils.Vector2D(1.0, 0.0), 0, self.history, store=self.store),
+                entities.Creature(math_utils.Vector2D(58, 52), math_utils.Vector2D(1.0, 0.0), 0, self.history, store=self.store),
+                entities.Creature(math_utils.Vector2D(10, 10), math_utils.Vector2D(1.0, 0.0), 0, self.history, store=self.store),
+            ],
+            "target_group",
+            store=self.store,
+        )
+        creature_food_collider = collider.CreatureFoodCollider(target_group)
+        got = creature_food_collider.collide_batch(self.all_group)
+        np.testing.assert_array_equal(got.rewards, [2.0, 0.0, 0.0])
+        np.testing.assert_array_equal(
+            np.sort(got.eaten_slots), np.sort(self.food_group.slots())
+        )
+        self.assertEqual(len(self.food_group), 2)
+        creature_food_collider.collide(self.all_group)
+        self.assertEqual(len(self.food_group), 0)
@@ -2,8 +2,10 @@ import os
 import tempfile
 import unittest
 import numpy as np
+from parameterized import parameterized
 
 from rlgameoflife import entities
+from rlgameoflife import history
 from rlgameoflife import math_utils
 
 
@@ -30,6 +32,20 @@ class EntitiesHistoryLoaderTestCase(unittest.TestCase):
         self.assertEqual(history_np[0, 4], self.dir.y)
         self.assertEqual(history_np[0, 5], self.entity_type.value)
 
+    def test_add_many_ticks(self):
+        for tick in range(1000):
+            self.loader.add(self.entity_name, tick, math_utils.Vector2D(tick, 2), self.dir, self.entity_type)
+        history_np = self.loader.get_history(self.entity_name)
+        self.assertEqual(history_np.shape, (1000, 6))
+        np.testing.assert_array_equal(history_np[:, 0], np.arange(1000))
+        np.testing.assert_array_equal(history_np[:, 1], np.arange(1000))
+        self.assertEqual(self.loader.get_total_ticks(), 999)
+
+    def test_add_same_tick(self):
+        self.loader.add(self.entity_name, self.tick, self.pos, self.dir, self.entity_type)
+        with self.assertRaises(history.TickNotIncreasingException):
+            self.loader.add(self.entity_name, self.tick, self.pos, self.dir, self.entity_type)
+
     def test_save_and_load(self):
         self.loader.add(self.entity_name, self.tick, self.pos, self.dir, self.entity_type)
         self.loader.save()
@@ -62,3 +78,452 @@ class EntitiesHistoryLoaderTestCase(unittest.TestCase):
         np.testing.assert_array_equal(timed_history[2][self.entity_name]["direction"], np.array([7, 8]))
         np.testing.assert_array_equal(timed_history[2][self.entity_name]["type"], np.array([entities.EntityType.FOOD.value]))
         self.assertTupleEqual(boundaries, (1, 2, 5, 6))
+
+    def test_tick_index(self):
+        self.loader.add("entity1", -1, math_utils.Vector2D(-50, 2), math_utils.Vector2D(1, 0), entities.EntityType.CREATURE)
+        self.loader.add("entity1", 0, math_utils.Vector2D(1, 2), math_utils.Vector2D(1, 0), entities.EntityType.CREATURE)
+        self.loader.add("entity2", 2, math_utils.Vector2D(5, 6), math_utils.Vector2D(0, 1), entities.EntityType.FOOD)
+        self.loader.add("entity1", 2, math_utils.Vector2D(3, 4), math_utils.Vector2D(1, 0), entities.EntityType.CREATURE)
+        tick_index = self.loader.get_tick_index()
+        self.assertEqual(tick_index.total_ticks, 2)
+        self.assertTupleEqual(tick_index.bounds, (1, 2, 5, 6))
+        self.assertEqual(len(tick_index.frame(1).names), 0)
+        frame = tick_index.frame(2)
+        self.assertListEqual(frame.names.tolist(), ["entity1", "entity2"])
+        np.testing.assert_array_equal(frame.positions, [[3, 4], [5, 6]])
+        np.testing.assert_array_equal(frame.directions, [[1, 0], [0, 1]])
+        np.testing.assert_array_equal(
+            frame.types, [entities.EntityType.CREATURE.value, entities.EntityType.FOOD.value]
+        )
+        self.loader.add("entity2", 3, math_utils.Vector2D(5, 6), math_utils.Vector2D(0, 1), entities.EntityType.FOOD)
+        self.assertEqual(self.loader.get_tick_index().total_ticks, 3)
+
+
+class EntityStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.store = entities.EntityStore(capacity=2)
+        self.history = entities.EntitiesHistoryLoader(tempfile.mkdtemp(), disable=True)
+
+    def test_entity_state_in_store(self):
+        creature = entities.Creature(
+            math_utils.Vector2D(1, 2), math_utils.Vector2D(0, 3), 0, self.history, store=self.store
+        )
+        np.testing.assert_array_equal(self.store.positions[creature.slot], [1, 2])
+        np.testing.assert_array_equal(self.store.directions[creature.slot], [0, 1])
+        self.assertEqual(self.store.types[creature.slot], entities.EntityType.CREATURE.value)
+        self.assertEqual(self.store.max_speeds[creature.slot], 2.0)
+        creature.move(math_utils.Vector2D(0, 1))
+        creature.update()
+        np.testing.assert_array_almost_equal(self.store.positions[creature.slot], [1, 3])
+        self.assertEqual(creature.position.y, self.store.positions[creature.slot, 1])
+
+    def test_integrate(self):
+        creatures = [
+            entities.Creature(math_utils.Vector2D(0, 0), math_utils.Vector2D(1, 0), 0, self.history, store=self.store)
+            for _ in range(4)
+        ]
+        # Clamped to the max speed and the max angle.
+        creatures[0].move(math_utils.Vector2D(0, 10))
+        creatures[1].rotate(-1.0)
+        # The rotation replaces the direction of the move, the move replaces the rotation.
+        creatures[2].move(math_utils.Vector2D(1, 0))
+        creatures[2].rotate(0.01)
+        creatures[3].rotate(0.01)
+        creatures[3].move(math_utils.Vector2D(1, 0))
+        group = entities.EntityGroup(list(creatures), "creature_group", store=self.store)
+        self.store.integrate()
+        self.assertFalse(self.store.intents[group.slots()].any())
+        group.update()
+        np.testing.assert_array_almost_equal(
+            group.positions, [[2 * np.cos(0.02), -2 * np.sin(0.02)], [0, 0], [1, 0], [1, 0]]
+        )
+        np.testing.assert_array_almost_equal(
+            group.directions,
+            [[np.cos(0.02), -np.sin(0.02)], [np.cos(0.02), -np.sin(0.02)], [np.cos(0.01), np.sin(0.01)], [1, 0]],
+        )
+        np.testing.assert_array_equal(self.store.ticks[group.slots()], [1, 1, 1, 1])
+
+    def test_grow_and_reuse_slots(self):
+        foods = [
+            entities.Food(math_utils.Vector2D(i, i), 0, self.history, store=self.store)
+            for i in range(5)
+        ]
+        self.assertGreaterEqual(self.store.capacity, 5)
+        self.assertEqual(len(self.store), 5)
+        np.testing.assert_array_equal(foods[4].position.vector, [4, 4])
+        group = entities.EntityGroup(list(foods), "food_group", store=self.store)
+        group.kill(1)
+        self.assertEqual(len(self.store), 4)
+        food = entities.Food(math_utils.Vector2D(9, 9), 0, self.history, store=self.store)
+        self.assertEqual(food.slot, foods[1].slot)
+        self.assertEqual(self.store.size, 5)
+
+    def test_group_view(self):
+        food_group = entities.EntityGroup(
+            [entities.Food(math_utils.Vector2D(i, 0), 0, self.history, store=self.store) for i in range(3)],
+            "food_group",
+            store=self.store,
+        )
+        creature = entities.Creature(
+            math_utils.Vector2D(5, 5), math_utils.Vector2D(1, 0), 0, self.history, store=self.store
+        )
+        all_group = entities.EntityGroup(
+            [food_group, entities.EntityGroup([creature], "creature_group", store=self.store)],
+            "all_group",
+            store=self.store,
+        )
+        np.testing.assert_array_equal(all_group.positions[:, 0], [0, 1, 2, 5])
+        np.testing.assert_array_equal(
+            all_group.types,
+            [entities.EntityType.FOOD.value] * 3 + [entities.EntityType.CREATURE.value],
+        )
+
+    def test_reject_entity_from_other_store(self):
+        food = entities.Food(math_utils.Vector2D(1, 1), 0, self.history, store=entities.EntityStore())
+        group = entities.EntityGroup([], "food_group", store=self.store)
+        group.add(food)
+        self.assertEqual(len(group), 0)
+
+
+class EntityGroupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.store = entities.EntityStore()
+        self.history = entities.EntitiesHistoryLoader(tempfile.mkdtemp(), disable=True)
+        self.foods = [entities.Food(math_utils.Vector2D(i, 0), 0, self.history, store=self.store) for i in range(5)]
+        self.food_group = entities.EntityGroup(list(self.foods), "food_group", store=self.store)
+        self.creature = entities.Creature(
+            math_utils.Vector2D(5, 5), math_utils.Vector2D(1, 0), 0, self.history, store=self.store
+        )
+        self.group = entities.EntityGroup([self.food_group, self.creature], "all_group", store=self.store)
+
+    def test_name_lookup(self):
+        self.assertIs(self.food_group[self.foods[3].name], self.foods[3])
+        self.assertIs(self.group["food_group"], self.food_group)
+        with self.assertRaises(KeyError):
+            self.group[self.foods[3].name]
+
+    def test_kill_swaps_last_entity(self):
+        self.food_group.kill(1)
+        self.assertListEqual(list(self.food_group), [self.foods[0], self.foods[4], self.foods[2], self.foods[3]])
+        self.assertIs(self.food_group[self.foods[4].name], self.foods[4])
+        self.food_group.kills([0, 3])
+        self.assertListEqual(sorted(self.food_group.keys()), sorted([self.foods[2].name, self.foods[4].name]))
+        self.assertEqual(len(self.store), 3)
+
+    def test_kill_slots(self):
+        self.group.kill_slots(np.array([self.foods[0].slot, self.foods[4].slot, self.creature.slot]))
+        self.assertListEqual(sorted(self.food_group.keys()), sorted(food.name for food in self.foods[1:4]))
+        self.assertListEqual(self.group.keys(), ["food_group"])
+        with self.assertRaises(KeyError):
+            self.food_group[self.foods[0].name]
+
+    def test_view(self):
+        view = self.group.view()
+        self.assertListEqual(view.entities, self.foods + [self.creature])
+        self.assertListEqual(view.type_entities[entities.EntityType.FOOD], self.foods)
+        np.testing.assert_array_equal(self.group.slots(entities.EntityType.CREATURE), [self.creature.slot])
+        self.assertIs(self.group.view(), view)
+        with self.assertRaises(ValueError):
+            self.group.slots()[0] = 0
+
+    def test_view_invalidated_from_sub_group(self):
+        view = self.group.view()
+        slot_mask = self.group.slot_mask()
+        self.food_group.kill(0)
+        self.assertIsNot(self.group.view(), view)
+        self.assertNotIn(self.foods[0].slot, self.group.slots())
+        self.assertFalse(self.group.slot_mask()[self.foods[0].slot])
+        food = entities.Food(math_utils.Vector2D(9, 9), 0, self.history, store=self.store)
+        self.food_group.add(food)
+        self.assertIn(food, self.group.view().type_entities[entities.EntityType.FOOD])
+        self.assertTrue(self.group.slot_mask()[food.slot])
+        self.assertIsNot(self.group.slot_mask(), slot_mask)
+
+    def test_nested_iteration(self):
+        pairs = [(first, second) for first in self.food_group for second in self.food_group]
+        self.assertEqual(len(pairs), 25)
+        for food in self.food_group:
+            self.food_group.kill(0)
+        self.assertEqual(len(self.food_group), 0)
+
+
+    def test_update_records_history(self):
+        group_history = entities.EntitiesHistoryLoader(tempfile.mkdtemp())
+        entity_history = entities.EntitiesHistoryLoader(tempfile.mkdtemp())
+        recorded = []
+        for history_loader in (group_history, entity_history):
+            store = entities.EntityStore()
+            creature = entities.Creature(
+                math_utils.Vector2D(5, 5), math_utils.Vector2D(1, 0), 0, history_loader, store=store
+            )
+            food = entities.Food(math_utils.Vector2D(1, 1), 0, history_loader, store=store)
+            recorded.append((creature, food, entities.EntityGroup([creature, food], "all_group", store=store)))
+        for _ in range(3):
+            for creature, _, _ in recorded:
+                creature.move(math_utils.Vector2D(1, 1))
+            recorded[0][2].update()
+            for entity in recorded[1][:2]:
+                entity.update()
+        for group_entity, entity in zip(recorded[0][:2], recorded[1][:2]):
+            self.assertEqual(len(group_history.get_history(group_entity.name)), 4)
+            np.testing.assert_array_equal(
+                group_history.get_history(group_entity.name), entity_history.get_history(entity.name)
+            )
+
+class EntityPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.store = entities.EntityStore()
+        self.pool = entities.EntityPool()
+        self.store.attach_entity_pool(self.pool)
+        self.history = entities.EntitiesHistoryLoader(tempfile.mkdtemp())
+        self.foods = [entities.Food(math_utils.Vector2D(i, 0), 0, self.history, store=self.store) for i in range(3)]
+        self.food_group = entities.EntityGroup(list(self.foods), "food_group", store=self.store)
+
+    def test_killed_entities_pooled(self):
+        self.food_group.kill_slots(np.array([self.foods[0].slot, self.foods[2].slot]))
+        self.assertEqual(len(self.pool), 2)
+        self.assertIsNone(self.pool.get(entities.Creature))
+        self.assertIn(self.pool.get(entities.Food), [self.foods[0], self.foods[2]])
+        self.assertEqual(len(self.pool), 1)
+
+    def test_respawn(self):
+        food = self.foods[1]
+        old_name = food.name
+        self.food_group.kill(1)
+        respawned_food = self.pool.get(entities.Food)
+        respawned_food.respawn(math_utils.Vector2D(7, 8), 4, self.history)
+        self.assertIs(respawned_food, food)
+        self.assertNotEqual(food.name, old_name)
+        self.assertTrue(self.store.alive[food.slot])
+        self.assertEqual(self.store.types[food.slot], entities.EntityType.FOOD.value)
+        self.assertEqual(self.store.ticks[food.slot], 4)
+        np.testing.assert_array_equal(food.position.vector, [7, 8])
+        self.assertListEqual(self.history.get_history(food.name)[0].tolist(), [3, 7, 8, 1, 0, entities.EntityType.FOOD.value])
+        self.assertIsNotNone(self.history.get_history(old_name))
+
+    def test_lazy_logger(self):
+        self.assertIs(self.foods[0]._logger, self.foods[1]._logger)
+        self.assertEqual(self.foods[0]._logger.name, "BaseEntity")
+        self.assertEqual(self.food_group._logger.name, "EntityGroup")
+
+
+class StreamEntitiesHistoryLoaderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        # Flush every 3 rows.
+        self.loader = entities.EntitiesHistoryLoader(
+            self.output_dir, stream=True, max_memory_bytes=3 * history.STREAM_COLUMNS * 4
+        )
+        self.memory_loader = entities.EntitiesHistoryLoader(self.output_dir)
+        for tick in range(10):
+            for loader in (self.loader, self.memory_loader):
+                loader.add("creature_0", tick, math_utils.Vector2D(tick, 1), math_utils.Vector2D(1, 0), entities.EntityType.CREATURE)
+                if tick >= 4:
+                    loader.add("food_1", tick, math_utils.Vector2D(5, 5), math_utils.Vector2D(1, 0), entities.EntityType.FOOD)
+
+    def test_stream_to_disk(self):
+        stream_filepath = self.loader._stream_writer.filepath
+        self.assertTrue(os.path.exists(stream_filepath))
+        self.assertIsNone(self.loader.get_history("creature_0"))
+        self.loader.save()
+        new_loader = entities.EntitiesHistoryLoader(self.output_dir)
+        new_loader.load(history.find_history_file(os.path.dirname(stream_filepath)))
+        for entity_name in ("creature_0", "food_1"):
+            np.testing.assert_array_equal(
+                new_loader.get_history(entity_name), self.memory_loader.get_history(entity_name)
+            )
+        self.assertEqual(new_loader.get_total_ticks(), 9)
+
+    def test_read_truncated_stream(self):
+        stream_filepath = self.loader._stream_writer.filepath
+        with open(stream_filepath, "ab") as stream_file:
+            stream_file.write(b"\x93NUMPY")
+        entities_rows = history.read_stream(stream_filepath)
+        self.assertEqual(set(entities_rows.keys()), {"creature_0", "food_1"})
+
+    def test_history_reader(self):
+        self.loader.save()
+        reader = history.HistoryReader(self.loader._stream_writer.filepath)
+        self.assertListEqual(reader.names.tolist(), ["creature_0", "food_1"])
+        self.assertEqual(reader.total_ticks, 9)
+        range_rows = reader.get_range(3, 6)
+        np.testing.assert_array_equal(range_rows["creature_0"][:, 0], [3, 4, 5])
+        np.testing.assert_array_equal(range_rows["food_1"], self.memory_loader.get_history("food_1")[:2])
+        entities_rows = reader.get_entities(["food_1"])
+        self.assertListEqual(list(entities_rows.keys()), ["food_1"])
+        np.testing.assert_array_equal(entities_rows["food_1"], self.memory_loader.get_history("food_1"))
+        tick_index = self.memory_loader.get_tick_index()
+        frames = list(reader.iter_frames(2, 8, window_ticks=4))
+        self.assertListEqual([tick for tick, _ in frames], list(range(2, 8)))
+        for tick, frame in frames:
+            expected_frame = tick_index.frame(tick)
+            self.assertListEqual(frame.names.tolist(), expected_frame.names.tolist())
+            np.testing.assert_array_equal(frame.positions, expected_frame.positions)
+
+
+    def test_history_reader_reads_overlapping_chunks(self):
+        self.loader.save()
+        reader = history.HistoryReader(self.loader._stream_writer.filepath)
+        for chunk in reader._chunks:
+            chunk_ticks = reader._chunk_rows(chunk)[:, 1]
+            self.assertEqual(chunk.first_tick, chunk_ticks.min())
+            self.assertEqual(chunk.last_tick, chunk_ticks.max())
+        read_chunks = []
+        chunk_rows = reader._chunk_rows
+        reader._chunk_rows = lambda chunk: read_chunks.append(chunk) or chunk_rows(chunk)
+        reader.get_range(3, 5)
+        self.assertListEqual(
+            read_chunks, [chunk for chunk in reader._chunks if chunk.last_tick >= 3 and chunk.first_tick < 5]
+        )
+        self.assertLess(len(read_chunks), len(reader._chunks) // 2)
+
+
+class ChangesOnlyEntitiesHistoryLoaderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.loader = entities.EntitiesHistoryLoader(self.output_dir, changes_only=True)
+        # Flush every 3 rows, with a keyframe every 4 ticks.
+        self.stream_loader = entities.EntitiesHistoryLoader(
+            tempfile.mkdtemp(),
+            stream=True,
+            max_memory_bytes=3 * history.STREAM_COLUMNS * 4,
+            changes_only=True,
+            keyframe_ticks=4,
+        )
+        self.dense_loader = entities.EntitiesHistoryLoader(self.output_dir)
+        for tick in range(20):
+            for loader in (self.loader, self.stream_loader, self.dense_loader):
+                # The creature only moves every 5 ticks.
+                loader.add("creature_0", tick, math_utils.Vector2D(tick // 5, 1), math_utils.Vector2D(1, 0), entities.EntityType.CREATURE)
+                if tick >= 4:
+                    loader.add("food_1", tick, math_utils.Vector2D(5, 5), math_utils.Vector2D(1, 0), entities.EntityType.FOOD)
+                if tick < 12:
+                    loader.add("food_2", tick, math_utils.Vector2D(7, 7), math_utils.Vector2D(1, 0), entities.EntityType.FOOD)
+
+    def test_record_changes_only(self):
+        self.assertEqual(len(self.loader._history_buffers["food_1"]), 1)
+        self.assertEqual(len(self.loader._history_buffers["creature_0"]), 4)
+        self.assertEqual(self.loader.get_total_ticks(), 19)
+        for entity_name in ("creature_0", "food_1", "food_2"):
+            np.testing.assert_array_equal(
+                self.loader.get_history(entity_name), self.dense_loader.get_history(entity_name)
+            )
+        tick_index = self.loader.get_tick_index()
+        dense_tick_index = self.dense_loader.get_tick_index()
+        self.assertTupleEqual(tick_index.bounds, dense_tick_index.bounds)
+        for tick in range(20):
+            frame = tick_index.frame(tick)
+            self.assertListEqual(frame.names.tolist(), dense_tick_index.frame(tick).names.tolist())
+            np.testing.assert_array_equal(frame.positions, dense_tick_index.frame(tick).positions)
+
+    def test_save_and_load(self):
+        self.loader.save()
+        new_loader = entities.EntitiesHistoryLoader(self.output_dir)
+        new_loader.load(history.find_history_file(self.loader._output_subdir))
+        np.testing.assert_array_equal(
+            new_loader.get_history("food_2"), self.dense_loader.get_history("food_2")
+        )
+
+    @parameterized.expand([(0, 20), (3, 6), (7, 15), (12, 13), (18, 25)])
+    def test_stream_range(self, start_tick, end_tick):
+        self.stream_loader.save()
+        reader = history.HistoryReader(self.stream_loader._stream_writer.filepath)
+        self.assertEqual(reader.total_ticks, 19)
+        self.assertEqual(reader.keyframe_ticks, 4)
+        range_rows = reader.get_range(start_tick, end_tick)
+        for entity_name in ("creature_0", "food_1", "food_2"):
+            dense_rows = self.dense_loader.get_history(entity_name)
+            expected_rows = dense_rows[(dense_rows[:, 0] >= start_tick) & (dense_rows[:, 0] < end_tick)]
+            if len(expected_rows) == 0:
+                self.assertNotIn(entity_name, range_rows)
+                continue
+            np.testing.assert_array_equal(range_rows[entity_name], expected_rows)
+        tick_index = self.dense_loader.get_tick_index()
+        for tick, frame in reader.iter_frames(start_tick, min(end_tick, 20), window_ticks=4):
+            expected_frame = tick_index.frame(tick)
+            self.assertListEqual(frame.names.tolist(), expected_frame.names.tolist())
+            np.testing.assert_array_equal(frame.positions, expected_frame.positions)
+
+
+class CompactHistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.entities_rows = {
+            "creature_0": np.array([[t, t * 0.5, 1, 0.6, 0.8, 1] for t in range(-1, 10)], dtype=np.float32),
+            # A gap between ticks 3 and 6.
+            "food_1": np.array([[t, 5, 5, 1, 0, 2] for t in (1, 2, 3, 6, 7)], dtype=np.float32),
+            "food_2": np.empty((0, history.HISTORY_COLUMNS), dtype=np.float32),
+        }
+        self.filepath = os.path.join(self.output_dir, history.HISTORY_FILENAME)
+
+    @parameterized.expand([(history.HistoryCodec.NONE,), (history.HistoryCodec.ZLIB,)])
+    def test_float32_round_trip(self, codec):
+        history.write_compact(self.filepath, self.entities_rows, history.HistoryFormat(codec=codec))
+        entities_rows, changes_only = history.read_compact(np.load(self.filepath))
+        self.assertFalse(changes_only)
+        self.assertListEqual(list(entities_rows.keys()), list(self.entities_rows.keys()))
+        for entity_name, entity_rows in self.entities_rows.items():
+            np.testing.assert_array_equal(entities_rows[entity_name], entity_rows)
+
+    def test_int16_round_trip(self):
+        history.write_compact(
+            self.filepath, self.entities_rows, history.HistoryFormat(precision=history.HistoryPrecision.INT16)
+        )
+        npz_file = np.load(self.filepath)
+        self.assertEqual(npz_file["positions"].dtype, np.int16)
+        entities_rows, _ = history.read_compact(npz_file)
+        for entity_name, entity_rows in self.entities_rows.items():
+            np.testing.assert_array_equal(entities_rows[entity_name][:, [0, 5]], entity_rows[:, [0, 5]])
+            np.testing.assert_allclose(entities_rows[entity_name][:, 1:5], entity_rows[:, 1:5], atol=1e-3)
+
+    def test_int16_offset_range_round_trip(self):
+        positions = np.stack((np.linspace(900, 1000, 50), np.linspace(1000, 950, 50)), axis=1)
+        entity_rows = np.zeros((50, history.HISTORY_COLUMNS), dtype=np.float32)
+        entity_rows[:, 0] = np.arange(50)
+        entity_rows[:, 1:3] = positions
+        entity_rows[:, 3] = 1
+        history.write_compact(
+            self.filepath, {"creature_0": entity_rows}, history.HistoryFormat(precision=history.HistoryPrecision.INT16)
+        )
+        entities_rows, _ = history.read_compact(np.load(self.filepath))
+        max_errors = np.abs(entities_rows["creature_0"][:, 1:3] - entity_rows[:, 1:3]).max(axis=0)
+        self.assertTrue((max_errors <= np.array([100, 50]) / 65535).all())
+
+    def test_changes_only_round_trip(self):
+        compact_rows = {"food_1": np.array([[-1, 5, 5, 1, 0, 2], [4, 6, 5, 1, 0, 2], [9, 6, 5, 1, 0, 2]], dtype=np.float32)}
+        history.write_compact(self.filepath, compact_rows, changes_only=True)
+        entities_rows, changes_only = history.read_compact(np.load(self.filepath))
+        self.assertTrue(changes_only)
+        np.testing.assert_array_equal(entities_rows["food_1"], compact_rows["food_1"])
+
+    def test_load_legacy_history(self):
+        np.savez_compressed(self.filepath, **self.entities_rows)
+        loader = entities.EntitiesHistoryLoader(self.output_dir)
+        loader.load(self.filepath)
+        np.testing.assert_array_equal(loader.get_history("food_1"), self.entities_rows["food_1"])
+
+
+class BackgroundHistorySaveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.loader = entities.EntitiesHistoryLoader(self.output_dir, background_save=True)
+        for tick in range(10):
+            self.loader.add("creature_0", tick, math_utils.Vector2D(tick, 1), math_utils.Vector2D(1, 0), entities.EntityType.CREATURE)
+
+    def test_background_save(self):
+        self.loader.save()
+        # Recording after the save does not change the saved history.
+        self.loader.add("creature_0", 10, math_utils.Vector2D(10, 1), math_utils.Vector2D(1, 0), entities.EntityType.CREATURE)
+        self.loader.wait()
+        new_loader = entities.EntitiesHistoryLoader(self.output_dir)
+        new_loader.load(history.find_history_file(self.loader._output_subdir))
+        np.testing.assert_array_equal(new_loader.get_history("creature_0"), self.loader.get_history("creature_0")[:10])
+
+    def test_background_save_error(self):
+        # A file in place of the output directory.
+        open(os.path.join(self.output_dir, "file"), "w").close()
+        self.loader._output_subdir = os.path.join(self.output_dir, "file")
+        self.loader.save()
+        with self.assertRaises(history.HistorySaveException):
+            self.loader.wait()
+        self.loader.wait()
@@ -0,0 +1,87 @@
+import random
+import unittest
+
+from parameterized import parameterized
+
+from rlgameoflife import events
+
+
+def triggered_ticks(tick_events: events.TickEvents, total_ticks: int) -> list[int]:
+    ticks = []
+    for _ in range(total_ticks):
+        ticks.extend(tick_events.tick for _ in tick_events.get())
+        tick_events.update()
+    return ticks
+
+
+class TickEventsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tick_events = events.TickEvents(rng=random.Random(0))
+
+    @parameterized.expand([(0,), (1,), (20,)])
+    def test_add_tick_event(self, tick):
+        self.tick_events.add_tick_event(events.EventType.SPAWN_FOOD_EVENT, tick)
+        self.assertListEqual(triggered_ticks(self.tick_events, 100), list(range(tick, 100, tick + 1)))
+
+    def test_one_shot(self):
+        self.tick_events.schedule(events.EventType.SPAWN_FOOD_EVENT, 5)
+        self.assertListEqual(triggered_ticks(self.tick_events, 20), [5])
+        self.tick_events.schedule_in(events.EventType.SPAWN_FOOD_EVENT, 3)
+        self.assertListEqual(triggered_ticks(self.tick_events, 10), [23])
+
+    def test_periodic(self):
+        self.tick_events.schedule(events.EventType.SPAWN_FOOD_EVENT, 2, period=5)
+        self.assertListEqual(triggered_ticks(self.tick_events, 20), [2, 7, 12, 17])
+
+    def test_jitter(self):
+        self.tick_events.schedule(events.EventType.SPAWN_FOOD_EVENT, 0, period=10, jitter=3)
+        ticks = triggered_ticks(self.tick_events, 1000)
+        periods = [next_tick - tick for tick, next_tick in zip(ticks, ticks[1:])]
+        self.assertGreaterEqual(min(periods), 7)
+        self.assertLessEqual(max(periods), 13)
+        self.assertGreater(len(set(periods)), 1)
+
+    def test_cancel(self):
+        event = self.tick_events.schedule(events.EventType.SPAWN_FOOD_EVENT, 0, period=2)
+        self.assertListEqual(triggered_ticks(self.tick_events, 5), [0, 2, 4])
+        self.tick_events.cancel(event)
+        self.assertListEqual(triggered_ticks(self.tick_events, 5), [])
+        self.tick_events.reset()
+        self.assertEqual(len(self.tick_events), 0)
+
+    def test_reset(self):
+        self.tick_events.add_tick_event(events.EventType.SPAWN_FOOD_EVENT, 3)
+        self.tick_events.schedule(events.EventType.SPAWN_FOOD_EVENT, 6)
+        self.assertListEqual(triggered_ticks(self.tick_events, 10), [3, 6, 7])
+        self.tick_events.reset()
+        self.assertEqual(self.tick_events.tick, 0)
+        self.assertListEqual(triggered_ticks(self.tick_events, 10), [3, 6, 7])
+
+    def test_reset_drops_later_events(self):
+        self.tick_events.schedule(events.EventType.SPAWN_FOOD_EVENT, 6)
+        self.assertListEqual(triggered_ticks(self.tick_events, 2), [])
+        self.tick_events.schedule_in(events.EventType.SPAWN_FOOD_EVENT, 3)
+        self.tick_events.schedule(events.EventType.SPAWN_FOOD_EVENT, 4, period=4)
+        self.assertListEqual(triggered_ticks(self.tick_events, 10), [4, 5, 6, 8])
+        # The triggered one-shot scheduled after the start is dropped.
+        self.assertEqual(len(self.tick_events), 2)
+        self.tick_events.reset()
+        self.assertEqual(len(self.tick_events), 1)
+        self.assertListEqual(triggered_ticks(self.tick_events, 12), [6])
+
+    def test_get_same_tick(self):
+        self.tick_events.schedule(events.EventType.SPAWN_FOOD_EVENT, 0)
+        self.tick_events.schedule(events.EventType.SPAWN_FOOD_EVENT, 0)
+        self.assertEqual(len(self.tick_events.get()), 2)
+        self.assertEqual(len(self.tick_events.get()), 2)
+        self.tick_events.update()
+        self.assertListEqual(self.tick_events.get(), [])
+
+    def test_skipped_tick(self):
+        self.tick_events.schedule(events.EventType.SPAWN_FOOD_EVENT, 0, period=2)
+        self.tick_events.update()
+        self.tick_events.update()
+        self.tick_events.update()
+        self.assertListEqual(self.tick_events.get(), [])
+        self.tick_events.update()
+        self.assertListEqual(self.tick_events.get(), [events.EventType.SPAWN_FOOD_EVENT])
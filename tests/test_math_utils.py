@@ -26,6 +26,11 @@ class TestMathUtils(unittest.TestCase):
         s = v.scale(5)
         self.assertEqual(s.magnitude(), 5.0)
 
+    def test_normalize_zero_vector(self):
+        v = math_utils.Vector2D()
+        self.assertTrue(np.isnan(v.normalize().vector).all())
+        self.assertTrue(np.isnan(v.scale(5).vector).all())
+
     def test_add(self):
         v1 = math_utils.Vector2D(1, 2)
         v2 = math_utils.Vector2D(3, 4)
@@ -79,3 +84,42 @@ class TestMathUtils(unittest.TestCase):
         r = v.rotate(angle)
         self.assertAlmostEqual(r.vector[0], ex, places=6)
         self.assertAlmostEqual(r.vector[1], ey, places=6)
+
+    def test_in_place(self):
+        v = math_utils.Vector2D(3, 4)
+        r = v.add_(math_utils.Vector2D(1, 1)).subtract_(math_utils.Vector2D(1, 1)).scale_(10)
+        self.assertIs(r, v)
+        self.assertAlmostEqual(v.x, 6.0)
+        self.assertAlmostEqual(v.y, 8.0)
+        v.normalize_().rotate_(np.pi / 2)
+        self.assertAlmostEqual(v.x, -0.8)
+        self.assertAlmostEqual(v.y, 0.6)
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            math_utils.Vector2D(1, 2).z = 3
+
+
+class TestVector2DArray(unittest.TestCase):
+    def setUp(self):
+        self.vectors = [math_utils.Vector2D(3, 4), math_utils.Vector2D(1, 0), math_utils.Vector2D(-1, 1)]
+        self.others = [math_utils.Vector2D(0, 1), math_utils.Vector2D(-1, 0), math_utils.Vector2D(1, 1)]
+        self.array = math_utils.Vector2DArray.from_vectors(self.vectors)
+        self.other_array = math_utils.Vector2DArray.from_vectors(self.others)
+
+    def test_matches_vector2d(self):
+        np.testing.assert_allclose(self.array.magnitude(), [v.magnitude() for v in self.vectors])
+        np.testing.assert_allclose(self.array.normalize().vectors, [v.normalize().vector for v in self.vectors])
+        np.testing.assert_allclose(self.array.scale([1, 2, 3]).vectors, [v.scale(s).vector for v, s in zip(self.vectors, [1, 2, 3])])
+        np.testing.assert_allclose(self.array.rotate(0.3).vectors, [v.rotate(0.3).vector for v in self.vectors])
+        np.testing.assert_allclose(
+            self.array.angle_between(self.other_array),
+            [v.angle_between(o) for v, o in zip(self.vectors, self.others)],
+        )
+        np.testing.assert_allclose(self.array.add(self.other_array)[0].vector, [3, 5])
+
+    def test_broadcast(self):
+        angles = self.array.vectors[:, np.newaxis, :]
+        angles = math_utils.Vector2DArray(angles).angle_between(self.other_array)
+        self.assertTupleEqual(angles.shape, (3, 3))
+        self.assertAlmostEqual(angles[1, 1], np.pi)
@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+from rlgameoflife import entities
+from rlgameoflife import math_utils
+from rlgameoflife import spatial_index
+
+
+class SpatialHashGridTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.store = entities.EntityStore()
+        self.grid = spatial_index.SpatialHashGrid(
+            self.store, math_utils.Vector2D(100, 100), cell_size=10
+        )
+        self.store.attach_spatial_index(self.grid)
+        history = entities.EntitiesHistoryLoader(tempfile.mkdtemp(), disable=True)
+        self.foods = [
+            entities.Food(math_utils.Vector2D(*position), 0, history, store=self.store)
+            for position in rng.uniform(0, 100, (200, 2))
+        ]
+        self.creatures = [
+            entities.Creature(
+                math_utils.Vector2D(*position), math_utils.Vector2D(1, 0), 0, history, store=self.store
+            )
+            for position in rng.uniform(0, 100, (20, 2))
+        ]
+
+    def _brute_force_distances(self, center, entity_type=None):
+        slots = self.store.alive_slots()
+        if entity_type is not None:
+            slots = slots[self.store.types[slots] == entity_type.value]
+        return slots, np.linalg.norm(self.store.positions[slots] - center, axis=1)
+
+    @parameterized.expand([(np.array([50.0, 50.0]), 12.0), (np.array([-5.0, 3.0]), 30.0), (np.array([99.0, 1.0]), 0.5)])
+    def test_query_radius(self, center, radius):
+        slots, distances = self._brute_force_distances(center, entities.EntityType.FOOD)
+        got = self.grid.query_radius(center, radius, entities.EntityType.FOOD)
+        np.testing.assert_array_equal(np.sort(got), np.sort(slots[distances <= radius]))
+
+    @parameterized.expand([(np.array([50.0, 50.0]), 1), (np.array([150.0, -20.0]), 5), (np.array([3.0, 97.0]), 300)])
+    def test_k_nearest(self, center, k):
+        _, distances = self._brute_force_distances(center)
+        got_slots, got_distances = self.grid.k_nearest(center, k)
+        np.testing.assert_array_almost_equal(got_distances, np.sort(distances)[:k])
+        np.testing.assert_array_almost_equal(
+            np.linalg.norm(self.store.positions[got_slots] - center, axis=1), got_distances
+        )
+
+    def test_incremental_update(self):
+        creature = self.creatures[0]
+        group = entities.EntityGroup(list(self.foods), "food_group", store=self.store)
+        group.kill(0)
+        self.assertNotIn(self.foods[0].slot, self.grid)
+        self.assertEqual(len(self.grid), len(self.store))
+        creature.move(math_utils.Vector2D(1, 0))
+        creature.update()
+        slots, _ = self.grid.k_nearest(creature.position.vector, 1, entities.EntityType.CREATURE)
+        self.assertEqual(slots[0], creature.slot)
+        self.store.clear()
+        self.assertEqual(len(self.grid), 0)
+
+    def test_update_many(self):
+        slots = self.store.alive_slots()
+        moved_slots = slots[:3]
+        self.store.positions[moved_slots] += 25.0
+        rehashed_slots = []
+        move = self.grid._move
+        self.grid._move = lambda slot, cell: rehashed_slots.append(slot) or move(slot, cell)
+        self.grid.update_many(slots)
+        self.assertListEqual(rehashed_slots, moved_slots.tolist())
+        center = self.store.positions[moved_slots[0]]
+        slots, distances = self._brute_force_distances(center)
+        np.testing.assert_array_equal(np.sort(self.grid.query_radius(center, 15.0)), np.sort(slots[distances <= 15.0]))
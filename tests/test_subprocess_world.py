@@ -0,0 +1,42 @@
+import functools
+import tempfile
+import unittest
+
+import numpy as np
+
+from rlgameoflife import actions
+from rlgameoflife import worlds
+
+
+class SubprocessVectorAgentWorldTestCase(unittest.TestCase):
+    def setUp(self):
+        self.world_factory = functools.partial(
+            worlds.BasicAgentWorld, 30, tempfile.mkdtemp(), (100, 100), disable_history=True
+        )
+        self.subprocess_world = worlds.SubprocessVectorAgentWorld(self.world_factory, 5, num_workers=2, seed=3)
+        self.addCleanup(self.subprocess_world.close)
+
+    def test_same_as_vector_world(self):
+        vector_world = worlds.VectorAgentWorld(self.world_factory, 5, seed=3)
+        self.assertEqual(self.subprocess_world.num_workers, 2)
+        np.testing.assert_array_equal(self.subprocess_world.reset(seed=3), vector_world.reset(seed=3))
+        rng = np.random.default_rng(0)
+        for _ in range(40):
+            step_actions = rng.integers(0, len(actions.DiscreteMoveActions), 5)
+            self.subprocess_world.step_async(step_actions)
+            step_parameters = self.subprocess_world.step_wait()
+            expected_parameters = vector_world.step(step_actions)
+            np.testing.assert_array_equal(step_parameters.observation, expected_parameters.observation)
+            np.testing.assert_array_equal(step_parameters.reward, expected_parameters.reward)
+            np.testing.assert_array_equal(step_parameters.truncated, expected_parameters.truncated)
+            self.assertListEqual(
+                [sorted(info) for info in step_parameters.info], [sorted(info) for info in expected_parameters.info]
+            )
+
+    def test_bad_actions(self):
+        with self.assertRaises(actions.BadActionTypeException):
+            self.subprocess_world.step(np.zeros(4, dtype=np.int64))
+
+    def test_worker_error(self):
+        with self.assertRaises(worlds.VectorWorldWorkerException):
+            self.subprocess_world.step(np.full(5, 9))
@@ -0,0 +1,55 @@
+import functools
+import tempfile
+import unittest
+
+import numpy as np
+
+from rlgameoflife import actions
+from rlgameoflife import worlds
+
+
+class VectorAgentWorldTestCase(unittest.TestCase):
+    def setUp(self):
+        self.world_factory = functools.partial(
+            worlds.BasicAgentWorld, 30, tempfile.mkdtemp(), (100, 100), disable_history=True
+        )
+        self.vector_world = worlds.VectorAgentWorld(self.world_factory, 3, seed=0)
+
+    def test_step(self):
+        observations = self.vector_world.reset()
+        self.assertEqual(observations.shape, (3,) + self.vector_world.observation_shape)
+        np.testing.assert_allclose(observations[0], self.vector_world.worlds[0].get_observation(), rtol=1e-6)
+        step_actions = np.array([action.value for action in actions.DiscreteMoveActions][:3])
+        step_parameters = self.vector_world.step(step_actions)
+        self.assertEqual(step_parameters.observation.shape, observations.shape)
+        self.assertEqual(step_parameters.reward.shape, (3,))
+        self.assertFalse(step_parameters.terminated.any() or step_parameters.truncated.any())
+        self.assertTrue(all(world.tick == 1 for world in self.vector_world.worlds))
+        with self.assertRaises(actions.BadActionTypeException):
+            self.vector_world.step(step_actions[:2])
+
+    def test_auto_reset(self):
+        forward = np.full(3, actions.DiscreteMoveActions.FORWARD.value)
+        for _ in range(29):
+            self.assertFalse(self.vector_world.step(forward).truncated.any())
+        step_parameters = self.vector_world.step(forward)
+        self.assertTrue(step_parameters.truncated.all())
+        self.assertIn("final_observation", step_parameters.info[0])
+        self.assertTrue(all(world.tick == 0 for world in self.vector_world.worlds))
+        np.testing.assert_array_equal(step_parameters.observation, self.vector_world.reset())
+
+    def test_seed(self):
+        def rollout(vector_world):
+            observations = [vector_world.reset(seed=7)]
+            for tick in range(60):
+                observations.append(vector_world.step(np.full(3, tick % 4)).observation)
+            return np.stack(observations)
+
+        other_vector_world = worlds.VectorAgentWorld(self.world_factory, 3)
+        np.testing.assert_array_equal(rollout(self.vector_world), rollout(other_vector_world))
+
+    def test_no_copy(self):
+        vector_world = worlds.VectorAgentWorld(self.world_factory, 2, copy=False)
+        observations = vector_world.reset()
+        step_parameters = vector_world.step(np.zeros(2, dtype=np.int64))
+        self.assertIs(step_parameters.observation, observations)
@@ -7,6 +7,9 @@ from rlgameoflife import math_utils
 from rlgameoflife import visual_pattern
 
 
+# Store of the entities of the parameterized cases.
+STORE = entities.EntityStore()
+
 class VisualConePatternTestCase(unittest.TestCase):
     def setUp(self):
         self.arc_angle = np.pi
@@ -25,11 +28,13 @@ class VisualConePatternTestCase(unittest.TestCase):
                     math_utils.Vector2D(1, 0),
                     0,
                     entities.EntitiesHistoryLoader("/tmp"),
+                    store=STORE,
                 ),
                 entities.Food(
                     math_utils.Vector2D(50, 0),
                     0,
                     entities.EntitiesHistoryLoader("/tmp"),
+                    store=STORE,
                 ),
                 np.array([[1, 1], [1, 1], [0.5, 1], [1, 1], [1, 1]]),
             ),
@@ -40,11 +45,13 @@ class VisualConePatternTestCase(unittest.TestCase):
                     math_utils.Vector2D(1, 0),
                     0,
                     entities.EntitiesHistoryLoader("/tmp"),
+                    store=STORE,
                 ),
                 entities.Food(
                     math_utils.Vector2D(0, 50),
                     0,
                     entities.EntitiesHistoryLoader("/tmp"),
+                    store=STORE,
                 ),
                 np.array([[1, 1], [1, 1], [1, 1], [1, 1], [0.5, 1]]),
             ),
@@ -55,12 +62,14 @@ class VisualConePatternTestCase(unittest.TestCase):
                     math_utils.Vector2D(1, 0),
                     0,
                     entities.EntitiesHistoryLoader("/tmp"),
+                    store=STORE,
                 ),
                 entities.Creature(
                     math_utils.Vector2D(50, 0),
                     math_utils.Vector2D(1, 0),
                     0,
                     entities.EntitiesHistoryLoader("/tmp"),
+                    store=STORE,
                 ),
                 np.array([[1, 1], [1, 1], [1, 0.5], [1, 1], [1, 1]]),
             ),
@@ -71,11 +80,13 @@ class VisualConePatternTestCase(unittest.TestCase):
                     math_utils.Vector2D(1, 0),
                     0,
                     entities.EntitiesHistoryLoader("/tmp"),
+                    store=STORE,
                 ),
                 entities.Food(
                     math_utils.Vector2D(-50, 0),
                     0,
                     entities.EntitiesHistoryLoader("/tmp"),
+                    store=STORE,
                 ),
                 np.ones((5, 2)),
             ),
@@ -86,11 +97,13 @@ class VisualConePatternTestCase(unittest.TestCase):
                     math_utils.Vector2D(1, 0),
                     0,
                     entities.EntitiesHistoryLoader("/tmp"),
+                    store=STORE,
                 ),
                 entities.Food(
                     math_utils.Vector2D(200, 0),
                     0,
                     entities.EntitiesHistoryLoader("/tmp"),
+                    store=STORE,
                 ),
                 np.ones((5, 2)),
             ),
@@ -101,6 +114,7 @@ class VisualConePatternTestCase(unittest.TestCase):
                     math_utils.Vector2D(1, 0),
                     0,
                     entities.EntitiesHistoryLoader("/tmp"),
+                    store=STORE,
                 ),
                 entities.EntityGroup(
                     [
@@ -108,14 +122,17 @@ class VisualConePatternTestCase(unittest.TestCase):
                             math_utils.Vector2D(75, 0),
                             0,
                             entities.EntitiesHistoryLoader("/tmp"),
+                            store=STORE,
                         ),
                         entities.Food(
                             math_utils.Vector2D(50, 0),
                             0,
                             entities.EntitiesHistoryLoader("/tmp"),
+                            store=STORE,
                         ),
                     ],
                     "food_test_group",
+                    store=STORE,
                 ),
                 np.array([[1, 1], [1, 1], [0.5, 1], [1, 1], [1, 1]]),
             ),
@@ -126,6 +143,7 @@ class VisualConePatternTestCase(unittest.TestCase):
                     math_utils.Vector2D(1, 0),
                     0,
                     entities.EntitiesHistoryLoader("/tmp"),
+                    store=STORE,
                 ),
                 entities.EntityGroup(
                     [
@@ -134,14 +152,17 @@ class VisualConePatternTestCase(unittest.TestCase):
                             math_utils.Vector2D(1, 0),
                             0,
                             entities.EntitiesHistoryLoader("/tmp"),
+                            store=STORE,
                         ),
                         entities.Food(
                             math_utils.Vector2D(50, 0),
                             0,
                             entities.EntitiesHistoryLoader("/tmp"),
+                            store=STORE,
                         ),
                     ],
                     "food_test_group",
+                    store=STORE,
                 ),
                 np.array([[1, 1], [1, 1], [0.5, 1], [1, 1], [1, 1]]),
             ),
@@ -150,3 +171,60 @@ class VisualConePatternTestCase(unittest.TestCase):
     def test_update(self, name, entity1, entity2, expected):
         self.visual_cone_pattern.update(entity1, entity2)
         np.testing.assert_array_equal(self.visual_cone_pattern.visual_pattern, expected)
+
+
+class BatchedVisualConePatternTestCase(unittest.TestCase):
+    def setUp(self):
+        self.history = entities.EntitiesHistoryLoader("/tmp", disable=True)
+        self.store = entities.EntityStore()
+        rng = np.random.default_rng(0)
+        self.creatures = [
+            entities.Creature(
+                math_utils.Vector2D(*position), math_utils.Vector2D(*direction), 0, self.history, store=self.store
+            )
+            for position, direction in zip(rng.uniform(0, 100, (5, 2)), rng.uniform(-1, 1, (5, 2)))
+        ]
+        self.foods = [
+            entities.Food(math_utils.Vector2D(*position), 0, self.history, store=self.store)
+            for position in rng.uniform(0, 100, (50, 2))
+        ]
+        self.creature_group = entities.EntityGroup(self.creatures, "creature_group", store=self.store)
+        self.all_group = entities.EntityGroup(
+            [self.creature_group, entities.EntityGroup(self.foods, "food_group", store=self.store)],
+            "all_group",
+            store=self.store,
+        )
+
+    def test_observe_matches_visual_cone_pattern(self):
+        batched_pattern = visual_pattern.BatchedVisualConePattern(np.pi / 2, 60, 9)
+        got = batched_pattern.observe(self.creature_group, self.all_group)
+        self.assertEqual(got.shape, (5, 9, 2))
+        for creature_idx, creature in enumerate(self.creatures):
+            # Seen from the farthest, each nearer entity clears its quadrant.
+            samples = sorted(
+                self.creatures + self.foods,
+                key=lambda entity: -creature.position.subtract(entity.position).magnitude(),
+            )
+            expected_pattern = visual_pattern.VisualConePattern(np.pi / 2, 60, 9)
+            for sample in samples:
+                expected_pattern.update(creature, sample)
+            np.testing.assert_array_almost_equal(got[creature_idx], expected_pattern.visual_pattern)
+            self.assertAlmostEqual(
+                batched_pattern.nearest_entity_distance(entities.EntityType.FOOD)[creature_idx],
+                expected_pattern.nearest_entity_distance(entities.EntityType.FOOD),
+            )
+            self.assertAlmostEqual(
+                batched_pattern.nearest_entity_angle(entities.EntityType.FOOD)[creature_idx],
+                expected_pattern.nearest_entity_angle(entities.EntityType.FOOD),
+            )
+
+    def test_reuse_across_ticks(self):
+        batched_pattern = visual_pattern.BatchedVisualConePattern(np.pi, 100, 5)
+        batched_pattern.update(
+            np.array([[0.0, 0.0]]), np.array([[1.0, 0.0]]), np.array([[50.0, 0.0]]), np.array([0])
+        )
+        np.testing.assert_array_equal(batched_pattern.visual_pattern[0], [[1, 1], [1, 1], [0.5, 1], [1, 1], [1, 1]])
+        batched_pattern.update(
+            np.array([[0.0, 0.0]]), np.array([[1.0, 0.0]]), np.array([[0.0, 50.0]]), np.array([1])
+        )
+        np.testing.assert_array_equal(batched_pattern.visual_pattern[0], [[1, 1], [1, 1], [1, 1], [1, 1], [1, 0.5]])
@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from rlgameoflife import actions
+from rlgameoflife import worlds
+
+
+def rollout(world, world_actions):
+    observations = [world.get_observation()]
+    rewards = []
+    for action in world_actions:
+        step_parameters = world.step(actions.DiscreteMoveActions(int(action)))
+        observations.append(step_parameters.observation)
+        rewards.append(step_parameters.reward)
+    return np.stack(observations), np.array(rewards)
+
+
+class WorldSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.world = worlds.BasicAgentWorld(200, tempfile.mkdtemp(), (100, 100), disable_history=True, seed=0)
+        self.world_actions = np.random.default_rng(0).choice([0, 1, 2, 3, 3, 3], 120)
+
+    def test_restore(self):
+        rollout(self.world, self.world_actions[:30])
+        snapshot = self.world.snapshot()
+        observations, rewards = rollout(self.world, self.world_actions[30:])
+        view_entities = sorted(self.world._entities_group.view().entities, key=id)
+        self.world.restore(snapshot)
+        self.assertEqual(self.world.tick, 30)
+        restored_observations, restored_rewards = rollout(self.world, self.world_actions[30:])
+        np.testing.assert_array_equal(restored_observations, observations)
+        np.testing.assert_array_equal(restored_rewards, rewards)
+        self.assertEqual(sorted(self.world._entities_group.view().entities, key=id), view_entities)
+
+    def test_restore_rng(self):
+        snapshot = self.world.snapshot()
+        observations, _ = rollout(self.world, self.world_actions)
+        self.world.restore(snapshot, restore_rng=False)
+        other_observations, _ = rollout(self.world, self.world_actions)
+        self.assertFalse(np.array_equal(observations, other_observations))
+
+    def test_snapshot_reset(self):
+        snapshot_world = worlds.BasicAgentWorld(
+            200, tempfile.mkdtemp(), (100, 100), disable_history=True, seed=0, snapshot_reset=True
+        )
+        for _ in range(3):
+            observations, rewards = rollout(self.world, self.world_actions)
+            snapshot_observations, snapshot_rewards = rollout(snapshot_world, self.world_actions)
+            np.testing.assert_array_equal(snapshot_observations, observations)
+            np.testing.assert_array_equal(snapshot_rewards, rewards)
+            self.world.reset()
+            snapshot_world.reset()
+            self.assertEqual(len(snapshot_world._entity_store), len(self.world._entity_store))